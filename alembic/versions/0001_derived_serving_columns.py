@@ -0,0 +1,72 @@
+"""derived serving columns
+
+Adds and backfills the columns the importers derive at load time
+(app/derived_fields.py) on databases created before they existed.
+Tables that do not exist yet are left to Base.metadata.create_all.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    if _has_table('sip_records'):
+        op.execute("ALTER TABLE sip_records ADD COLUMN IF NOT EXISTS step_up_enabled BOOLEAN")
+        op.execute("ALTER TABLE sip_records ADD COLUMN IF NOT EXISTS scheme_count INTEGER")
+        op.execute("ALTER TABLE sip_records ADD COLUMN IF NOT EXISTS created_at_ts TIMESTAMPTZ")
+
+        # Same split as the StagnantSIPOpportunity.scheme_name validator
+        op.execute("""
+            CREATE OR REPLACE FUNCTION pg_temp.count_schemes(value TEXT) RETURNS INTEGER AS $$
+                SELECT CASE
+                    WHEN btrim(value) LIKE '[%]' THEN (
+                        SELECT count(*)::int
+                        FROM unnest(string_to_array(substr(btrim(value), 2, length(btrim(value)) - 2), ',')) AS part
+                        WHERE btrim(part) <> ''
+                    )
+                    WHEN btrim(coalesce(value, '')) <> '' THEN 1
+                    ELSE 0
+                END
+            $$ LANGUAGE sql IMMUTABLE
+        """)
+        op.execute("""
+            UPDATE sip_records SET
+                step_up_enabled = coalesce(increment_amount, 0) <> 0 OR coalesce(increment_percentage, 0) <> 0,
+                scheme_count = pg_temp.count_schemes(scheme_name)
+            WHERE step_up_enabled IS NULL
+        """)
+        op.execute("CREATE INDEX IF NOT EXISTS ix_sip_records_step_up_enabled ON sip_records (step_up_enabled)")
+
+    if _has_table('portfolio_holdings'):
+        op.execute("ALTER TABLE portfolio_holdings ADD COLUMN IF NOT EXISTS w_rating_numeric DOUBLE PRECISION")
+        op.execute(r"""
+            UPDATE portfolio_holdings
+            SET w_rating_numeric = btrim(w_rating)::double precision
+            WHERE w_rating_numeric IS NULL
+              AND w_rating ~ '^\s*[-+]?(\d+\.?\d*|\.\d+)\s*$'
+        """)
+        op.execute("CREATE INDEX IF NOT EXISTS ix_portfolio_holdings_w_rating_numeric "
+                   "ON portfolio_holdings (w_rating_numeric)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_portfolio_holdings_w_rating_numeric")
+    op.execute("ALTER TABLE IF EXISTS portfolio_holdings DROP COLUMN IF EXISTS w_rating_numeric")
+    op.execute("DROP INDEX IF EXISTS ix_sip_records_step_up_enabled")
+    for column in ('step_up_enabled', 'scheme_count', 'created_at_ts'):
+        op.execute(f"ALTER TABLE IF EXISTS sip_records DROP COLUMN IF EXISTS {column}")
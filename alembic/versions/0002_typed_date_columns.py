@@ -0,0 +1,126 @@
+"""typed date columns
+
+Adds DATE (`<raw>_on`) and TIMESTAMPTZ (`<raw>_ts`) twins of the export's
+date strings, backfills them in one set-based UPDATE per table and indexes
+the columns the opportunity endpoints filter and sort by. The distinct raw
+strings are parsed with the importers' own parser (app/derived_fields.py,
+naive timestamps read in settings.EXPORT_TIMEZONE) into a temp table the
+UPDATEs read from, so backfilled and imported rows always agree.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.derived_fields import parse_export_date, parse_export_timestamp
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+# table -> (timestamp columns, date columns), raw column -> typed column
+TYPED_COLUMNS = {
+    'sip_records': (
+        {'created_at': 'created_at_ts'},
+        {
+            'start_date': 'start_date_on',
+            'end_date': 'end_date_on',
+            'first_success_order_date': 'first_success_order_date_on',
+            'latest_success_order_date': 'latest_success_order_date_on',
+        },
+    ),
+    'insurance_records': (
+        {'created_at': 'created_at_ts', 'order_date': 'order_date_ts'},
+        {'transaction_date': 'transaction_date_on', 'policy_issue_date': 'policy_issue_date_on'},
+    ),
+    'users': (
+        {'created_at': 'created_at_ts', 'first_active_at': 'first_active_at_ts'},
+        {'latest_as_on_date': 'latest_as_on_date_on'},
+    ),
+}
+
+INDEXES = {
+    'ix_sip_records_created_at_ts': ('sip_records', 'created_at_ts'),
+    'ix_sip_records_latest_success_order_date_on': ('sip_records', 'latest_success_order_date_on'),
+}
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def _parse_export_dates(inspector) -> None:
+    """Temp table export_dates: every raw date string still to backfill -> (timestamp, date)"""
+    bind = op.get_bind()
+    raw_values = set()
+    for table, (timestamp_columns, date_columns) in TYPED_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        selects = [
+            f"SELECT {raw} FROM {table} WHERE {raw} <> ''"
+            + (f" AND {typed} IS NULL" if typed in existing else "")
+            for raw, typed in {**timestamp_columns, **date_columns}.items()
+        ]
+        raw_values.update(row[0] for row in bind.execute(sa.text(" UNION ".join(selects))))
+
+    op.execute("CREATE TEMPORARY TABLE export_dates (raw TEXT PRIMARY KEY, ts TIMESTAMPTZ, day DATE)")
+    parsed = [
+        {'raw': value, 'ts': parse_export_timestamp(value), 'day': parse_export_date(value)}
+        for value in raw_values
+    ]
+    parsed = [row for row in parsed if row['ts'] is not None]
+    if parsed:
+        bind.execute(sa.text("INSERT INTO export_dates (raw, ts, day) VALUES (:raw, :ts, :day)"), parsed)
+    op.execute("ANALYZE export_dates")
+
+
+def upgrade() -> None:
+    inspector = _inspector()
+    _parse_export_dates(inspector)
+
+    for table, (timestamp_columns, date_columns) in TYPED_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+
+        for typed in timestamp_columns.values():
+            op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {typed} TIMESTAMPTZ")
+        for typed in date_columns.values():
+            op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {typed} DATE")
+
+        assignments = [
+            f"{typed} = coalesce({typed}, (SELECT ts FROM export_dates WHERE raw = {table}.{raw}))"
+            for raw, typed in timestamp_columns.items()
+        ] + [
+            f"{typed} = coalesce({typed}, (SELECT day FROM export_dates WHERE raw = {table}.{raw}))"
+            for raw, typed in date_columns.items()
+        ]
+        missing = " OR ".join(
+            f"({typed} IS NULL AND {raw} <> '')"
+            for raw, typed in {**timestamp_columns, **date_columns}.items()
+        )
+        op.execute(f"UPDATE {table} SET {', '.join(assignments)} WHERE {missing}")
+
+    op.execute("DROP TABLE export_dates")
+
+    for index, (table, column) in INDEXES.items():
+        if inspector.has_table(table):
+            op.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({column})")
+
+
+def downgrade() -> None:
+    for index in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+    for table, (timestamp_columns, date_columns) in TYPED_COLUMNS.items():
+        for typed in date_columns.values():
+            op.execute(f"ALTER TABLE IF EXISTS {table} DROP COLUMN IF EXISTS {typed}")
+        for typed in timestamp_columns.values():
+            if (table, typed) != ('sip_records', 'created_at_ts'):  # belongs to 0001
+                op.execute(f"ALTER TABLE IF EXISTS {table} DROP COLUMN IF EXISTS {typed}")
@@ -0,0 +1,74 @@
+"""boolean status columns
+
+Converts the "true"/"false" string flags to BOOLEAN (one table rewrite per
+table) and adds partial indexes for the predicates the services filter on.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+BOOLEAN_COLUMNS = {
+    'sip_records': ['is_active', 'had_mandate_at_creation', 'has_current_mandate', 'stepper_enabled', 'deleted'],
+    'insurance_records': ['deleted'],
+}
+
+# name -> (table, column, predicate)
+PARTIAL_INDEXES = {
+    'ix_sip_records_live_user_id': ('sip_records', 'user_id', 'NOT deleted'),
+    'ix_sip_records_live_agent_id': ('sip_records', 'agent_id', 'NOT deleted'),
+    'ix_sip_records_live_failed_amount': ('sip_records', 'failed_amount', 'NOT deleted'),
+    'ix_sip_records_live_success_amount': ('sip_records', 'success_amount', 'NOT deleted'),
+    'ix_sip_records_live_active_latest_success': ('sip_records', 'latest_success_order_date_on',
+                                                  'NOT deleted AND is_active'),
+    'ix_sip_records_active_no_step_up_created_at': ('sip_records', 'created_at_ts',
+                                                    'is_active AND NOT step_up_enabled'),
+    'ix_insurance_records_live_user_id': ('insurance_records', 'user_id', 'NOT deleted'),
+    'ix_insurance_records_live_opportunity_score': ('insurance_records', 'opportunity_score', 'NOT deleted'),
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    for table, columns in BOOLEAN_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        types = {column['name']: column['type'] for column in inspector.get_columns(table)}
+        pending = [column for column in columns if not isinstance(types.get(column), sa.Boolean)]
+        if pending:
+            op.execute(f"ALTER TABLE {table} " + ", ".join(
+                f"ALTER COLUMN {column} TYPE BOOLEAN USING "
+                f"CASE lower(btrim({column})) WHEN 'true' THEN true WHEN 'false' THEN false END"
+                for column in pending
+            ))
+
+    for index, (table, column, predicate) in PARTIAL_INDEXES.items():
+        if inspector.has_table(table):
+            op.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({column}) WHERE {predicate}")
+
+    # Fresh statistics so the planner sees the new column types and indexes
+    for table in BOOLEAN_COLUMNS:
+        if inspector.has_table(table):
+            op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    for index in PARTIAL_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+    for table, columns in BOOLEAN_COLUMNS.items():
+        op.execute(f"ALTER TABLE IF EXISTS {table} " + ", ".join(
+            f"ALTER COLUMN {column} TYPE VARCHAR USING {column}::text"
+            for column in columns
+        ))
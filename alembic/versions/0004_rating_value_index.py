@@ -0,0 +1,40 @@
+"""rating/value index for low-rated fund lookups
+
+Replaces the single-column w_rating_numeric index with a composite
+(w_rating_numeric, current_value) index, and backfills w_rating_numeric
+for rows loaded by importers that predate the column.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table('portfolio_holdings'):
+        return
+    op.execute(r"""
+        UPDATE portfolio_holdings
+        SET w_rating_numeric = btrim(w_rating)::double precision
+        WHERE w_rating_numeric IS NULL
+          AND w_rating ~ '^\s*[-+]?(\d+\.?\d*|\.\d+)\s*$'
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_portfolio_holdings_w_rating_numeric_current_value "
+               "ON portfolio_holdings (w_rating_numeric, current_value)")
+    op.execute("DROP INDEX IF EXISTS ix_portfolio_holdings_w_rating_numeric")
+
+
+def downgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_portfolio_holdings_w_rating_numeric "
+               "ON portfolio_holdings (w_rating_numeric)")
+    op.execute("DROP INDEX IF EXISTS ix_portfolio_holdings_w_rating_numeric_current_value")
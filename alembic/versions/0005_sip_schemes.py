@@ -0,0 +1,86 @@
+"""sip_schemes child table
+
+Adds the schemes lookup table and the sip_schemes (sip_id, position,
+scheme_id) child table, and splits the bracketed scheme_name lists of
+existing SIPs into them. New imports write these rows themselves
+(scripts/import_data.py, SIPSchemeStage).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('schemes'):
+        op.create_table(
+            'schemes',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('name', sa.Text, nullable=False, unique=True),
+            sa.Column('created_in_db', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index('ix_schemes_id', 'schemes', ['id'])
+
+    if not inspector.has_table('sip_schemes'):
+        op.create_table(
+            'sip_schemes',
+            sa.Column('sip_id', sa.Integer, sa.ForeignKey('sip_records.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('position', sa.Integer, primary_key=True),
+            sa.Column('scheme_id', sa.Integer, sa.ForeignKey('schemes.id'), nullable=False),
+        )
+        op.create_index('ix_sip_schemes_scheme_id', 'sip_schemes', ['scheme_id'])
+
+    if not inspector.has_table('sip_records'):
+        return
+
+    # Same split as app.derived_fields.split_scheme_names: "[A, B]" -> A, B;
+    # anything else is a single name; blank parts are dropped
+    op.execute("""
+        CREATE TEMP TABLE sip_scheme_parts AS
+        SELECT sip_id, row_number() OVER (PARTITION BY sip_id ORDER BY ord)::int AS position, name
+        FROM (
+            SELECT r.id AS sip_id, btrim(p.part) AS name, p.ord
+            FROM sip_records r
+            CROSS JOIN LATERAL unnest(
+                CASE WHEN btrim(r.scheme_name) LIKE '[%]'
+                     THEN string_to_array(substr(btrim(r.scheme_name), 2, length(btrim(r.scheme_name)) - 2), ',')
+                     ELSE ARRAY[r.scheme_name]
+                END
+            ) WITH ORDINALITY AS p(part, ord)
+            WHERE btrim(coalesce(r.scheme_name, '')) <> ''
+              AND NOT EXISTS (SELECT 1 FROM sip_schemes ss WHERE ss.sip_id = r.id)
+        ) parts
+        WHERE name <> ''
+    """)
+    op.execute("""
+        INSERT INTO schemes (name)
+        SELECT DISTINCT name FROM sip_scheme_parts ORDER BY name
+        ON CONFLICT (name) DO NOTHING
+    """)
+    op.execute("""
+        INSERT INTO sip_schemes (sip_id, position, scheme_id)
+        SELECT p.sip_id, p.position, s.id
+        FROM sip_scheme_parts p
+        JOIN schemes s ON s.name = p.name
+        ORDER BY p.sip_id, p.position
+    """)
+    op.execute("DROP TABLE sip_scheme_parts")
+    op.execute("ANALYZE schemes")
+    op.execute("ANALYZE sip_schemes")
+
+
+def downgrade() -> None:
+    op.drop_table('sip_schemes')
+    op.drop_table('schemes')
@@ -0,0 +1,84 @@
+"""workload indexes
+
+Index set derived from scripts/explain_services.py on the 100k synthetic
+exports: adds the composite and partial indexes the service queries use
+and drops the single-column indexes no plan touched, which every insert
+and COPY merge still had to maintain (including the Text indexes on
+portfolio_holdings.scheme_name and comment, and the ix_<table>_id copies
+of the primary keys).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+# name -> (table, columns, predicate)
+WORKLOAD_INDEXES = {
+    # stagnant / stopped SIPs scoped to one agent
+    'ix_sip_records_agent_external_id_is_active_deleted': ('sip_records', 'agent_external_id, is_active, deleted',
+                                                           None),
+    # insurance statistics scoped to one agent
+    'ix_insurance_records_live_agent_id': ('insurance_records', 'agent_id', 'NOT deleted'),
+    # portfolio review: underperforming holdings of an agent's clients
+    'ix_portfolio_holdings_underperforming_user_id': ('portfolio_holdings', 'user_id',
+                                                      'live_xirr < benchmark_xirr'),
+}
+
+# Single-column indexes (ix_<table>_<column>) no service plan uses; lookups by
+# user_id / agent_id on live rows go through the partial ix_*_live_* indexes
+UNUSED_INDEXES = {
+    'sip_records': [
+        'id', 'uid', 'user_id', 'agent_id', 'agent_external_id', 'member_id', 'start_date', 'increment_period',
+        'sip_sales_status', 'current_sip_status', 'first_success_order_date', 'latest_success_order_date',
+        'step_up_enabled', 'created_at_ts', 'latest_success_order_date_on',
+    ],
+    'insurance_records': [
+        'id', 'uid', 'user_id', 'name', 'wealth_band', 'transaction_date', 'transaction_status', 'order_status',
+        'insurance_type', 'insurer', 'agent_id', 'agent_external_id', 'member_id', 'premium_gap',
+        'opportunity_score',
+    ],
+    'users': ['id', 'crn', 'name', 'email', 'date_of_birth', 'member_id', 'first_active_at', 'created_at'],
+    'portfolio_holdings': [
+        'id', 'pan_number', 'as_on_date', 'wpc', 'scheme_name', 'category', 'amc_name', 'xirr_performance',
+        'three_year_returns_alpha', 'five_year_returns_alpha', 'rolling_12q_beat_percentage', 'unrealized_ltcg',
+        'comment', 'w_rating',
+    ],
+    'schemes': ['id'],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    for index, (table, columns, predicate) in WORKLOAD_INDEXES.items():
+        if inspector.has_table(table):
+            where = f" WHERE {predicate}" if predicate else ""
+            op.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({columns}){where}")
+
+    for table, columns in UNUSED_INDEXES.items():
+        for column in columns:
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_{column}")
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    for table, columns in UNUSED_INDEXES.items():
+        if not inspector.has_table(table):
+            continue
+        for column in columns:
+            op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})")
+
+    for index in WORKLOAD_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index}")
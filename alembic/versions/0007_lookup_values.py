@@ -0,0 +1,120 @@
+"""dictionary-encoded categorical columns
+
+Moves the repeated free-text categoricals (portfolio category / AMC /
+benchmark, insurance type / wealth band / insurer, SIP increment period and
+statuses) into lookup_values and replaces each column with an INTEGER
+`<column>_code` referencing it. All fields share one code space and
+insurer / AMC / benchmark names are high-cardinality, so the codes are not
+SMALLINT. The type change is one table rewrite per table, so the rows
+actually shrink. Archived portfolio snapshots are encoded with
+portfolio_holdings' codes.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+CODED_COLUMNS = {
+    'sip_records': ['increment_period', 'sip_sales_status', 'current_sip_status'],
+    'insurance_records': ['wealth_band', 'insurance_type', 'insurer'],
+    'portfolio_holdings': ['category', 'amc_name', 'benchmark_name'],
+}
+
+# table -> table whose lookup fields it shares (history tables carry no foreign keys)
+ENCODED_TABLES = {
+    'sip_records': 'sip_records',
+    'insurance_records': 'insurance_records',
+    'portfolio_holdings': 'portfolio_holdings',
+    'portfolio_holdings_history': 'portfolio_holdings',
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('lookup_values'):
+        op.create_table(
+            'lookup_values',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('field', sa.String, nullable=False),
+            sa.Column('value', sa.Text, nullable=False),
+            sa.UniqueConstraint('field', 'value', name='uq_lookup_values_field_value'),
+        )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION pg_temp.lookup_code(field TEXT, value TEXT) RETURNS INTEGER AS $$
+            SELECT id FROM lookup_values WHERE lookup_values.field = $1 AND lookup_values.value = $2
+        $$ LANGUAGE sql STABLE
+    """)
+
+    for table, source in ENCODED_TABLES.items():
+        if not inspector.has_table(table):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        pending = [column for column in CODED_COLUMNS[source] if column in existing]
+        if not pending:
+            continue
+
+        # Only the values not registered yet: a conflicting insert would
+        # still burn a sequence value per row
+        for column in pending:
+            op.execute(f"""
+                INSERT INTO lookup_values (field, value)
+                SELECT DISTINCT '{source}.{column}', t.{column} FROM {table} t
+                WHERE t.{column} IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM lookup_values l
+                    WHERE l.field = '{source}.{column}' AND l.value = t.{column}
+                )
+                ORDER BY 2
+            """)
+
+        op.execute(f"ALTER TABLE {table} " + ", ".join(
+            f"ALTER COLUMN {column} TYPE INTEGER USING pg_temp.lookup_code('{source}.{column}', {column})"
+            for column in pending
+        ))
+        for column in pending:
+            op.execute(f"ALTER TABLE {table} RENAME COLUMN {column} TO {column}_code")
+            if table == source:
+                op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY ({column}_code) REFERENCES lookup_values (id)")
+
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION pg_temp.lookup_value(code INTEGER) RETURNS TEXT AS $$
+            SELECT value FROM lookup_values WHERE id = $1
+        $$ LANGUAGE sql STABLE
+    """)
+
+    for table, source in ENCODED_TABLES.items():
+        if not inspector.has_table(table):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        pending = [column for column in CODED_COLUMNS[source] if f"{column}_code" in existing]
+        if not pending:
+            continue
+
+        for column in pending:
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_{column}_code_fkey")
+        op.execute(f"ALTER TABLE {table} " + ", ".join(
+            f"ALTER COLUMN {column}_code TYPE VARCHAR USING pg_temp.lookup_value({column}_code)"
+            for column in pending
+        ))
+        for column in pending:
+            op.execute(f"ALTER TABLE {table} RENAME COLUMN {column}_code TO {column}")
+
+    op.execute("DROP TABLE IF EXISTS lookup_values")
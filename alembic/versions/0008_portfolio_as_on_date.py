@@ -0,0 +1,52 @@
+"""typed portfolio snapshot date
+
+Adds portfolio_holdings.as_on_date_on, the DATE twin of the snapshot's
+as_on_date string (and of the archived copies in
+portfolio_holdings_history), backfilled in one UPDATE per table. It is the
+range partition key of the optional partitioned layout
+(scripts/partition_tables.py).
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['portfolio_holdings', 'portfolio_holdings_history']
+
+
+def upgrade() -> None:
+    # Portfolio dumps carry ISO dates ("2026-01-30"); the other exports' "January 30, 2026"
+    op.execute(r"""
+        CREATE OR REPLACE FUNCTION pg_temp.parse_snapshot_date(value TEXT) RETURNS DATE AS $$
+            SELECT CASE
+                WHEN value ~ '^\d{4}-\d{2}-\d{2}' THEN substr(value, 1, 10)::date
+                WHEN value ~ '^[A-Za-z]+ \d{1,2}, \d{4}' THEN to_date(value, 'FMMonth FMDD, YYYY')
+            END
+        $$ LANGUAGE sql IMMUTABLE
+    """)
+
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        if not inspector.has_table(table):
+            continue
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS as_on_date_on DATE")
+        op.execute(f"""
+            UPDATE {table} SET as_on_date_on = pg_temp.parse_snapshot_date(as_on_date)
+            WHERE as_on_date_on IS NULL AND as_on_date <> ''
+        """)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"ALTER TABLE IF EXISTS {table} DROP COLUMN IF EXISTS as_on_date_on")
@@ -0,0 +1,216 @@
+"""
+Serving fields derived from the raw export values.
+
+The importers compute these once per row and store them next to the raw
+strings, so the opportunity queries can filter and sort on typed, indexed
+columns instead of re-parsing every row on every request.
+
+Typed date columns follow one naming rule: `<raw column>_on` is a DATE and
+`<raw column>_ts` a TIMESTAMPTZ. Export timestamps carry no offset; they are
+read in settings.EXPORT_TIMEZONE.
+"""
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from typing import List, Optional
+from zoneinfo import ZoneInfo
+
+from dateutil import parser as date_parser
+
+from app.config import settings
+
+
+EXPORT_TIMEZONE = ZoneInfo(settings.EXPORT_TIMEZONE)
+
+# "July 30, 2023" / "July 30, 2023, 7:02 PM" - every date the exports contain
+_EXPORT_DATE_RE = re.compile(r'([A-Za-z]+)\.? (\d{1,2}), (\d{4})(?:,? (\d{1,2}):(\d{2}) ?([AaPp])\.?[Mm]\.?)?')
+_MONTHS = {
+    name.lower(): index + 1
+    for index, names in enumerate([
+        ('January', 'Jan'), ('February', 'Feb'), ('March', 'Mar'), ('April', 'Apr'),
+        ('May',), ('June', 'Jun'), ('July', 'Jul'), ('August', 'Aug'),
+        ('September', 'Sep', 'Sept'), ('October', 'Oct'), ('November', 'Nov'), ('December', 'Dec'),
+    ])
+    for name in names
+}
+
+_EXPORT_BOOLEANS = {'true': True, 't': True, '1': True, 'false': False, 'f': False, '0': False}
+
+
+def _parse_known_format(value: str) -> Optional[datetime]:
+    """Parse the export's own formats without dateutil; None if `value` is not one of them"""
+    match = _EXPORT_DATE_RE.fullmatch(value)
+    if match:
+        month_name, day, year, hour, minute, meridiem = match.groups()
+        month = _MONTHS.get(month_name.lower())
+        if month is None:
+            return None
+        if hour is None:
+            return datetime(int(year), month, int(day))
+        hour = int(hour) % 12 + (12 if meridiem in 'Pp' else 0)
+        return datetime(int(year), month, int(day), hour, int(minute))
+    if value[:4].isdigit() and value[4:5] == '-':
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+@lru_cache(maxsize=65536)
+def parse_export_datetime(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an export date ("July 30, 2023" / "July 30, 2023, 7:02 PM"); None if empty or invalid.
+
+    The known formats are matched with a precompiled regex, anything else
+    goes through dateutil. Exports repeat the same dates across many rows,
+    so results are memoized in a bounded cache.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = _parse_known_format(value)
+        return parsed if parsed is not None else date_parser.parse(value)
+    except (ValueError, OverflowError, TypeError):
+        return None
+
+
+def parse_export_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Export timestamp as an aware datetime in the export timezone"""
+    parsed = parse_export_datetime(value)
+    if parsed is None:
+        return None
+    return parsed.replace(tzinfo=EXPORT_TIMEZONE) if parsed.tzinfo is None else parsed
+
+
+def parse_export_date(value: Optional[str]) -> Optional[date]:
+    """Calendar date of an export date/timestamp string"""
+    parsed = parse_export_datetime(value)
+    return parsed.date() if parsed else None
+
+
+def format_export_date(value: Optional[date]) -> Optional[str]:
+    """date -> "January 5, 2026" (the export's own format)"""
+    if value is None:
+        return None
+    return f"{value:%B} {value.day}, {value.year}"
+
+
+def split_scheme_names(value: Optional[str]) -> List[str]:
+    """Split a bracketed scheme list "[Fund A (G), Fund B (G)]" into names"""
+    if not value:
+        return []
+    value = value.strip()
+    if value.startswith('[') and value.endswith(']'):
+        return [name.strip() for name in value[1:-1].split(',') if name.strip()]
+    return [value] if value else []
+
+
+def is_step_up_enabled(increment_amount: Optional[float], increment_percentage: Optional[float]) -> bool:
+    """A SIP steps up if either increment is configured"""
+    return bool(increment_amount or 0) or bool(increment_percentage or 0)
+
+
+def parse_export_bool(value) -> Optional[bool]:
+    """Export flag ("true" / "false") -> bool; None if missing or unrecognised"""
+    if value is None or isinstance(value, bool):
+        return value
+    return _EXPORT_BOOLEANS.get(str(value).strip().lower())
+
+
+def parse_rating(value) -> Optional[float]:
+    """Numeric w_rating ("2.5" -> 2.5); None if missing or not a number"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+# Typed date columns per table: raw column -> typed column
+SIP_TIMESTAMP_COLUMNS = {'created_at': 'created_at_ts'}
+SIP_DATE_COLUMNS = {
+    'start_date': 'start_date_on',
+    'end_date': 'end_date_on',
+    'first_success_order_date': 'first_success_order_date_on',
+    'latest_success_order_date': 'latest_success_order_date_on',
+}
+INSURANCE_TIMESTAMP_COLUMNS = {'created_at': 'created_at_ts', 'order_date': 'order_date_ts'}
+INSURANCE_DATE_COLUMNS = {'transaction_date': 'transaction_date_on', 'policy_issue_date': 'policy_issue_date_on'}
+USER_TIMESTAMP_COLUMNS = {'created_at': 'created_at_ts', 'first_active_at': 'first_active_at_ts'}
+USER_DATE_COLUMNS = {'latest_as_on_date': 'latest_as_on_date_on'}
+PORTFOLIO_DATE_COLUMNS = {'as_on_date': 'as_on_date_on'}
+
+
+def _typed_dates(row: dict, timestamp_columns: dict, date_columns: dict) -> dict:
+    typed = {typed: parse_export_timestamp(row.get(raw)) for raw, typed in timestamp_columns.items()}
+    typed.update({typed: parse_export_date(row.get(raw)) for raw, typed in date_columns.items()})
+    return typed
+
+
+# Dictionary-encoded columns per table: raw column -> INTEGER code into
+# lookup_values (field "<table>.<raw column>"); the models expose the string
+# under the raw name
+SIP_CODED_COLUMNS = {
+    'increment_period': 'increment_period_code',
+    'sip_sales_status': 'sip_sales_status_code',
+    'current_sip_status': 'current_sip_status_code',
+}
+INSURANCE_CODED_COLUMNS = {
+    'wealth_band': 'wealth_band_code',
+    'insurance_type': 'insurance_type_code',
+    'insurer': 'insurer_code',
+}
+PORTFOLIO_CODED_COLUMNS = {
+    'category': 'category_code',
+    'amc_name': 'amc_name_code',
+    'benchmark_name': 'benchmark_name_code',
+}
+CODED_COLUMNS = {
+    'sip_records': SIP_CODED_COLUMNS,
+    'insurance_records': INSURANCE_CODED_COLUMNS,
+    'portfolio_holdings': PORTFOLIO_CODED_COLUMNS,
+}
+
+
+def lookup_field(table: str, column: str) -> str:
+    """lookup_values.field of a dictionary-encoded column"""
+    return f"{table}.{column}"
+
+
+# Derived columns per table, in the order the importers write them
+SIP_DERIVED_COLUMNS = (
+    ['step_up_enabled', 'scheme_count']
+    + list(SIP_TIMESTAMP_COLUMNS.values()) + list(SIP_DATE_COLUMNS.values())
+)
+INSURANCE_DERIVED_COLUMNS = list(INSURANCE_TIMESTAMP_COLUMNS.values()) + list(INSURANCE_DATE_COLUMNS.values())
+USER_DERIVED_COLUMNS = list(USER_TIMESTAMP_COLUMNS.values()) + list(USER_DATE_COLUMNS.values())
+PORTFOLIO_DERIVED_COLUMNS = list(PORTFOLIO_DATE_COLUMNS.values())
+
+
+def derive_sip_fields(row: dict) -> dict:
+    """Derived sip_records values for a row built from the raw export"""
+    derived = {
+        'step_up_enabled': is_step_up_enabled(row.get('increment_amount'), row.get('increment_percentage')),
+        'scheme_count': len(split_scheme_names(row.get('scheme_name'))),
+    }
+    derived.update(_typed_dates(row, SIP_TIMESTAMP_COLUMNS, SIP_DATE_COLUMNS))
+    return derived
+
+
+def derive_insurance_fields(row: dict) -> dict:
+    """Derived insurance_records values for a row built from the raw export"""
+    return _typed_dates(row, INSURANCE_TIMESTAMP_COLUMNS, INSURANCE_DATE_COLUMNS)
+
+
+def derive_user_fields(row: dict) -> dict:
+    """Derived users values for a row built from the raw export"""
+    return _typed_dates(row, USER_TIMESTAMP_COLUMNS, USER_DATE_COLUMNS)
+
+
+def derive_holding_fields(row: dict) -> dict:
+    """Derived portfolio_holdings values for a row built from the raw export"""
+    return _typed_dates(row, {}, PORTFOLIO_DATE_COLUMNS)
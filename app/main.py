@@ -187,6 +187,7 @@ def get_stopped_sip_opportunities(
     min_success_count: int = Query(3, ge=1, description="Minimum successful transactions required"),
     min_inactive_months: int = Query(2, ge=1, description="Minimum months since last success"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of results"),
+    scheme_name: Optional[str] = Query(None, description="Only SIPs that include this scheme"),
     db: Session = Depends(get_db)
 ):
     """
@@ -216,6 +217,7 @@ def get_stopped_sip_opportunities(
     - min_success_count: Minimum past successful transactions (default: 3)
     - min_inactive_months: Minimum months without success (default: 2)
     - limit: Maximum number of results (default: 100)
+    - scheme_name: Optional filter - only SIPs that include this scheme (exact name)
     
     Returns:
     - total_stopped_clients: Number of clients with stopped SIPs
@@ -228,7 +230,8 @@ def get_stopped_sip_opportunities(
         db, agent_external_id=agent_external_id,
         min_success_count=min_success_count,
         min_inactive_months=min_inactive_months,
-        limit=limit
+        limit=limit,
+        scheme_name=scheme_name
     )
 
 
@@ -509,6 +512,8 @@ def get_client_portfolio(
 @app.get("/api/portfolio/review-opportunities", response_model=schemas.PortfolioReviewResponse)
 def get_portfolio_review_opportunities(
     agent_external_id: Optional[str] = Query(None, description="Filter by agent's external ID"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     db: Session = Depends(get_db)
 ):
     """
@@ -533,14 +538,24 @@ def get_portfolio_review_opportunities(
     
     Query Parameters:
     - agent_external_id: Optional filter to show only clients of a specific agent
+    - limit: Maximum number of clients per page (default: 100)
+    - cursor: next_cursor of the previous page, to fetch the next one
     
     Returns:
     - total_clients: Number of clients with underperforming schemes
     - total_underperforming_schemes: Total count of underperforming schemes
     - total_value_underperforming: Total value across all underperforming schemes
-    - clients: List of clients with their underperforming schemes
+    - clients: Page of clients with their underperforming schemes, highest
+      underperforming value first
+    - next_cursor: Cursor of the next page (null on the last page)
     """
-    return services.get_portfolio_review_opportunities(db, agent_external_id=agent_external_id)
+    try:
+        return services.get_portfolio_review_opportunities(
+            db, agent_external_id=agent_external_id, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # Helper functions to optimize data before sending to AI
@@ -703,7 +718,7 @@ async def get_ai_dashboard_insights(
                 "agent_id": agent_id,
                 "data_summary": {
                     "portfolio_opportunities": {
-                        "total": len(portfolio_data.get("clients", [])),
+                        "total": portfolio_data.get("total_clients", 0),
                         "analyzed": len(optimized_portfolio.get("clients", []))
                     },
                     "stagnant_sips": {
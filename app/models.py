@@ -1,30 +1,77 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Text, Date
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Boolean, DateTime, Text, Date, UniqueConstraint, Index, ForeignKey, select, text
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
 
+class LookupValue(Base):
+    """Distinct values of the dictionary-encoded columns (app.derived_fields.CODED_COLUMNS)"""
+    __tablename__ = "lookup_values"
+    __table_args__ = (
+        UniqueConstraint('field', 'value', name='uq_lookup_values_field_value'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    field = Column(String, nullable=False)  # "<table>.<column>"
+    value = Column(Text, nullable=False)
+
+
+def lookup_relationship(code_column):
+    """
+    Many-to-one to the lookup_values row of a code.
+
+    Loaded on first access only: lookup_values is small, so after one SELECT
+    per distinct code a session serves it from its identity map. Queries
+    that read the string for every row join it in explicitly
+    (joinedload / an aliased join) instead.
+    """
+    return relationship(LookupValue, foreign_keys=[code_column], lazy='select', viewonly=True)
+
+
+def decoded(code_attribute: str, lookup_attribute: str):
+    """
+    Read-only string of a dictionary-encoded column.
+
+    On instances it is read from the record's lookup_values row
+    (lookup_attribute, see lookup_relationship); in queries it is a
+    scalar subquery on lookup_values (filter and group on the code instead
+    where the query is hot).
+    """
+    def fget(self):
+        lookup = getattr(self, lookup_attribute)
+        return lookup.value if lookup is not None else None
+
+    def expression(cls):
+        return select(LookupValue.value).where(
+            LookupValue.id == getattr(cls, code_attribute)
+        ).scalar_subquery()
+
+    return hybrid_property(fget, expr=expression)
+
+
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # Identifiers
     uid = Column(String, index=True, unique=True)
     user_id = Column(String, index=True, unique=True)
-    crn = Column(String, index=True)
+    crn = Column(String)
     
     # Personal Information
-    name = Column(String, index=True)
-    email = Column(String, index=True)
+    name = Column(String)
+    email = Column(String)
     phone_number = Column(String)
-    date_of_birth = Column(Date, index=True)  # Mock data, to be updated later
+    date_of_birth = Column(Date)  # Mock data, to be updated later
     
     # Agent Information
     agent_external_id = Column(String, index=True)
     agent_name = Column(String)
     agent_email = Column(String)
     agent_phone_number = Column(String)
-    member_id = Column(String, index=True)
+    member_id = Column(String)
     
     # Portfolio Values - Current
     total_current_value = Column(Float, index=True)
@@ -49,7 +96,7 @@ class User(Base):
     
     # Activity Dates
     latest_as_on_date = Column(String)
-    first_active_at = Column(String, index=True)
+    first_active_at = Column(String)
     first_active_mf = Column(String)
     first_active_fd = Column(String)
     first_active_insurance = Column(String)
@@ -63,7 +110,12 @@ class User(Base):
     # Record Metadata
     inserted_at = Column(String)
     event_date = Column(String)
-    created_at = Column(String, index=True)
+    created_at = Column(String)
+    
+    # Typed dates, parsed at import time (see app/derived_fields.py)
+    created_at_ts = Column(DateTime(timezone=True))
+    first_active_at_ts = Column(DateTime(timezone=True))
+    latest_as_on_date_on = Column(Date)
     
     # Database Metadata
     created_in_db = Column(DateTime(timezone=True), server_default=func.now())
@@ -72,31 +124,41 @@ class User(Base):
 
 class InsuranceRecord(Base):
     __tablename__ = "insurance_records"
+    # Partial indexes over live rows; services filter with `~InsuranceRecord.deleted`
+    # so the planner can match these conditions
+    __table_args__ = (
+        Index('ix_insurance_records_live_user_id', 'user_id', postgresql_where=text('NOT deleted')),
+        Index('ix_insurance_records_live_agent_id', 'agent_id', postgresql_where=text('NOT deleted')),
+        Index('ix_insurance_records_live_opportunity_score', 'opportunity_score',
+              postgresql_where=text('NOT deleted')),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # Identifiers
-    uid = Column(String, index=True)
+    uid = Column(String)
     source_id = Column(String, index=True, unique=True)
-    deleted = Column(String)
+    deleted = Column(Boolean)
     checksum = Column(String)
     
     # Client Information
-    user_id = Column(String, index=True)  # itf.user_id
-    name = Column(String, index=True)
+    user_id = Column(String)  # itf.user_id
+    name = Column(String)
     mf_current_value = Column(Float)
-    wealth_band = Column(String, index=True)
+    wealth_band_code = Column(Integer, ForeignKey('lookup_values.id'))
+    wealth_band_lookup = lookup_relationship(wealth_band_code)
+    wealth_band = decoded('wealth_band_code', 'wealth_band_lookup')
     mock_age = Column(Integer)
     
     # Transaction Details
-    transaction_date = Column(String, index=True)
+    transaction_date = Column(String)
     transaction_amount = Column(Float)
     transaction_type = Column(String)
     transaction_category = Column(String)
     instrument_type = Column(String)
     product_name = Column(String)
-    transaction_status = Column(String, index=True)
-    order_status = Column(String, index=True)
+    transaction_status = Column(String)
+    order_status = Column(String)
     
     # Dates
     event_date = Column(String)
@@ -113,10 +175,14 @@ class InsuranceRecord(Base):
     
     # Insurance Specific
     insurance_order_id = Column(String)
-    insurance_type = Column(String, index=True)  # ULIP, Traditional, Health, Term, etc.
+    insurance_type_code = Column(Integer, ForeignKey('lookup_values.id'))
+    insurance_type_lookup = lookup_relationship(insurance_type_code)
+    insurance_type = decoded('insurance_type_code', 'insurance_type_lookup')  # ULIP, Traditional, Health, Term, etc.
     sourcing_channel = Column(String)
     user_product_id = Column(String)
-    insurer = Column(String, index=True)
+    insurer_code = Column(Integer, ForeignKey('lookup_values.id'))
+    insurer_lookup = lookup_relationship(insurer_code)
+    insurer = decoded('insurer_code', 'insurer_lookup')
     premium_frequency = Column(String)
     policy_issue_date = Column(String)
     policy_number = Column(String)
@@ -125,16 +191,22 @@ class InsuranceRecord(Base):
     premium = Column(Float)
     
     # Agent Information
-    agent_id = Column(String, index=True)
-    agent_external_id = Column(String, index=True)  # itf.agent_external_id
-    member_id = Column(String, index=True)
+    agent_id = Column(String)
+    agent_external_id = Column(String)  # itf.agent_external_id
+    member_id = Column(String)
     b_agent_external_id = Column(String)  # b.agent_external_id
     
     # Opportunity Metrics
     total_premium = Column(Float)
     baseline_expected_premium = Column(Float)
-    premium_gap = Column(Float, index=True)
-    opportunity_score = Column(Integer, index=True)
+    premium_gap = Column(Float)
+    opportunity_score = Column(Integer)
+    
+    # Typed dates, parsed at import time (see app/derived_fields.py)
+    created_at_ts = Column(DateTime(timezone=True))
+    order_date_ts = Column(DateTime(timezone=True))
+    transaction_date_on = Column(Date)
+    policy_issue_date_on = Column(Date)
     
     # Metadata
     created_in_db = Column(DateTime(timezone=True), server_default=func.now())
@@ -143,19 +215,34 @@ class InsuranceRecord(Base):
 
 class SIPRecord(Base):
     __tablename__ = "sip_records"
-    
-    id = Column(Integer, primary_key=True, index=True)
+    # Partial indexes for the opportunity queries; services filter with plain
+    # boolean predicates (`~SIPRecord.deleted`, `SIPRecord.is_active`) so the
+    # planner can match these conditions
+    __table_args__ = (
+        Index('ix_sip_records_live_user_id', 'user_id', postgresql_where=text('NOT deleted')),
+        Index('ix_sip_records_live_agent_id', 'agent_id', postgresql_where=text('NOT deleted')),
+        Index('ix_sip_records_live_failed_amount', 'failed_amount', postgresql_where=text('NOT deleted')),
+        Index('ix_sip_records_live_success_amount', 'success_amount', postgresql_where=text('NOT deleted')),
+        Index('ix_sip_records_live_active_latest_success', 'latest_success_order_date_on',
+              postgresql_where=text('NOT deleted AND is_active')),
+        Index('ix_sip_records_active_no_step_up_created_at', 'created_at_ts',
+              postgresql_where=text('is_active AND NOT step_up_enabled')),
+        # Agent-scoped stagnant / stopped SIP lookups
+        Index('ix_sip_records_agent_external_id_is_active_deleted', 'agent_external_id', 'is_active', 'deleted'),
+    )
+    
+    id = Column(Integer, primary_key=True)
     
     # Identifiers
-    uid = Column(String, index=True)
+    uid = Column(String)
     sip_meta_id = Column(String, index=True, unique=True)
-    user_id = Column(String, index=True)
+    user_id = Column(String)
     goal_id = Column(String)
     
     # Agent/Advisor Information
-    agent_id = Column(String, index=True)
-    agent_external_id = Column(String, index=True)
-    member_id = Column(String, index=True)
+    agent_id = Column(String)
+    agent_external_id = Column(String)
+    member_id = Column(String)
     
     # SIP Details
     amount = Column(Float)
@@ -168,7 +255,7 @@ class SIPRecord(Base):
     created_at = Column(String)
     sip_meta_date = Column(String)
     sip_meta_month = Column(String)
-    start_date = Column(String, index=True)
+    start_date = Column(String)
     end_date = Column(String)
     event_date = Column(String)
     inserted_at = Column(String)
@@ -176,7 +263,9 @@ class SIPRecord(Base):
     # Increment Configuration
     increment_percentage = Column(Float)
     increment_amount = Column(Float)
-    increment_period = Column(String, index=True)
+    increment_period_code = Column(Integer, ForeignKey('lookup_values.id'))
+    increment_period_lookup = lookup_relationship(increment_period_code)
+    increment_period = decoded('increment_period_code', 'increment_period_lookup')
     
     # Pause Information
     paused_from = Column(String)
@@ -184,20 +273,24 @@ class SIPRecord(Base):
     paused_reason = Column(String)
     
     # Status Fields
-    is_active = Column(String)
-    sip_sales_status = Column(String, index=True)
-    current_sip_status = Column(String, index=True)
+    is_active = Column(Boolean)
+    sip_sales_status_code = Column(Integer, ForeignKey('lookup_values.id'))
+    sip_sales_status_lookup = lookup_relationship(sip_sales_status_code)
+    sip_sales_status = decoded('sip_sales_status_code', 'sip_sales_status_lookup')
+    current_sip_status_code = Column(Integer, ForeignKey('lookup_values.id'))
+    current_sip_status_lookup = lookup_relationship(current_sip_status_code)
+    current_sip_status = decoded('current_sip_status_code', 'current_sip_status_lookup')
     
     # Mandate Information
-    had_mandate_at_creation = Column(String)
-    has_current_mandate = Column(String)
+    had_mandate_at_creation = Column(Boolean)
+    has_current_mandate = Column(Boolean)
     mandate_tracking_status = Column(String)
     mandate_confirmed_date = Column(String)
     
     # Order Dates
     first_order_nav_allocated_at = Column(String)
-    first_success_order_date = Column(String, index=True)
-    latest_success_order_date = Column(String, index=True)
+    first_success_order_date = Column(String)
+    latest_success_order_date = Column(String)
     first_success_order_month = Column(String)
     latest_success_order_month = Column(String)
     
@@ -210,29 +303,70 @@ class SIPRecord(Base):
     success_count = Column(Integer)
     
     # Flags
-    stepper_enabled = Column(String)
-    deleted = Column(String)
+    stepper_enabled = Column(Boolean)
+    deleted = Column(Boolean)
+    
+    # Derived at import time (see app/derived_fields.py)
+    step_up_enabled = Column(Boolean)  # increment_amount or increment_percentage > 0
+    scheme_count = Column(Integer)  # Number of schemes in scheme_name
+    created_at_ts = Column(DateTime(timezone=True))
+    start_date_on = Column(Date)
+    end_date_on = Column(Date)
+    first_success_order_date_on = Column(Date)
+    latest_success_order_date_on = Column(Date)
     
     # Metadata
     created_in_db = Column(DateTime(timezone=True), server_default=func.now())
     updated_in_db = Column(DateTime(timezone=True), onupdate=func.now())
 
 
+class Scheme(Base):
+    """Distinct scheme names referenced by SIPs"""
+    __tablename__ = "schemes"
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(Text, nullable=False, unique=True)
+    
+    # Metadata
+    created_in_db = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SIPScheme(Base):
+    """One scheme of a SIP, split from the bracketed SIPRecord.scheme_name list"""
+    __tablename__ = "sip_schemes"
+    
+    sip_id = Column(Integer, ForeignKey('sip_records.id', ondelete='CASCADE'), primary_key=True)
+    position = Column(Integer, primary_key=True)  # 1-based order within scheme_name
+    scheme_id = Column(Integer, ForeignKey('schemes.id'), nullable=False, index=True)
+
+
 class PortfolioHolding(Base):
     __tablename__ = "portfolio_holdings"
+    # Low-rated fund lookups: range on the rating, ordered/filtered by value;
+    # portfolio review: underperforming holdings per client
+    __table_args__ = (
+        Index('ix_portfolio_holdings_w_rating_numeric_current_value', 'w_rating_numeric', 'current_value'),
+        Index('ix_portfolio_holdings_underperforming_user_id', 'user_id',
+              postgresql_where=text('live_xirr < benchmark_xirr')),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # User & Basic Info
     user_id = Column(String, index=True)  # Foreign key to users table
-    pan_number = Column(String, index=True)
-    as_on_date = Column(String, index=True)
+    pan_number = Column(String)
+    as_on_date = Column(String)
+    as_on_date_on = Column(Date)  # range partition key in the partitioned layout
     
     # Scheme Identifiers
-    wpc = Column(String, index=True)  # Wealthy Product Code
-    scheme_name = Column(Text, index=True)
-    category = Column(String, index=True)
-    amc_name = Column(String, index=True)
+    wpc = Column(String)  # Wealthy Product Code
+    scheme_name = Column(Text)
+    category_code = Column(Integer, ForeignKey('lookup_values.id'))
+    category_lookup = lookup_relationship(category_code)
+    category = decoded('category_code', 'category_lookup')
+    amc_name_code = Column(Integer, ForeignKey('lookup_values.id'))
+    amc_name_lookup = lookup_relationship(amc_name_code)
+    amc_name = decoded('amc_name_code', 'amc_name_lookup')
     
     # NAV Details
     nav = Column(Float)
@@ -243,19 +377,21 @@ class PortfolioHolding(Base):
     portfolio_weight = Column(Float, index=True)
     
     # Performance Metrics
-    benchmark_name = Column(String)
+    benchmark_name_code = Column(Integer, ForeignKey('lookup_values.id'))
+    benchmark_name_lookup = lookup_relationship(benchmark_name_code)
+    benchmark_name = decoded('benchmark_name_code', 'benchmark_name_lookup')
     live_xirr = Column(Float)
     benchmark_xirr = Column(Float)
-    xirr_performance = Column(Float, index=True)  # Difference from benchmark
+    xirr_performance = Column(Float)  # Difference from benchmark
     
     # Returns
     one_year_returns = Column(Float)
     three_year_returns_cagr = Column(Float)
     benchmark_three_year_returns_cagr = Column(Float)
-    three_year_returns_alpha = Column(Float, index=True)
+    three_year_returns_alpha = Column(Float)
     five_year_returns_cagr = Column(Float)
     benchmark_five_year_returns_cagr = Column(Float)
-    five_year_returns_alpha = Column(Float, index=True)
+    five_year_returns_alpha = Column(Float)
     
     # Rolling Returns Comparison (4 quarters)
     rolling_4q_beat_count = Column(Integer)
@@ -265,7 +401,7 @@ class PortfolioHolding(Base):
     # Rolling Returns Comparison (12 quarters)
     rolling_12q_beat_count = Column(Integer)
     rolling_12q_total_count = Column(Integer)
-    rolling_12q_beat_percentage = Column(Float, index=True)
+    rolling_12q_beat_percentage = Column(Float)
     
     # Tax Information
     realized_stcg = Column(Float)
@@ -275,11 +411,36 @@ class PortfolioHolding(Base):
     cost_of_unrealized_stu = Column(Float)
     cost_of_unrealized_ltu = Column(Float)
     unrealized_stcg = Column(Float)
-    unrealized_ltcg = Column(Float, index=True)
+    unrealized_ltcg = Column(Float)
     
     # Opportunity Analysis
-    comment = Column(Text, index=True)  # Contains opportunity insights
-    w_rating = Column(String, index=True)  # Wealthy rating
+    comment = Column(Text)  # Contains opportunity insights
+    w_rating = Column(String)  # Wealthy rating
+    w_rating_numeric = Column(Float)  # w_rating parsed at import time
+    
+    # Metadata
+    created_in_db = Column(DateTime(timezone=True), server_default=func.now())
+    updated_in_db = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class ImportCheckpoint(Base):
+    """Progress of a row-by-row import, so an interrupted run can resume"""
+    __tablename__ = "import_checkpoints"
+    __table_args__ = (
+        UniqueConstraint('importer', 'file_fingerprint', name='uq_import_checkpoints_importer_file'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # File identity
+    importer = Column(String, nullable=False)  # sip, user, insurance, portfolio
+    file_path = Column(String)
+    file_size = Column(BigInteger)
+    file_fingerprint = Column(String, nullable=False)  # sha256 of the whole file
+    
+    # Progress
+    records_committed = Column(Integer, default=0)  # Records fully processed and committed
+    completed = Column(Boolean, default=False)
     
     # Metadata
     created_in_db = Column(DateTime(timezone=True), server_default=func.now())
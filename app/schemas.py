@@ -59,7 +59,7 @@ class UserResponse(UserBase):
 class InsuranceRecordBase(BaseModel):
     uid: Optional[str] = None
     source_id: Optional[str] = None
-    deleted: Optional[str] = None
+    deleted: Optional[bool] = None
     checksum: Optional[str] = None
     user_id: Optional[str] = None
     name: Optional[str] = None
@@ -159,11 +159,11 @@ class SIPRecordBase(BaseModel):
     paused_from: Optional[str] = None
     paused_till: Optional[str] = None
     paused_reason: Optional[str] = None
-    is_active: Optional[str] = None
+    is_active: Optional[bool] = None
     sip_sales_status: Optional[str] = None
     current_sip_status: Optional[str] = None
-    had_mandate_at_creation: Optional[str] = None
-    has_current_mandate: Optional[str] = None
+    had_mandate_at_creation: Optional[bool] = None
+    has_current_mandate: Optional[bool] = None
     mandate_tracking_status: Optional[str] = None
     mandate_confirmed_date: Optional[str] = None
     first_order_nav_allocated_at: Optional[str] = None
@@ -177,8 +177,8 @@ class SIPRecordBase(BaseModel):
     in_progress_amount: Optional[float] = None
     paused_amount: Optional[float] = None
     success_count: Optional[int] = None
-    stepper_enabled: Optional[str] = None
-    deleted: Optional[str] = None
+    stepper_enabled: Optional[bool] = None
+    deleted: Optional[bool] = None
 
 
 class SIPRecordResponse(SIPRecordBase):
@@ -324,6 +324,7 @@ class PortfolioReviewResponse(BaseModel):
     total_underperforming_schemes: int
     total_value_underperforming: float
     clients: List[ClientPortfolioReview]
+    next_cursor: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -390,7 +391,7 @@ class StoppedSIPOpportunity(BaseModel):
     last_success_date: Optional[str] = None
     days_since_any_success: Optional[int] = None
     months_since_success: Optional[int] = None
-    scheme_names: Optional[str] = None
+    scheme_names: Optional[List[str]] = None
     top_scheme_amount: Optional[float] = None
     
     class Config:
@@ -1,20 +1,16 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, and_, or_, desc, select
 from datetime import datetime, timedelta, date
-from dateutil import parser as date_parser
 from typing import List, Optional
-from app.models import SIPRecord, InsuranceRecord, User, PortfolioHolding
+from app.config import settings
+from app.derived_fields import EXPORT_TIMEZONE, format_export_date, lookup_field, parse_export_datetime
+from app.models import SIPRecord, InsuranceRecord, User, PortfolioHolding, Scheme, SIPScheme, LookupValue
 from app.schemas import OpportunityClient, OpportunityStats, SIPRecordResponse, InsuranceOpportunity, InsuranceRecordResponse, UserResponse, PortfolioOpportunity, PortfolioHoldingResponse
 
 
 def parse_date_safe(date_string: str) -> Optional[datetime]:
     """Safely parse date string to datetime object"""
-    if not date_string or date_string == "":
-        return None
-    try:
-        return date_parser.parse(date_string)
-    except:
-        return None
+    return parse_export_datetime(date_string)
 
 
 def get_days_since_date(date_string: str) -> Optional[int]:
@@ -33,6 +29,65 @@ def get_months_since_date(date_string: str) -> Optional[int]:
     return days // 30
 
 
+def lookup_code(table: str, column: str, value: str):
+    """Code of `value` in a dictionary-encoded column (scalar subquery, NULL if never imported)"""
+    return select(LookupValue.id).where(
+        LookupValue.field == lookup_field(table, column),
+        LookupValue.value == value
+    ).scalar_subquery()
+
+
+def get_days_since(value) -> Optional[int]:
+    """Calculate days since a typed *_on date or *_ts timestamp"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return (datetime.now(value.tzinfo) - value).days
+    return (date.today() - value).days
+
+
+def no_sip_increase_query(db: Session, agent_id: Optional[str] = None, min_months: int = 12):
+    """Active step-up SIPs that never stepped up, with their months / expected increments / potential_increase"""
+    from sqlalchemy import case
+    
+    today = date.today()
+    days_since_last = today - SIPRecord.latest_success_order_date_on
+    months_since_last = days_since_last // 30
+    months_since_start = (today - SIPRecord.start_date_on) // 30
+    
+    # Calculate expected increments based on increment_period
+    expected_increments = case(
+        (and_(SIPRecord.increment_period_code == lookup_code('sip_records', 'increment_period', "6M"),
+              months_since_start >= 6), months_since_start // 6),
+        (and_(SIPRecord.increment_period_code == lookup_code('sip_records', 'increment_period', "1Y"),
+              months_since_start >= 12), months_since_start // 12),
+        else_=0
+    )
+    
+    query = db.query(
+        SIPRecord,
+        days_since_last.label('days_since_last'),
+        months_since_last.label('months_since_last'),
+        expected_increments.label('expected_increments'),
+        (SIPRecord.amount * (SIPRecord.increment_percentage / 100)).label('potential_increase')
+    ).filter(
+        SIPRecord.is_active,
+        SIPRecord.current_sip_status_code == lookup_code('sip_records', 'current_sip_status', "Success"),
+        ~SIPRecord.deleted,
+        SIPRecord.latest_success_order_date_on <= today - timedelta(days=min_months * 30),
+        SIPRecord.increment_percentage > 0,
+        months_since_last >= max(min_months, 1),
+        # Check if amount is still same (no increments happened)
+        # This is a simplified check - in real scenario, you'd track historical changes
+        expected_increments > 0
+    )
+    
+    if agent_id:
+        query = query.filter(SIPRecord.agent_id == agent_id)
+    
+    return query
+
+
 def get_no_sip_increase_clients(
     db: Session,
     agent_id: Optional[str] = None,
@@ -45,57 +100,63 @@ def get_no_sip_increase_clients(
     - Active SIPs
     - Last success was long ago but no increment has happened
     - Has increment period configured but hasn't increased
+    
+    Months since start / last success, the expected increment count and the
+    potential increase are computed in SQL, so only `limit` rows are loaded.
     """
-    query = db.query(SIPRecord).filter(
-        SIPRecord.is_active == "true",
-        SIPRecord.current_sip_status == "Success",
-        SIPRecord.deleted == "false",
-        SIPRecord.latest_success_order_date.isnot(None),
-        SIPRecord.increment_percentage > 0
+    query = no_sip_increase_query(db, agent_id, min_months)
+    
+    # Sort by potential increase and limit; the page decodes increment_period in the same query
+    rows = query.options(joinedload(SIPRecord.increment_period_lookup)).order_by(
+        desc('potential_increase').nulls_last(), SIPRecord.id
+    ).limit(limit).all()
+    
+    opportunities = []
+    for record, days_since_last, months_since_last, expected_increments, potential_increase in rows:
+        opportunities.append(OpportunityClient(
+            user_id=record.user_id,
+            agent_id=record.agent_id or "0",
+            agent_external_id=record.agent_external_id or "unassigned",
+            opportunity_type="No SIP Increase",
+            opportunity_description=f"Client hasn't increased SIP for {months_since_last} months. Expected {expected_increments} increments based on {record.increment_period} period.",
+            current_sip_amount=record.amount,
+            potential_increase=potential_increase,
+            last_activity_date=record.latest_success_order_date,
+            days_since_activity=days_since_last,
+            total_invested=record.success_amount,
+            risk_score=min(10.0, months_since_last / 6.0)
+        ))
+    
+    return opportunities
+
+
+def failed_sip_query(db: Session, agent_id: Optional[str] = None, min_failed_amount: float = 5000.0):
+    """SIPs with a significant failed amount, with their failure_rate / potential_increase / risk_score"""
+    from sqlalchemy import case
+    
+    # Calculate failure rate
+    total_attempted = SIPRecord.success_amount + SIPRecord.failed_amount
+    failure_rate = case(
+        (total_attempted > 0, SIPRecord.failed_amount / total_attempted * 100),
+        else_=0
+    )
+    days_since_activity = date.today() - SIPRecord.latest_success_order_date_on
+    
+    query = db.query(
+        SIPRecord,
+        failure_rate.label('failure_rate'),
+        days_since_activity.label('days_since_activity'),
+        SIPRecord.failed_amount.label('potential_increase'),  # Recovering failed amount
+        func.least(10.0, failure_rate / 10.0).label('risk_score')
+    ).filter(
+        ~SIPRecord.deleted,
+        SIPRecord.failed_amount >= min_failed_amount
     )
     
     if agent_id:
         query = query.filter(SIPRecord.agent_id == agent_id)
     
-    records = query.all()
-    
-    opportunities = []
-    for record in records:
-        months_since_last = get_months_since_date(record.latest_success_order_date)
-        months_since_start = get_months_since_date(record.start_date)
-        
-        if months_since_last and months_since_start and months_since_last >= min_months:
-            # Calculate expected increments based on increment_period
-            increment_period = record.increment_period
-            expected_increments = 0
-            
-            if increment_period == "6M" and months_since_start >= 6:
-                expected_increments = months_since_start // 6
-            elif increment_period == "1Y" and months_since_start >= 12:
-                expected_increments = months_since_start // 12
-            
-            # Check if amount is still same (no increments happened)
-            # This is a simplified check - in real scenario, you'd track historical changes
-            if expected_increments > 0:
-                potential_increase = record.amount * (record.increment_percentage / 100)
-                
-                opportunities.append(OpportunityClient(
-                    user_id=record.user_id,
-                    agent_id=record.agent_id or "0",
-                    agent_external_id=record.agent_external_id or "unassigned",
-                    opportunity_type="No SIP Increase",
-                    opportunity_description=f"Client hasn't increased SIP for {months_since_last} months. Expected {expected_increments} increments based on {increment_period} period.",
-                    current_sip_amount=record.amount,
-                    potential_increase=potential_increase,
-                    last_activity_date=record.latest_success_order_date,
-                    days_since_activity=get_days_since_date(record.latest_success_order_date),
-                    total_invested=record.success_amount,
-                    risk_score=min(10.0, months_since_last / 6.0)
-                ))
-    
-    # Sort by potential increase and limit
-    opportunities.sort(key=lambda x: x.potential_increase or 0, reverse=True)
-    return opportunities[:limit]
+    return query
 
 
 def get_failed_sip_clients(
@@ -109,23 +170,18 @@ def get_failed_sip_clients(
     Criteria:
     - Has significant failed amount
     - Currently active or recently failed
-    """
-    query = db.query(SIPRecord).filter(
-        SIPRecord.deleted == "false",
-        SIPRecord.failed_amount >= min_failed_amount
-    )
     
-    if agent_id:
-        query = query.filter(SIPRecord.agent_id == agent_id)
+    Failure rate and risk score are computed in SQL; one query returns the
+    top `limit` rows.
+    """
+    query = failed_sip_query(db, agent_id, min_failed_amount)
     
-    records = query.order_by(desc(SIPRecord.failed_amount)).limit(limit * 2).all()
+    rows = query.options(joinedload(SIPRecord.current_sip_status_lookup)).order_by(
+        desc(SIPRecord.failed_amount), SIPRecord.id
+    ).limit(limit).all()
     
     opportunities = []
-    for record in records:
-        # Calculate failure rate
-        total_attempted = record.success_amount + record.failed_amount
-        failure_rate = (record.failed_amount / total_attempted * 100) if total_attempted > 0 else 0
-        
+    for record, failure_rate, days_since_activity, potential_increase, risk_score in rows:
         opportunities.append(OpportunityClient(
             user_id=record.user_id,
             agent_id=record.agent_id or "0",
@@ -133,15 +189,42 @@ def get_failed_sip_clients(
             opportunity_type="Failed SIP Transactions",
             opportunity_description=f"Failed amount: ₹{record.failed_amount:,.0f} ({failure_rate:.1f}% failure rate). Status: {record.current_sip_status}. May need mandate renewal or payment issue resolution.",
             current_sip_amount=record.amount,
-            potential_increase=record.failed_amount,  # Recovering failed amount
+            potential_increase=potential_increase,
             last_activity_date=record.latest_success_order_date,
-            days_since_activity=get_days_since_date(record.latest_success_order_date),
+            days_since_activity=days_since_activity,
             total_invested=record.success_amount,
             failed_amount=record.failed_amount,
-            risk_score=min(10.0, failure_rate / 10.0)
+            risk_score=risk_score
         ))
     
-    return opportunities[:limit]
+    return opportunities
+
+
+def high_value_inactive_query(
+    db: Session,
+    agent_id: Optional[str] = None,
+    min_invested_amount: float = 100000.0,
+    min_inactive_days: int = 60
+):
+    """High-value SIPs without a recent success, with their days_since_activity / potential_increase / risk_score"""
+    days_since_activity = date.today() - SIPRecord.latest_success_order_date_on
+    
+    query = db.query(
+        SIPRecord,
+        days_since_activity.label('days_since_activity'),
+        # Calculate potential based on current portfolio
+        (SIPRecord.amount * 1.5).label('potential_increase'),  # Suggest 50% increase or new product
+        func.least(10.0, days_since_activity / 30.0).label('risk_score')
+    ).filter(
+        ~SIPRecord.deleted,
+        SIPRecord.success_amount >= min_invested_amount,
+        SIPRecord.latest_success_order_date_on <= date.today() - timedelta(days=max(min_inactive_days, 1))
+    )
+    
+    if agent_id:
+        query = query.filter(SIPRecord.agent_id == agent_id)
+    
+    return query
 
 
 def get_high_value_inactive_clients(
@@ -158,42 +241,31 @@ def get_high_value_inactive_clients(
     - High total invested amount
     - No recent activity
     - Currently active but no recent transactions
-    """
-    query = db.query(SIPRecord).filter(
-        SIPRecord.deleted == "false",
-        SIPRecord.success_amount >= min_invested_amount,
-        SIPRecord.latest_success_order_date.isnot(None)
-    )
     
-    if agent_id:
-        query = query.filter(SIPRecord.agent_id == agent_id)
+    Days inactive, potential and risk score are computed in SQL; one query
+    returns the top `limit` rows.
+    """
+    query = high_value_inactive_query(db, agent_id, min_invested_amount, min_inactive_days)
     
-    records = query.order_by(desc(SIPRecord.success_amount)).limit(limit * 3).all()
+    rows = query.order_by(desc(SIPRecord.success_amount), SIPRecord.id).limit(limit).all()
     
     opportunities = []
-    for record in records:
-        days_since_activity = get_days_since_date(record.latest_success_order_date)
-        
-        if days_since_activity and days_since_activity >= min_inactive_days:
-            # Calculate potential based on current portfolio
-            potential_increase = record.amount * 1.5  # Suggest 50% increase or new product
-            
-            opportunities.append(OpportunityClient(
-                user_id=record.user_id,
-                agent_id=record.agent_id or "0",
-                agent_external_id=record.agent_external_id or "unassigned",
-                opportunity_type="High-Value Inactive Client",
-                opportunity_description=f"High-value client (₹{record.success_amount:,.0f} invested) inactive for {days_since_activity} days. Good candidate for portfolio review, additional products, or insurance cross-sell.",
-                current_sip_amount=record.amount,
-                potential_increase=potential_increase,
-                last_activity_date=record.latest_success_order_date,
-                days_since_activity=days_since_activity,
-                total_invested=record.success_amount,
-                risk_score=min(10.0, days_since_activity / 30.0)
-            ))
-    
-    opportunities.sort(key=lambda x: x.total_invested or 0, reverse=True)
-    return opportunities[:limit]
+    for record, days_since_activity, potential_increase, risk_score in rows:
+        opportunities.append(OpportunityClient(
+            user_id=record.user_id,
+            agent_id=record.agent_id or "0",
+            agent_external_id=record.agent_external_id or "unassigned",
+            opportunity_type="High-Value Inactive Client",
+            opportunity_description=f"High-value client (₹{record.success_amount:,.0f} invested) inactive for {days_since_activity} days. Good candidate for portfolio review, additional products, or insurance cross-sell.",
+            current_sip_amount=record.amount,
+            potential_increase=potential_increase,
+            last_activity_date=record.latest_success_order_date,
+            days_since_activity=days_since_activity,
+            total_invested=record.success_amount,
+            risk_score=risk_score
+        ))
+    
+    return opportunities
 
 
 def get_all_opportunities(
@@ -219,36 +291,41 @@ def get_opportunity_statistics(
     db: Session,
     agent_id: Optional[str] = None
 ) -> OpportunityStats:
-    """Get statistics about opportunities"""
+    """
+    Get statistics about opportunities.
     
-    # Get all opportunities
-    no_increase = get_no_sip_increase_clients(db, agent_id, limit=1000)
-    failed_sips = get_failed_sip_clients(db, agent_id, limit=1000)
-    high_value = get_high_value_inactive_clients(db, agent_id, limit=1000)
+    Counts and potential revenue are aggregates over every matching SIP of
+    each opportunity type (same criteria and defaults as the list
+    endpoints), in one statement; no opportunity rows are built.
+    """
+    from sqlalchemy import literal, union_all
     
-    total_potential = sum([
-        sum(o.potential_increase or 0 for o in no_increase),
-        sum(o.potential_increase or 0 for o in failed_sips),
-        sum(o.potential_increase or 0 for o in high_value)
-    ])
+    candidates = {
+        'no_sip_increase': no_sip_increase_query(db, agent_id).subquery(),
+        'failed_sips': failed_sip_query(db, agent_id).subquery(),
+        'high_value_inactive': high_value_inactive_query(db, agent_id).subquery()
+    }
+    by_type = db.execute(union_all(*[
+        select(
+            literal(opportunity_type).label('opportunity_type'),
+            func.count().label('count'),
+            func.coalesce(func.sum(candidate.c.potential_increase), 0).label('potential_revenue')
+        ).select_from(candidate)
+        for opportunity_type, candidate in candidates.items()
+    ])).all()
+    
+    breakdown = {
+        item.opportunity_type: {
+            'count': item.count,
+            'potential_revenue': item.potential_revenue
+        }
+        for item in by_type
+    }
     
     return OpportunityStats(
-        total_opportunities=len(no_increase) + len(failed_sips) + len(high_value),
-        total_potential_revenue=total_potential,
-        breakdown_by_type={
-            "no_sip_increase": {
-                "count": len(no_increase),
-                "potential_revenue": sum(o.potential_increase or 0 for o in no_increase)
-            },
-            "failed_sips": {
-                "count": len(failed_sips),
-                "potential_revenue": sum(o.potential_increase or 0 for o in failed_sips)
-            },
-            "high_value_inactive": {
-                "count": len(high_value),
-                "potential_revenue": sum(o.potential_increase or 0 for o in high_value)
-            }
-        }
+        total_opportunities=sum(item['count'] for item in breakdown.values()),
+        total_potential_revenue=sum(item['potential_revenue'] for item in breakdown.values()),
+        breakdown_by_type=breakdown
     )
 
 
@@ -260,7 +337,7 @@ def get_all_agents(db: Session) -> List[dict]:
         func.count(SIPRecord.id).label('total_sips'),
         func.sum(SIPRecord.success_amount).label('total_aum')
     ).filter(
-        SIPRecord.deleted == "false"
+        ~SIPRecord.deleted
     ).group_by(
         SIPRecord.agent_id,
         SIPRecord.agent_external_id
@@ -281,9 +358,13 @@ def get_all_agents(db: Session) -> List[dict]:
 
 def get_client_sip_records(db: Session, user_id: str) -> List[SIPRecordResponse]:
     """Get all SIP records for a specific client"""
-    records = db.query(SIPRecord).filter(
+    records = db.query(SIPRecord).options(
+        joinedload(SIPRecord.increment_period_lookup),
+        joinedload(SIPRecord.sip_sales_status_lookup),
+        joinedload(SIPRecord.current_sip_status_lookup)
+    ).filter(
         SIPRecord.user_id == user_id,
-        SIPRecord.deleted == "false"
+        ~SIPRecord.deleted
     ).all()
     
     return records
@@ -303,7 +384,7 @@ def get_insurance_gap_opportunities(
     These are clients paying less premium than their baseline expectation.
     """
     query = db.query(InsuranceRecord).filter(
-        InsuranceRecord.deleted == "false",
+        ~InsuranceRecord.deleted,
         InsuranceRecord.premium_gap >= min_premium_gap,
         InsuranceRecord.opportunity_score >= min_opportunity_score
     )
@@ -371,62 +452,71 @@ def get_no_insurance_clients(
     """
     Find clients with high MF investments but no insurance.
     These are high-priority cross-sell opportunities.
+    
+    One query: SIP totals per client, an anti-join against live insurance
+    records, the client name from users, then sort and limit. The agent
+    columns come from the client's earliest live SIP.
     """
-    # Get all SIP clients with high investments
-    sip_query = db.query(
+    from sqlalchemy.dialects.postgresql import aggregate_order_by
+    
+    is_insured = select(InsuranceRecord.id).where(
+        InsuranceRecord.user_id == SIPRecord.user_id,
+        ~InsuranceRecord.deleted
+    ).exists()
+    
+    # Uninsured SIP clients with high investments
+    sip_clients = select(
         SIPRecord.user_id,
-        func.sum(SIPRecord.success_amount).label('total_invested')
-    ).filter(
-        SIPRecord.deleted == "false"
+        func.sum(SIPRecord.success_amount).label('total_invested'),
+        func.array_agg(aggregate_order_by(SIPRecord.agent_id, SIPRecord.id))[1].label('agent_id'),
+        func.array_agg(aggregate_order_by(SIPRecord.agent_external_id, SIPRecord.id))[1].label('agent_external_id')
+    ).where(
+        ~SIPRecord.deleted,
+        ~is_insured
     )
     
     if agent_id:
-        sip_query = sip_query.filter(SIPRecord.agent_id == agent_id)
+        sip_clients = sip_clients.where(SIPRecord.agent_id == agent_id)
     
-    sip_clients = sip_query.group_by(SIPRecord.user_id).having(
+    sip_clients = sip_clients.group_by(SIPRecord.user_id).having(
         func.sum(SIPRecord.success_amount) >= min_mf_value
-    ).all()
+    ).subquery()
     
-    # Get all clients with insurance
-    insured_clients = set([
-        r.user_id for r in db.query(InsuranceRecord.user_id).filter(
-            InsuranceRecord.deleted == "false"
-        ).distinct().all()
-    ])
+    # Sort by MF value
+    rows = db.execute(
+        select(
+            sip_clients,
+            User.name
+        ).outerjoin(
+            User, User.user_id == sip_clients.c.user_id
+        ).order_by(
+            sip_clients.c.total_invested.desc(), sip_clients.c.user_id
+        ).limit(limit)
+    ).all()
     
     opportunities = []
-    for sip_client in sip_clients:
-        if sip_client.user_id not in insured_clients:
-            # Get client details from SIP record
-            sip_record = db.query(SIPRecord).filter(
-                SIPRecord.user_id == sip_client.user_id,
-                SIPRecord.deleted == "false"
-            ).first()
-            
-            if sip_record:
-                # Estimate expected premium based on investment
-                expected_premium = min(100000, sip_client.total_invested * 0.02)  # 2% of investment
-                
-                opportunities.append(InsuranceOpportunity(
-                    user_id=sip_client.user_id,
-                    name="Unknown",  # SIP data doesn't have name
-                    agent_id=sip_record.agent_id or "0",
-                    agent_external_id=sip_record.agent_external_id or "unassigned",
-                    opportunity_type="No Insurance Coverage",
-                    opportunity_description=f"High-value client (₹{sip_client.total_invested:,.0f} MF investment) with NO insurance coverage. High-priority cross-sell opportunity.",
-                    wealth_band="5Cr+" if sip_client.total_invested >= 5000000 else "1Cr-5Cr",
-                    age=None,
-                    mf_current_value=sip_client.total_invested,
-                    total_premium=0,
-                    baseline_expected_premium=expected_premium,
-                    premium_gap=expected_premium,
-                    opportunity_score=100,  # Highest priority
-                    missing_coverage_types=['Health', 'Term', 'ULIP', 'Traditional']
-                ))
+    for sip_client in rows:
+        # Estimate expected premium based on investment
+        expected_premium = min(100000, sip_client.total_invested * 0.02)  # 2% of investment
+        
+        opportunities.append(InsuranceOpportunity(
+            user_id=sip_client.user_id,
+            name=sip_client.name or "Unknown",
+            agent_id=sip_client.agent_id or "0",
+            agent_external_id=sip_client.agent_external_id or "unassigned",
+            opportunity_type="No Insurance Coverage",
+            opportunity_description=f"High-value client (₹{sip_client.total_invested:,.0f} MF investment) with NO insurance coverage. High-priority cross-sell opportunity.",
+            wealth_band="5Cr+" if sip_client.total_invested >= 5000000 else "1Cr-5Cr",
+            age=None,
+            mf_current_value=sip_client.total_invested,
+            total_premium=0,
+            baseline_expected_premium=expected_premium,
+            premium_gap=expected_premium,
+            opportunity_score=100,  # Highest priority
+            missing_coverage_types=['Health', 'Term', 'ULIP', 'Traditional']
+        ))
     
-    # Sort by MF value
-    opportunities.sort(key=lambda x: x.mf_current_value, reverse=True)
-    return opportunities[:limit]
+    return opportunities
 
 
 def get_insurance_renewal_opportunities(
@@ -446,9 +536,13 @@ def get_insurance_renewal_opportunities(
 
 def get_client_insurance_records(db: Session, user_id: str) -> List[InsuranceRecordResponse]:
     """Get all insurance records for a specific client"""
-    records = db.query(InsuranceRecord).filter(
+    records = db.query(InsuranceRecord).options(
+        joinedload(InsuranceRecord.wealth_band_lookup),
+        joinedload(InsuranceRecord.insurance_type_lookup),
+        joinedload(InsuranceRecord.insurer_lookup)
+    ).filter(
         InsuranceRecord.user_id == user_id,
-        InsuranceRecord.deleted == "false"
+        ~InsuranceRecord.deleted
     ).all()
     
     return records
@@ -458,32 +552,44 @@ def get_insurance_statistics(
     db: Session,
     agent_id: Optional[str] = None
 ) -> dict:
-    """Get insurance statistics"""
+    """Get insurance statistics (one aggregate query)"""
     
     query = db.query(InsuranceRecord).filter(
-        InsuranceRecord.deleted == "false"
+        ~InsuranceRecord.deleted
     )
     
     if agent_id:
         query = query.filter(InsuranceRecord.agent_id == agent_id)
     
-    total_policies = query.count()
-    total_premium = query.with_entities(func.sum(InsuranceRecord.premium)).scalar() or 0
-    total_gap = query.with_entities(func.sum(InsuranceRecord.premium_gap)).scalar() or 0
-    
-    # Group by insurance type
+    # Group by insurance type code plus a grand total row (ROLLUP), then label the groups
     by_type = query.with_entities(
-        InsuranceRecord.insurance_type,
+        func.grouping(InsuranceRecord.insurance_type_code).label('is_total'),
+        InsuranceRecord.insurance_type_code,
         func.count(InsuranceRecord.id).label('count'),
-        func.sum(InsuranceRecord.premium).label('total_premium')
-    ).group_by(InsuranceRecord.insurance_type).all()
+        func.sum(InsuranceRecord.premium).label('total_premium'),
+        func.sum(InsuranceRecord.premium_gap).label('total_gap')
+    ).group_by(func.rollup(InsuranceRecord.insurance_type_code)).subquery()
+    by_type = db.query(
+        by_type.c.is_total,
+        LookupValue.value.label('insurance_type'),
+        by_type.c.count,
+        by_type.c.total_premium,
+        by_type.c.total_gap
+    ).select_from(by_type).outerjoin(
+        LookupValue, LookupValue.id == by_type.c.insurance_type_code
+    ).all()
+    
+    totals = next(item for item in by_type if item.is_total)
+    total_policies = totals.count
+    total_premium = totals.total_premium or 0
+    total_gap = totals.total_gap or 0
     
     type_breakdown = {
         item.insurance_type or 'Unknown': {
             'count': item.count,
             'total_premium': item.total_premium or 0
         }
-        for item in by_type
+        for item in by_type if not item.is_total
     }
     
     return {
@@ -563,24 +669,29 @@ def get_user_statistics(
     db: Session,
     agent_id: Optional[str] = None
 ) -> dict:
-    """Get user statistics"""
+    """Get user statistics (one aggregate query)"""
     query = db.query(User)
     
     if agent_id:
         query = query.filter(User.agent_external_id == agent_id)
     
-    total_users = query.count()
-    total_aum = query.with_entities(func.sum(User.total_current_value)).scalar() or 0
-    total_invested = query.with_entities(func.sum(User.total_invested_value)).scalar() or 0
+    # Totals and counts by product in one scan
+    totals = query.with_entities(
+        func.count(User.id).label('total_users'),
+        func.sum(User.total_current_value).label('total_aum'),
+        func.sum(User.total_invested_value).label('total_invested'),
+        func.count(User.id).filter(User.mf_current_value > 0).label('users_with_mf'),
+        func.count(User.id).filter(User.fd_current_value > 0).label('users_with_fd'),
+        func.count(User.id).filter(User.pms_current_value > 0).label('users_with_pms'),
+        func.count(User.id).filter(User.aif_current_value > 0).label('users_with_aif'),
+        func.count(User.id).filter(User.preipo_current_value > 0).label('users_with_preipo')
+    ).one()
+    
+    total_users = totals.total_users
+    total_aum = totals.total_aum or 0
+    total_invested = totals.total_invested or 0
     avg_portfolio = total_aum / total_users if total_users > 0 else 0
     
-    # Count by product
-    users_with_mf = query.filter(User.mf_current_value > 0).count()
-    users_with_fd = query.filter(User.fd_current_value > 0).count()
-    users_with_pms = query.filter(User.pms_current_value > 0).count()
-    users_with_aif = query.filter(User.aif_current_value > 0).count()
-    users_with_preipo = query.filter(User.preipo_current_value > 0).count()
-    
     return {
         'total_users': total_users,
         'total_aum': total_aum,
@@ -589,17 +700,22 @@ def get_user_statistics(
         'total_returns': total_aum - total_invested,
         'overall_return_percentage': ((total_aum - total_invested) / total_invested * 100) if total_invested > 0 else 0,
         'product_penetration': {
-            'mutual_funds': users_with_mf,
-            'fixed_deposits': users_with_fd,
-            'pms': users_with_pms,
-            'aif': users_with_aif,
-            'preipo': users_with_preipo
+            'mutual_funds': totals.users_with_mf,
+            'fixed_deposits': totals.users_with_fd,
+            'pms': totals.users_with_pms,
+            'aif': totals.users_with_aif,
+            'preipo': totals.users_with_preipo
         }
     }
 
 
 # ==================== Portfolio Services ====================
 
+def holding_name_options() -> list:
+    """Join in the category / AMC names the portfolio opportunity lists print for every holding"""
+    return [joinedload(PortfolioHolding.category_lookup), joinedload(PortfolioHolding.amc_name_lookup)]
+
+
 def get_underperforming_funds(
     db: Session,
     user_id: Optional[str] = None,
@@ -610,7 +726,7 @@ def get_underperforming_funds(
     Find underperforming mutual funds based on negative alpha and XIRR performance.
     These are funds that should be reviewed for switching/redemption.
     """
-    query = db.query(PortfolioHolding).filter(
+    query = db.query(PortfolioHolding).options(*holding_name_options()).filter(
         or_(
             PortfolioHolding.three_year_returns_alpha < 0,
             PortfolioHolding.five_year_returns_alpha < 0,
@@ -665,29 +781,15 @@ def get_low_rated_funds(
     """
     Find low-rated funds (rating < 3.0) that should be reviewed.
     """
-    query = db.query(PortfolioHolding).filter(
-        PortfolioHolding.w_rating.isnot(None),
+    query = db.query(PortfolioHolding).options(*holding_name_options()).filter(
+        PortfolioHolding.w_rating_numeric < max_rating,
         PortfolioHolding.current_value >= min_current_value
     )
     
     if user_id:
         query = query.filter(PortfolioHolding.user_id == user_id)
     
-    holdings = query.all()
-    
-    # Filter by rating (convert string to float)
-    low_rated = []
-    for holding in holdings:
-        try:
-            rating = float(holding.w_rating)
-            if rating < max_rating:
-                low_rated.append(holding)
-        except (ValueError, TypeError):
-            continue
-    
-    # Sort by current value and limit
-    low_rated.sort(key=lambda x: x.current_value, reverse=True)
-    low_rated = low_rated[:limit]
+    low_rated = query.order_by(desc(PortfolioHolding.current_value)).limit(limit).all()
     
     opportunities = []
     for holding in low_rated:
@@ -721,7 +823,7 @@ def get_portfolio_rebalancing_opportunities(
     Find portfolios with high concentration in single funds (>25% weight).
     These may need rebalancing for better diversification.
     """
-    query = db.query(PortfolioHolding).filter(
+    query = db.query(PortfolioHolding).options(*holding_name_options()).filter(
         PortfolioHolding.portfolio_weight >= min_concentration
     )
     
@@ -777,7 +879,11 @@ def get_user_portfolio_holdings(
     limit: int = 100
 ) -> List[PortfolioHoldingResponse]:
     """Get all portfolio holdings for a specific user"""
-    holdings = db.query(PortfolioHolding).filter(
+    holdings = db.query(PortfolioHolding).options(
+        joinedload(PortfolioHolding.category_lookup),
+        joinedload(PortfolioHolding.amc_name_lookup),
+        joinedload(PortfolioHolding.benchmark_name_lookup)
+    ).filter(
         PortfolioHolding.user_id == user_id
     ).order_by(desc(PortfolioHolding.current_value)).limit(limit).all()
     
@@ -788,51 +894,49 @@ def get_portfolio_statistics(
     db: Session,
     user_id: Optional[str] = None
 ) -> dict:
-    """Get portfolio statistics"""
+    """Get portfolio statistics (one aggregate query)"""
     query = db.query(PortfolioHolding)
     
     if user_id:
         query = query.filter(PortfolioHolding.user_id == user_id)
     
-    total_holdings = query.count()
-    total_value = query.with_entities(func.sum(PortfolioHolding.current_value)).scalar() or 0
-    avg_holding_value = total_value / total_holdings if total_holdings > 0 else 0
-    
-    # Get underperforming counts
-    underperforming_count = query.filter(
-        or_(
-            PortfolioHolding.three_year_returns_alpha < 0,
-            PortfolioHolding.xirr_performance < 0
-        )
-    ).count()
-    
-    # Get low rated count
-    low_rated_count = 0
-    for holding in query.all():
-        try:
-            if holding.w_rating and float(holding.w_rating) < 3.0:
-                low_rated_count += 1
-        except (ValueError, TypeError):
-            continue
-    
-    # Get concentrated holdings
-    concentrated_count = query.filter(
-        PortfolioHolding.portfolio_weight >= 25.0
-    ).count()
-    
-    # Category breakdown
-    category_breakdown = query.with_entities(
-        PortfolioHolding.category,
+    # Category groups plus a grand total row (ROLLUP) carrying the
+    # underperforming / low rated / concentrated counts, then label the groups
+    by_category = query.with_entities(
+        func.grouping(PortfolioHolding.category_code).label('is_total'),
+        PortfolioHolding.category_code,
         func.count(PortfolioHolding.id).label('count'),
-        func.sum(PortfolioHolding.current_value).label('total_value')
-    ).group_by(PortfolioHolding.category).all()
+        func.sum(PortfolioHolding.current_value).label('total_value'),
+        func.count(PortfolioHolding.id).filter(
+            or_(
+                PortfolioHolding.three_year_returns_alpha < 0,
+                PortfolioHolding.xirr_performance < 0
+            )
+        ).label('underperforming_count'),
+        func.count(PortfolioHolding.id).filter(PortfolioHolding.w_rating_numeric < 3.0).label('low_rated_count'),
+        func.count(PortfolioHolding.id).filter(PortfolioHolding.portfolio_weight >= 25.0).label('concentrated_count')
+    ).group_by(func.rollup(PortfolioHolding.category_code)).subquery()
+    by_category = db.query(
+        by_category,
+        LookupValue.value.label('category')
+    ).select_from(by_category).outerjoin(
+        LookupValue, LookupValue.id == by_category.c.category_code
+    ).all()
+    
+    totals = next(item for item in by_category if item.is_total)
+    total_holdings = totals.count
+    total_value = totals.total_value or 0
+    avg_holding_value = total_value / total_holdings if total_holdings > 0 else 0
+    underperforming_count = totals.underperforming_count
+    low_rated_count = totals.low_rated_count
+    concentrated_count = totals.concentrated_count
     
     category_dict = {
         item.category or 'Unknown': {
             'count': item.count,
             'total_value': item.total_value or 0
         }
-        for item in category_breakdown
+        for item in by_category if not item.is_total
     }
     
     return {
@@ -848,7 +952,9 @@ def get_portfolio_statistics(
 
 def get_portfolio_review_opportunities(
     db: Session,
-    agent_external_id: Optional[str] = None
+    agent_external_id: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
     """
     Get portfolio review opportunities - underperforming schemes grouped by clients.
@@ -858,119 +964,155 @@ def get_portfolio_review_opportunities(
     - Group by client
     - Show scheme details and aggregated metrics
     
+    Clients are grouped in SQL (json_agg of their schemes, most
+    underperforming first) and paged by total underperforming value with a
+    keyset cursor; the totals come from a separate aggregate over every
+    matching holding.
+    
     Args:
         db: Database session
         agent_external_id: Optional filter by agent's external ID
+        limit: Maximum number of clients per page (default: 100)
+        cursor: next_cursor of the previous page, to continue after it
         
     Returns:
         Dictionary with client portfolio review data
     """
     from app.schemas import UnderperformingScheme, ClientPortfolioReview
-    from collections import defaultdict
+    from decimal import Decimal, InvalidOperation
+    from sqlalchemy import Numeric
+    from sqlalchemy.dialects.postgresql import aggregate_order_by
+    from sqlalchemy.orm import aliased
     
-    # Build query to get underperforming schemes with user details
-    query = db.query(
-        PortfolioHolding.user_id,
-        PortfolioHolding.wpc,
-        PortfolioHolding.scheme_name,
-        PortfolioHolding.live_xirr,
-        PortfolioHolding.benchmark_xirr,
-        PortfolioHolding.current_value,
-        PortfolioHolding.benchmark_name,
-        PortfolioHolding.category,
-        PortfolioHolding.amc_name,
-        User.name.label('client_name'),
-        User.agent_external_id,
-        User.agent_name
-    ).join(
-        User, PortfolioHolding.user_id == User.user_id
-    ).filter(
+    # Underperforming holdings of the requested clients
+    filters = [
         PortfolioHolding.live_xirr.isnot(None),
         PortfolioHolding.benchmark_xirr.isnot(None),
         PortfolioHolding.live_xirr < PortfolioHolding.benchmark_xirr,
         PortfolioHolding.current_value > 0
-    )
+    ]
     
     # Filter by agent if provided
     if agent_external_id:
-        query = query.filter(User.agent_external_id == agent_external_id)
+        filters.append(User.agent_external_id == agent_external_id)
     
-    # Execute query
-    results = query.all()
+    # Totals over every matching holding
+    totals = db.query(
+        func.count(PortfolioHolding.user_id.distinct()).label('total_clients'),
+        func.count(PortfolioHolding.id).label('total_schemes'),
+        func.sum(PortfolioHolding.current_value).label('total_value')
+    ).join(
+        User, PortfolioHolding.user_id == User.user_id
+    ).filter(*filters).one()
     
-    # Group by client
-    client_data = defaultdict(lambda: {
-        'client_name': None,
-        'agent_external_id': None,
-        'agent_name': None,
-        'schemes': [],
-        'total_value': 0.0,
-        'count': 0
-    })
+    # Page of clients by total underperforming value (highest first), summed
+    # exactly so it can serve as the page key
+    client_value = func.round(func.sum(func.cast(PortfolioHolding.current_value, Numeric)), 2)
+    page = db.query(
+        PortfolioHolding.user_id,
+        client_value.label('total_value')
+    ).join(
+        User, PortfolioHolding.user_id == User.user_id
+    ).filter(*filters).group_by(PortfolioHolding.user_id)
     
-    for row in results:
-        user_id = row.user_id
-        
-        # Calculate underperformance
-        xirr_underperformance = (row.benchmark_xirr or 0) - (row.live_xirr or 0)
-        
-        # Add scheme to client's data
-        client_data[user_id]['client_name'] = row.client_name
-        client_data[user_id]['agent_external_id'] = row.agent_external_id
-        client_data[user_id]['agent_name'] = row.agent_name
-        client_data[user_id]['total_value'] += row.current_value or 0
-        client_data[user_id]['count'] += 1
-        
-        client_data[user_id]['schemes'].append(
-            UnderperformingScheme(
-                wpc=row.wpc or '',
-                scheme_name=row.scheme_name or '',
-                live_xirr=row.live_xirr,
-                benchmark_xirr=row.benchmark_xirr,
-                xirr_underperformance=round(xirr_underperformance, 2) if xirr_underperformance else None,
-                current_value=row.current_value or 0,
-                benchmark_name=row.benchmark_name,
-                category=row.category,
-                amc_name=row.amc_name
-            )
-        )
+    # Continue after the last client of the previous page ("<total value>:<user_id>")
+    if cursor:
+        last_value, _, last_user_id = cursor.partition(':')
+        try:
+            last_value = Decimal(last_value)
+        except InvalidOperation:
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        page = page.having(or_(
+            client_value < last_value,
+            and_(client_value == last_value, PortfolioHolding.user_id > last_user_id)
+        ))
+    page = page.order_by(client_value.desc(), PortfolioHolding.user_id).limit(limit).subquery()
+    
+    # Schemes of the page's clients only, ordered by underperformance (highest first);
+    # the coded columns are decoded by joining lookup_values once per column
+    benchmark_name = aliased(LookupValue)
+    category = aliased(LookupValue)
+    amc_name = aliased(LookupValue)
+    xirr_underperformance = PortfolioHolding.benchmark_xirr - PortfolioHolding.live_xirr
+    schemes = func.json_agg(aggregate_order_by(
+        func.json_build_object(
+            'wpc', PortfolioHolding.wpc,
+            'scheme_name', PortfolioHolding.scheme_name,
+            'live_xirr', PortfolioHolding.live_xirr,
+            'benchmark_xirr', PortfolioHolding.benchmark_xirr,
+            'current_value', PortfolioHolding.current_value,
+            'benchmark_name', benchmark_name.value,
+            'category', category.value,
+            'amc_name', amc_name.value
+        ),
+        xirr_underperformance.desc(), PortfolioHolding.id
+    ))
+    rows = db.query(
+        page.c.user_id,
+        User.name.label('client_name'),
+        User.agent_external_id,
+        User.agent_name,
+        func.count(PortfolioHolding.id).label('scheme_count'),
+        page.c.total_value,
+        schemes.label('schemes')
+    ).select_from(PortfolioHolding).join(
+        page, PortfolioHolding.user_id == page.c.user_id
+    ).join(
+        User, PortfolioHolding.user_id == User.user_id
+    ).outerjoin(
+        benchmark_name, PortfolioHolding.benchmark_name_lookup.of_type(benchmark_name)
+    ).outerjoin(
+        category, PortfolioHolding.category_lookup.of_type(category)
+    ).outerjoin(
+        amc_name, PortfolioHolding.amc_name_lookup.of_type(amc_name)
+    ).filter(*filters).group_by(
+        User.id, page.c.user_id, page.c.total_value
+    ).order_by(
+        page.c.total_value.desc(), page.c.user_id
+    ).all()
     
-    # Build client portfolio review list
     clients = []
-    total_schemes = 0
-    total_value = 0.0
-    
-    for user_id, data in client_data.items():
-        # Sort schemes by underperformance (highest first)
-        sorted_schemes = sorted(
-            data['schemes'],
-            key=lambda x: x.xirr_underperformance or 0,
-            reverse=True
-        )
+    for row in rows:
+        underperforming_schemes = []
+        for scheme in row.schemes:
+            # Calculate underperformance
+            xirr_underperformance = (scheme['benchmark_xirr'] or 0) - (scheme['live_xirr'] or 0)
+            underperforming_schemes.append(
+                UnderperformingScheme(
+                    wpc=scheme['wpc'] or '',
+                    scheme_name=scheme['scheme_name'] or '',
+                    live_xirr=scheme['live_xirr'],
+                    benchmark_xirr=scheme['benchmark_xirr'],
+                    xirr_underperformance=round(xirr_underperformance, 2) if xirr_underperformance else None,
+                    current_value=scheme['current_value'] or 0,
+                    benchmark_name=scheme['benchmark_name'],
+                    category=scheme['category'],
+                    amc_name=scheme['amc_name']
+                )
+            )
         
         clients.append(
             ClientPortfolioReview(
-                user_id=user_id,
-                client_name=data['client_name'],
-                agent_external_id=data['agent_external_id'],
-                agent_name=data['agent_name'],
-                number_of_underperforming_schemes=data['count'],
-                total_value_underperforming=round(data['total_value'], 2),
-                underperforming_schemes=sorted_schemes
+                user_id=row.user_id,
+                client_name=row.client_name,
+                agent_external_id=row.agent_external_id,
+                agent_name=row.agent_name,
+                number_of_underperforming_schemes=row.scheme_count,
+                total_value_underperforming=float(row.total_value),
+                underperforming_schemes=underperforming_schemes
             )
         )
-        
-        total_schemes += data['count']
-        total_value += data['total_value']
     
-    # Sort clients by total underperforming value (highest first)
-    clients.sort(key=lambda x: x.total_value_underperforming, reverse=True)
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = f"{rows[-1].total_value}:{rows[-1].user_id}"
     
     return {
-        'total_clients': len(clients),
-        'total_underperforming_schemes': total_schemes,
-        'total_value_underperforming': round(total_value, 2),
-        'clients': clients
+        'total_clients': totals.total_clients,
+        'total_underperforming_schemes': totals.total_schemes,
+        'total_value_underperforming': round(totals.total_value or 0, 2),
+        'clients': clients,
+        'next_cursor': next_cursor
     }
 
 
@@ -985,7 +1127,7 @@ def get_stagnant_sip_opportunities(
     Find stagnant SIPs - SIPs that haven't increased in the last N months and have step-up disabled.
     
     Criteria:
-    - Must be active (is_active = "true")
+    - Must be active (is_active)
     - Created more than min_months ago
     - No step-up configured (increment_amount = 0/NULL AND increment_percentage = 0/NULL)
     - Optionally filtered by agent_id or agent_external_id
@@ -1001,8 +1143,32 @@ def get_stagnant_sip_opportunities(
         Dictionary with stagnant SIP opportunities
     """
     from app.schemas import StagnantSIPOpportunity
-    from datetime import datetime
-    from dateutil import parser as date_parser
+    
+    # Stagnant for min_months calendar months: created before the first day
+    # of the month after (current month - min_months), in the export's timezone
+    current_date = datetime.now(EXPORT_TIMEZONE)
+    month_index = current_date.year * 12 + (current_date.month - 1) - min_months + 1
+    created_before = datetime(month_index // 12, month_index % 12 + 1, 1, tzinfo=EXPORT_TIMEZONE)
+    
+    filters = [
+        SIPRecord.is_active,
+        ~SIPRecord.step_up_enabled,
+        SIPRecord.scheme_count > 0,
+        SIPRecord.created_at_ts < created_before
+    ]
+    
+    # Filter by agent if provided (prefer external_id over internal id)
+    if agent_external_id:
+        filters.append(SIPRecord.agent_external_id == agent_external_id)
+    elif agent_id:
+        filters.append(SIPRecord.agent_id == agent_id)
+    
+    # Totals over every stagnant SIP, not just the returned page
+    totals = db.query(
+        func.count(SIPRecord.id),
+        func.count(SIPRecord.user_id.distinct()),
+        func.coalesce(func.sum(SIPRecord.amount), 0)
+    ).filter(*filters).one()
     
     # Build query
     query = db.query(
@@ -1011,10 +1177,7 @@ def get_stagnant_sip_opportunities(
         SIPRecord.scheme_name,
         SIPRecord.amount,
         SIPRecord.created_at,
-        SIPRecord.increment_amount,
-        SIPRecord.increment_percentage,
-        SIPRecord.is_active,
-        SIPRecord.current_sip_status,
+        SIPRecord.created_at_ts,
         SIPRecord.success_amount,
         SIPRecord.agent_id,
         SIPRecord.agent_external_id,
@@ -1022,68 +1185,32 @@ def get_stagnant_sip_opportunities(
         User.agent_name
     ).outerjoin(
         User, SIPRecord.user_id == User.user_id
-    ).filter(
-        SIPRecord.is_active == "true",
-        # sheme name should 
-        SIPRecord.scheme_name.isnot(None),
-        SIPRecord.scheme_name != "[]",
-        SIPRecord.scheme_name != ""
-    )
-    
-    # Filter by agent if provided (prefer external_id over internal id)
-    if agent_external_id:
-        query = query.filter(SIPRecord.agent_external_id == agent_external_id)
-    elif agent_id:
-        query = query.filter(SIPRecord.agent_id == agent_id)
+    ).filter(*filters)
     
-    # Get all records
-    results = query.all()
+    # Oldest first (most months stagnant) and limit
+    results = query.order_by(SIPRecord.created_at_ts).limit(limit).all()
     
-    # Filter and process
     opportunities = []
-    current_date = datetime.now()
-    
     for row in results:
-        # Check if step-up is disabled
-        increment_amount = row.increment_amount or 0
-        increment_percentage = row.increment_percentage or 0
-        
-        if increment_amount == 0 and increment_percentage == 0:
-            # Calculate months stagnant
-            created_at = parse_date_safe(row.created_at)
-            if created_at:
-                months_diff = (current_date.year - created_at.year) * 12 + (current_date.month - created_at.month)
-                
-                # Only include if stagnant for at least min_months
-                if months_diff >= min_months:
-                    opportunities.append(
-                        StagnantSIPOpportunity(
-                            user_id=row.user_id or '',
-                            user_name=row.user_name,
-                            agent_id=row.agent_id,
-                            agent_external_id=row.agent_external_id,
-                            agent_name=row.agent_name,
-                            sip_meta_id=row.sip_meta_id or '',
-                            scheme_name=row.scheme_name,
-                            current_sip=row.amount or 0,
-                            created_at=row.created_at,
-                            months_stagnant=months_diff,
-                            # increment_amount=row.increment_amount,
-                            # increment_percentage=row.increment_percentage,
-                            # is_active=row.is_active,
-                            # current_sip_status=row.current_sip_status,
-                            success_amount=row.success_amount
-                        )
-                    )
-    
-    # Sort by months stagnant (oldest first) and limit
-    opportunities.sort(key=lambda x: x.months_stagnant or 0, reverse=True)
-    opportunities = opportunities[:limit]
-    
-    # Calculate totals
-    total_sips = len(opportunities)
-    unique_clients = len(set(opp.user_id for opp in opportunities))
-    total_sip_value = sum(opp.current_sip for opp in opportunities)
+        created_at = row.created_at_ts.astimezone(EXPORT_TIMEZONE)
+        months_diff = (current_date.year - created_at.year) * 12 + (current_date.month - created_at.month)
+        opportunities.append(
+            StagnantSIPOpportunity(
+                user_id=row.user_id or '',
+                user_name=row.user_name,
+                agent_id=row.agent_id,
+                agent_external_id=row.agent_external_id,
+                agent_name=row.agent_name,
+                sip_meta_id=row.sip_meta_id or '',
+                scheme_name=row.scheme_name,
+                current_sip=row.amount or 0,
+                created_at=row.created_at,
+                months_stagnant=months_diff,
+                success_amount=row.success_amount
+            )
+        )
+    
+    total_sips, unique_clients, total_sip_value = totals
     
     return {
         'total_stagnant_sips': total_sips,
@@ -1098,7 +1225,8 @@ def get_stopped_sip_opportunities(
     agent_external_id: Optional[str] = None,
     min_success_count: int = 3,
     min_inactive_months: int = 2,
-    limit: int = 100
+    limit: int = 100,
+    scheme_name: Optional[str] = None
 ):
     """
     Find stopped SIPs - SIPs that are active but haven't had successful payments recently.
@@ -1117,39 +1245,87 @@ def get_stopped_sip_opportunities(
         min_success_count: Minimum successful transactions required (default: 3)
         min_inactive_months: Minimum months since last success (default: 2)
         limit: Maximum number of results (default: 100)
+        scheme_name: Optional filter - only SIPs that include this scheme
         
     Returns:
         Dictionary with stopped SIP opportunities
     """
     from app.schemas import StoppedSIPOpportunity
-    from datetime import datetime, timedelta
-    from sqlalchemy import func as sql_func, case
+    from sqlalchemy import func as sql_func, case, select
+    from sqlalchemy.dialects.postgresql import aggregate_order_by
+    from sqlalchemy.orm import aliased
+    
+    # SIPs holding the requested scheme (indexed join through sip_schemes)
+    scheme_sips = None
+    if scheme_name:
+        scheme_sips = select(SIPScheme.sip_id).join(
+            Scheme, Scheme.id == SIPScheme.scheme_id
+        ).where(Scheme.name == scheme_name)
     
     # Build subquery to aggregate user SIP data
     user_sip_summary = db.query(
         SIPRecord.user_id,
         SIPRecord.agent_external_id,
         sql_func.max(SIPRecord.success_count).label('max_success_count'),
-        sql_func.max(SIPRecord.latest_success_order_date).label('last_success_date'),
-        sql_func.max(SIPRecord.is_active).label('has_any_active_sip'),
+        sql_func.max(SIPRecord.latest_success_order_date_on).label('last_success_date'),
+        sql_func.bool_or(SIPRecord.is_active).label('has_any_active_sip'),
         sql_func.count(SIPRecord.id).label('total_sips'),
         sql_func.sum(
             case(
-                (SIPRecord.is_active == "true", 1),
+                (SIPRecord.is_active, 1),
                 else_=0
             )
         ).label('active_sips'),
         sql_func.sum(SIPRecord.success_amount).label('lifetime_success_amount'),
-        sql_func.string_agg(SIPRecord.scheme_name, ', ').label('scheme_names'),  
         sql_func.max(SIPRecord.amount).label('top_scheme_amount') 
     
     ).filter(
-        SIPRecord.deleted == "false"
-    ).group_by(
+        ~SIPRecord.deleted
+    )
+    if scheme_sips is not None:
+        user_sip_summary = user_sip_summary.filter(SIPRecord.id.in_(scheme_sips))
+    user_sip_summary = user_sip_summary.group_by(
         SIPRecord.user_id,
         SIPRecord.agent_external_id
     ).subquery()
     
+    # Distinct scheme names across the same SIPs, evaluated for the returned rows only
+    sip = aliased(SIPRecord)
+    scheme_names = select(
+        sql_func.array_agg(aggregate_order_by(Scheme.name.distinct(), Scheme.name))
+    ).select_from(sip).join(
+        SIPScheme, SIPScheme.sip_id == sip.id
+    ).join(
+        Scheme, Scheme.id == SIPScheme.scheme_id
+    ).where(
+        sip.user_id == user_sip_summary.c.user_id,
+        sip.agent_external_id.is_not_distinct_from(user_sip_summary.c.agent_external_id),
+        ~sip.deleted
+    )
+    if scheme_sips is not None:
+        scheme_names = scheme_names.where(sip.id.in_(scheme_sips))
+    
+    # Days since the user's last successful order, against the same "today" as the cutoff
+    today = date.today()
+    days_since_success = (today - user_sip_summary.c.last_success_date).label('days_since_any_success')
+    filters = [
+        user_sip_summary.c.max_success_count >= min_success_count,
+        user_sip_summary.c.has_any_active_sip,
+        user_sip_summary.c.last_success_date <= today - timedelta(days=min_inactive_months * 30)
+    ]
+    
+    # Filter by agent if provided
+    if agent_external_id:
+        filters.append(user_sip_summary.c.agent_external_id == agent_external_id)
+    
+    # Totals over every stopped client, not just the returned page
+    totals = db.query(
+        sql_func.count(),
+        sql_func.coalesce(sql_func.sum(user_sip_summary.c.active_sips), 0),
+        sql_func.coalesce(sql_func.sum(user_sip_summary.c.lifetime_success_amount), 0),
+        sql_func.avg(days_since_success)
+    ).filter(*filters).one()
+    
     # Main query with filters
     query = db.query(
         user_sip_summary.c.user_id,
@@ -1159,69 +1335,48 @@ def get_stopped_sip_opportunities(
         user_sip_summary.c.max_success_count,
         user_sip_summary.c.lifetime_success_amount,
         user_sip_summary.c.last_success_date,
-        user_sip_summary.c.scheme_names,
+        days_since_success,
+        scheme_names.scalar_subquery().label('scheme_names'),
         user_sip_summary.c.top_scheme_amount,
         User.name.label('user_name'),
         User.agent_name
     ).outerjoin(
         User, user_sip_summary.c.user_id == User.user_id
-    ).filter(
-        user_sip_summary.c.max_success_count >= min_success_count,
-        user_sip_summary.c.has_any_active_sip == "true"
-    )
-    
-    # Filter by agent if provided
-    if agent_external_id:
-        query = query.filter(user_sip_summary.c.agent_external_id == agent_external_id)
+    ).filter(*filters)
     
-    # Execute query
-    results = query.all()
+    # Longest since success first (most critical) and limit
+    results = query.order_by(user_sip_summary.c.last_success_date, user_sip_summary.c.user_id).limit(limit).all()
     
-    # Filter by date and process
     opportunities = []
-    current_date = datetime.now()
-    cutoff_date = current_date - timedelta(days=min_inactive_months * 30)
-    
     for row in results:
-        last_success_date = parse_date_safe(row.last_success_date)
+        days_since = row.days_since_any_success
+        months_since = days_since // 30
         
-        if last_success_date and last_success_date < cutoff_date:
-            days_since = (current_date - last_success_date).days
-            months_since = days_since // 30
-            
-            opportunities.append(
-                StoppedSIPOpportunity(
-                    user_id=row.user_id or '',
-                    user_name=row.user_name,
-                    agent_external_id=row.agent_external_id,
-                    agent_name=row.agent_name,
-                    total_sips=int(row.total_sips) if row.total_sips else 0,
-                    active_sips=int(row.active_sips) if row.active_sips else 0,
-                    max_success_count=int(row.max_success_count) if row.max_success_count else 0,
-                    lifetime_success_amount=row.lifetime_success_amount,
-                    last_success_date=row.last_success_date,
-                    days_since_any_success=days_since,
-                    months_since_success=months_since,
-                    scheme_names=row.scheme_names,
-                    top_scheme_amount=row.top_scheme_amount
-                )
+        opportunities.append(
+            StoppedSIPOpportunity(
+                user_id=row.user_id or '',
+                user_name=row.user_name,
+                agent_external_id=row.agent_external_id,
+                agent_name=row.agent_name,
+                total_sips=int(row.total_sips) if row.total_sips else 0,
+                active_sips=int(row.active_sips) if row.active_sips else 0,
+                max_success_count=int(row.max_success_count) if row.max_success_count else 0,
+                lifetime_success_amount=row.lifetime_success_amount,
+                last_success_date=format_export_date(row.last_success_date),
+                days_since_any_success=days_since,
+                months_since_success=months_since,
+                scheme_names=row.scheme_names,
+                top_scheme_amount=row.top_scheme_amount
             )
+        )
     
-    # Sort by days since success (most critical first)
-    opportunities.sort(key=lambda x: x.days_since_any_success or 0, reverse=True)
-    opportunities = opportunities[:limit]
-    
-    # Calculate totals
-    total_clients = len(opportunities)
-    total_active_sips = sum(opp.active_sips for opp in opportunities)
-    total_lifetime = sum(opp.lifetime_success_amount or 0 for opp in opportunities)
-    avg_days = sum(opp.days_since_any_success or 0 for opp in opportunities) / total_clients if total_clients > 0 else 0
+    total_clients, total_active_sips, total_lifetime, avg_days = totals
     
     return {
         'total_stopped_clients': total_clients,
-        'total_active_sips_affected': total_active_sips,
-        'total_lifetime_investment': round(total_lifetime, 2),
-        'average_days_inactive': round(avg_days, 1) if avg_days > 0 else None,
+        'total_active_sips_affected': int(total_active_sips),
+        'total_lifetime_investment': round(float(total_lifetime), 2),
+        'average_days_inactive': round(float(avg_days), 1) if avg_days else None,
         'opportunities': opportunities
     }
 
@@ -1240,12 +1395,17 @@ def get_insurance_gap_opportunities(
     1. NO_INSURANCE: Clients with no insurance and age >= min_age
     2. LOW_COVERAGE: Clients whose premium is below expected based on age and MF value
     
-    Expected premium calculation (as % of MF current value):
+    Expected premium calculation (as % of MF current value, configurable
+    through settings.INSURANCE_PREMIUM_RATE_BANDS):
     - Age < 30: 0.05%
     - Age 30-39: 0.1%
     - Age 40-49: 0.2%
     - Age 50+: 0.3%
     
+    Age, banding, classification, ordering and the limit run in SQL; the
+    totals come from a separate aggregate over every opportunity, not just
+    the returned page.
+    
     Args:
         db: Database session
         agent_external_id: Optional filter by external agent ID
@@ -1257,130 +1417,114 @@ def get_insurance_gap_opportunities(
         Dictionary with insurance gap opportunities
     """
     from app.schemas import InsuranceGapOpportunity
-    from datetime import datetime, date
-    from sqlalchemy import func as sql_func
-    
-    # Aggregate insurance premiums per user
-    insurance_agg = db.query(
-        InsuranceRecord.user_id,
-        sql_func.sum(InsuranceRecord.premium).label('total_premium')
-    ).filter(
-        InsuranceRecord.deleted == "false",
+    from sqlalchemy import func as sql_func, case, Integer, literal, true
+    
+    # Premiums of the candidate users only (one index lookup per client),
+    # not an aggregate over every insured user
+    insurance = select(
+        sql_func.coalesce(sql_func.sum(InsuranceRecord.premium), 0).label('total_premium')
+    ).where(
+        InsuranceRecord.user_id == User.user_id,
+        ~InsuranceRecord.deleted,
         InsuranceRecord.premium > 0
-    ).group_by(
-        InsuranceRecord.user_id
-    ).subquery()
+    ).lateral('insurance')
     
-    # Query users with high MF value
-    query = db.query(
+    # Users with high MF value and a known age
+    age = datetime.now().year - sql_func.cast(sql_func.extract('year', User.date_of_birth), Integer)
+    clients = select(
         User.user_id,
         User.name,
         User.agent_external_id,
         User.agent_name,
-        User.date_of_birth,
-        User.mf_current_value,
-        insurance_agg.c.total_premium
-    ).outerjoin(
-        insurance_agg, User.user_id == insurance_agg.c.user_id
-    ).filter(
-        User.mf_current_value > min_mf_value
+        age.label('age'),
+        sql_func.coalesce(User.mf_current_value, 0).label('mf_value'),
+        insurance.c.total_premium
+    ).join(
+        insurance, true()
+    ).where(
+        User.mf_current_value > min_mf_value,
+        User.date_of_birth.isnot(None)
     )
     
     # Filter by agent if provided
     if agent_external_id:
-        query = query.filter(User.agent_external_id == agent_external_id)
-    
-    # Execute query
-    results = query.all()
+        clients = clients.where(User.agent_external_id == agent_external_id)
+    clients = clients.subquery('clients')
+    
+    # Expected premium from the age band
+    bands = settings.INSURANCE_PREMIUM_RATE_BANDS
+    expected_rate = case(
+        *[(clients.c.age < age_below, literal(rate)) for age_below, rate in bands if age_below is not None],
+        else_=literal(bands[-1][1])
+    )
+    rated = select(
+        clients,
+        (clients.c.mf_value * expected_rate).label('expected_premium')
+    ).subquery('rated')
+    
+    # Classify; COVERED clients are not opportunities
+    no_insurance = and_(rated.c.total_premium == 0, rated.c.age >= min_age)
+    low_coverage = rated.c.total_premium < rated.c.expected_premium
+    insurance_status = case((no_insurance, 'NO_INSURANCE'), else_='LOW_COVERAGE')
+    premium_opportunity = case(
+        (no_insurance, rated.c.expected_premium),
+        else_=rated.c.expected_premium - rated.c.total_premium
+    )
+    gaps = select(
+        rated,
+        insurance_status.label('insurance_status'),
+        premium_opportunity.label('premium_opportunity_value')
+    ).where(
+        or_(no_insurance, low_coverage)
+    ).subquery('gaps')
+    
+    # Totals over every gap, not just the returned page
+    totals = db.execute(
+        select(
+            sql_func.count().label('total_opportunities'),
+            sql_func.count().filter(gaps.c.insurance_status == 'NO_INSURANCE').label('no_insurance_count'),
+            sql_func.coalesce(sql_func.sum(gaps.c.premium_opportunity_value), 0).label('total_opportunity_value'),
+            sql_func.coalesce(sql_func.sum(gaps.c.mf_value), 0).label('total_mf_value_at_risk'),
+            sql_func.avg(gaps.c.age).label('average_age')
+        )
+    ).one()
     
-    # Process and calculate opportunities
-    opportunities = []
-    current_year = datetime.now().year
+    # Highest opportunity first
+    results = db.execute(
+        select(gaps).order_by(
+            gaps.c.premium_opportunity_value.desc(), gaps.c.user_id
+        ).limit(limit)
+    ).all()
     
-    for row in results:
-        # Calculate age from date_of_birth
-        age = None
-        if row.date_of_birth:
-            if isinstance(row.date_of_birth, date):
-                age = current_year - row.date_of_birth.year
-            elif isinstance(row.date_of_birth, str):
-                try:
-                    dob = datetime.strptime(row.date_of_birth, '%Y-%m-%d').date()
-                    age = current_year - dob.year
-                except:
-                    pass
-        
-        # Skip if age couldn't be calculated
-        if age is None:
-            continue
-        
-        mf_value = row.mf_current_value or 0
-        total_premium = row.total_premium or 0
-        
-        # Calculate expected premium based on age
-        if age < 30:
-            expected_rate = 0.0005  # 0.05%
-        elif age < 40:
-            expected_rate = 0.001   # 0.1%
-        elif age < 50:
-            expected_rate = 0.002   # 0.2%
-        else:
-            expected_rate = 0.003   # 0.3%
-        
-        expected_premium = mf_value * expected_rate
-        
-        # Determine insurance status
-        insurance_status = None
-        premium_opportunity = 0
-        
-        if total_premium == 0 and age >= min_age:
-            insurance_status = 'NO_INSURANCE'
-            premium_opportunity = expected_premium
-        elif total_premium < expected_premium:
-            insurance_status = 'LOW_COVERAGE'
-            premium_opportunity = expected_premium - total_premium
-        else:
-            insurance_status = 'COVERED'
-            premium_opportunity = 0
-        
-        # Only include opportunities (not COVERED)
-        if insurance_status in ['NO_INSURANCE', 'LOW_COVERAGE']:
-            coverage_pct = (total_premium / expected_premium * 100) if expected_premium > 0 else 0
-            
-            opportunities.append(
-                InsuranceGapOpportunity(
-                    user_id=row.user_id or '',
-                    user_name=row.name,
-                    agent_external_id=row.agent_external_id,
-                    agent_name=row.agent_name,
-                    age=age,
-                    mf_current_value=mf_value,
-                    total_premium=total_premium,
-                    expected_premium=round(expected_premium, 2),
-                    insurance_status=insurance_status,
-                    premium_opportunity_value=round(premium_opportunity, 2),
-                    coverage_percentage=round(coverage_pct, 1)
-                )
+    opportunities = [
+        InsuranceGapOpportunity(
+            user_id=row.user_id or '',
+            user_name=row.name,
+            agent_external_id=row.agent_external_id,
+            agent_name=row.agent_name,
+            age=row.age,
+            mf_current_value=row.mf_value,
+            total_premium=row.total_premium,
+            expected_premium=round(row.expected_premium, 2),
+            insurance_status=row.insurance_status,
+            premium_opportunity_value=round(row.premium_opportunity_value, 2),
+            coverage_percentage=round(
+                row.total_premium / row.expected_premium * 100 if row.expected_premium > 0 else 0, 1
             )
+        )
+        for row in results
+    ]
     
-    # Sort by opportunity value (highest first)
-    opportunities.sort(key=lambda x: x.premium_opportunity_value, reverse=True)
-    opportunities = opportunities[:limit]
-    
-    # Calculate statistics
-    total_opps = len(opportunities)
-    no_insurance = sum(1 for opp in opportunities if opp.insurance_status == 'NO_INSURANCE')
-    low_coverage = sum(1 for opp in opportunities if opp.insurance_status == 'LOW_COVERAGE')
-    total_opp_value = sum(opp.premium_opportunity_value for opp in opportunities)
-    total_mf_value = sum(opp.mf_current_value or 0 for opp in opportunities)
-    avg_age = sum(opp.age or 0 for opp in opportunities) / total_opps if total_opps > 0 else 0
+    total_opps = totals.total_opportunities
+    no_insurance_count = totals.no_insurance_count
+    avg_age = float(totals.average_age) if totals.average_age is not None else 0
     
     return {
         'total_opportunities': total_opps,
-        'no_insurance_count': no_insurance,
-        'low_coverage_count': low_coverage,
-        'total_opportunity_value': round(total_opp_value, 2),
-        'total_mf_value_at_risk': round(total_mf_value, 2),
+        'no_insurance_count': no_insurance_count,
+        'low_coverage_count': total_opps - no_insurance_count,
+        'total_opportunity_value': round(totals.total_opportunity_value, 2),
+        'total_mf_value_at_risk': round(totals.total_mf_value_at_risk, 2),
         'average_age': round(avg_age, 1) if avg_age > 0 else None,
         'opportunities': opportunities
     }
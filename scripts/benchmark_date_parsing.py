@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark the export date parser against plain dateutil.
+
+Collects every date string of an export (or synthetic ones) and times three
+parsers over the same values:
+
+    dateutil        dateutil.parser.parse, what parse_date_safe used to call
+    known_formats   the precompiled-regex path without the cache
+    cached          parse_export_datetime (known formats + bounded cache)
+
+Usage:
+    python scripts/benchmark_date_parsing.py data/sip1.json data/user.json
+    python scripts/benchmark_date_parsing.py --synthetic 100k
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dateutil import parser as date_parser
+
+from app.derived_fields import (
+    SIP_TIMESTAMP_COLUMNS, SIP_DATE_COLUMNS,
+    INSURANCE_TIMESTAMP_COLUMNS, INSURANCE_DATE_COLUMNS,
+    USER_TIMESTAMP_COLUMNS, USER_DATE_COLUMNS,
+    parse_export_datetime,
+)
+from scripts.generate_synthetic_data import format_date, format_datetime, parse_size
+from scripts.import_utils import iter_json_array
+
+
+DATE_FIELDS = set().union(
+    SIP_TIMESTAMP_COLUMNS, SIP_DATE_COLUMNS,
+    INSURANCE_TIMESTAMP_COLUMNS, INSURANCE_DATE_COLUMNS,
+    USER_TIMESTAMP_COLUMNS, USER_DATE_COLUMNS,
+)
+
+
+def _dateutil_parse(value):
+    if not value:
+        return None
+    try:
+        return date_parser.parse(value)
+    except (ValueError, OverflowError, TypeError):
+        return None
+
+
+def _known_formats_parse(value):
+    return parse_export_datetime.__wrapped__(value)
+
+
+def _cached_parse(value):
+    return parse_export_datetime(value)
+
+
+PARSERS = {
+    'dateutil': _dateutil_parse,
+    'known_formats': _known_formats_parse,
+    'cached': _cached_parse,
+}
+
+
+def load_export_dates(json_files) -> list:
+    """Every non-empty date string found in the exports, in file order"""
+    values = []
+    for json_file in json_files:
+        for record in iter_json_array(json_file):
+            values.extend(record[field] for field in DATE_FIELDS if record.get(field))
+    return values
+
+
+def synthetic_dates(count: int, distinct_days: int = 3650, seed: int = 42) -> list:
+    """Export-formatted dates and timestamps spread over `distinct_days` days"""
+    rng = random.Random(seed)
+    start = datetime(2016, 1, 1)
+    values = []
+    for _ in range(count):
+        moment = start + timedelta(days=rng.randrange(distinct_days), minutes=rng.randrange(24 * 60))
+        values.append(format_datetime(moment) if rng.random() < 0.5 else format_date(moment))
+    return values
+
+
+def run_benchmark(values: list, rounds: int = 3) -> dict:
+    """Time each parser over `values`; returns seconds and parses/sec per parser (best round)"""
+    reference = [_dateutil_parse(value) for value in values]
+    results = {}
+    for name, parse in PARSERS.items():
+        best = None
+        for _ in range(rounds):
+            parse_export_datetime.cache_clear()
+            start = time.perf_counter()
+            parsed = [parse(value) for value in values]
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        results[name] = {
+            'seconds': round(best, 4),
+            'per_sec': round(len(values) / best) if best > 0 else None,
+            'mismatches': sum(1 for got, want in zip(parsed, reference) if got != want),
+        }
+    return results
+
+
+def print_results(values: list, results: dict):
+    print(f"\n{'='*60}")
+    print(f"📈 Date parsing: {len(values):,} values, {len(set(values)):,} distinct (best of rounds)")
+    print(f"{'='*60}")
+    print(f"{'parser':<16}{'seconds':>10}{'parses/sec':>14}{'mismatches':>14}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['seconds']:>10}{result['per_sec'] or 0:>14,}{result['mismatches']:>14}")
+
+    baseline = results['dateutil']['seconds']
+    for name in ('known_formats', 'cached'):
+        if results[name]['seconds']:
+            print(f"{name} speedup: {baseline / results[name]['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark export date parsing")
+    arg_parser.add_argument("json_files", nargs="*", help="JSON exports to take date strings from")
+    arg_parser.add_argument("--synthetic", default=None, help="Use this many synthetic dates instead, e.g. 100k")
+    arg_parser.add_argument("--rounds", type=int, default=3, help="Runs per parser; the best is reported")
+    args = arg_parser.parse_args()
+
+    if args.synthetic:
+        values = synthetic_dates(parse_size(args.synthetic))
+    elif args.json_files:
+        values = load_export_dates(args.json_files)
+    else:
+        arg_parser.error("pass JSON files or --synthetic SIZE")
+
+    print_results(values, run_benchmark(values, rounds=args.rounds))
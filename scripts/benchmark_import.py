@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+"""
+Benchmark import throughput and memory for every importer.
+
+For each export kind the row-by-row ORM importer is compared with its
+set-based counterpart (COPY + merge for sip/user, checksum sync for
+insurance); portfolio dumps only have the COPY snapshot swap. Every run
+happens in a fresh process, so the reported peak RSS belongs to that
+importer alone.
+
+WARNING: every run TRUNCATEs the target table of the kind being measured so
+all modes start from the same empty table. Point DATABASE_URL at a scratch
+database before running.
+
+Usage:
+    python scripts/benchmark_import.py data/sip1.json data/sip2.json --yes
+    python scripts/benchmark_import.py data/user.json --kind user --yes
+    python scripts/benchmark_import.py --generate 100k --yes           # all kinds
+    python scripts/benchmark_import.py --generate 1M --kind sip --yes
+"""
+
+import argparse
+import contextlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.database import engine, Base
+from scripts.generate_synthetic_data import KINDS, generate_file, parse_size
+from scripts.import_all import detect_kind, import_file, _init_worker
+from scripts.import_data import import_sip_data, bulk_import_sip_data
+from scripts.import_insurance import import_insurance_data, sync_insurance_data
+from scripts.import_portfolio import import_portfolio_data
+from scripts.import_users import import_user_data
+from scripts.import_utils import peak_rss_mb
+
+
+BENCHMARK_TABLES = {
+    'sip': 'sip_records',
+    'user': 'users',
+    'insurance': 'insurance_records',
+    'portfolio': 'portfolio_holdings',
+}
+
+# kind -> mode -> importer(path, batch_size); row-by-row importers always
+# restart so a saved checkpoint never turns a run into a no-op
+BENCHMARK_MODES = {
+    'sip': {
+        'row_by_row': lambda path, batch_size: import_sip_data(path, restart=True),
+        'bulk_copy': lambda path, batch_size: bulk_import_sip_data(path, batch_size=batch_size),
+    },
+    'user': {
+        'row_by_row': lambda path, batch_size: import_user_data(path, restart=True),
+        'bulk_copy': lambda path, batch_size: import_file('user', path, batch_size=batch_size),
+    },
+    'insurance': {
+        'row_by_row': lambda path, batch_size: import_insurance_data(path, restart=True),
+        'sync': lambda path, batch_size: sync_insurance_data(path, batch_size=batch_size),
+    },
+    'portfolio': {
+        'snapshot_swap': lambda path, batch_size: import_portfolio_data(path, batch_size=batch_size),
+    },
+}
+
+
+def truncate_table(table: str):
+    """Empty `table` (and tables referencing it, e.g. sip_schemes) so each run starts from the same state"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {table} RESTART IDENTITY CASCADE"))
+
+
+def _run_importer(kind: str, mode: str, json_files: list, batch_size: int, verbose: bool) -> tuple:
+    """Import the files in this (fresh) process; returns (seconds, peak RSS MB)"""
+    importer = BENCHMARK_MODES[kind][mode]
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        start = time.perf_counter()
+        for json_file in json_files:
+            importer(json_file, batch_size)
+        seconds = time.perf_counter() - start
+    return seconds, peak_rss_mb()
+
+
+def run_benchmark(json_files, kind: str = 'sip', rounds: int = 1, batch_size: int = 10000,
+                  verbose: bool = False) -> dict:
+    """
+    Import the given files with each mode of `kind` and measure throughput.
+
+    Each round first truncates the kind's table, so the row-by-row path pays
+    its per-record existence check against a growing table exactly as in a
+    real full reload.
+
+    Returns:
+        Dictionary keyed by mode with rows, seconds, rows_per_sec and
+        peak_rss_mb (best round)
+    """
+    table = BENCHMARK_TABLES[kind]
+    context = multiprocessing.get_context('spawn')
+    results = {}
+
+    for mode in BENCHMARK_MODES[kind]:
+        runs = []
+        rows = 0
+        for _ in range(rounds):
+            truncate_table(table)
+            engine.dispose()
+            with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker) as executor:
+                runs.append(executor.submit(_run_importer, kind, mode, list(json_files),
+                                            batch_size, verbose).result())
+
+            with engine.connect() as conn:
+                rows = conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+        best, peak = min(runs)
+        results[mode] = {
+            'rows': rows,
+            'seconds': round(best, 3),
+            'rows_per_sec': round(rows / best, 1) if best > 0 else None,
+            'peak_rss_mb': round(peak, 1) if peak is not None else None
+        }
+
+    return results
+
+
+def print_results(kind: str, results: dict):
+    print(f"\n{'='*70}")
+    print(f"📈 {kind} import benchmark (best of rounds)")
+    print(f"{'='*70}")
+    print(f"{'mode':<14}{'rows':>10}{'seconds':>12}{'rows/sec':>14}{'peak RSS MB':>14}")
+    for mode, result in results.items():
+        print(f"{mode:<14}{result['rows']:>10}{result['seconds']:>12}{result['rows_per_sec'] or 0:>14}"
+              f"{result['peak_rss_mb'] or '-':>14}")
+
+    modes = list(results)
+    row_by_row = results.get('row_by_row', {}).get('seconds')
+    fastest = results[modes[-1]]['seconds'] if len(modes) > 1 else None
+    if row_by_row and fastest:
+        print(f"\n{modes[-1]} speedup: {row_by_row / fastest:.1f}x")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark import paths (truncates the benchmarked tables!)")
+    arg_parser.add_argument("json_files", nargs="*", help="JSON exports to import (all of one kind)")
+    arg_parser.add_argument("--kind", choices=KINDS + ['all'], default=None,
+                            help="Export kind (auto-detected from the files; 'all' with --generate)")
+    arg_parser.add_argument("--generate", default=None,
+                            help="Benchmark synthetic exports of this size instead, e.g. 10k, 1M, 10M")
+    arg_parser.add_argument("--out-dir", default=None,
+                            help="Keep generated files here (default: a temporary directory)")
+    arg_parser.add_argument("--rounds", type=int, default=1, help="Runs per mode; the best is reported")
+    arg_parser.add_argument("--batch-size", type=int, default=10000, help="COPY batch size for set-based modes")
+    arg_parser.add_argument("--verbose", action="store_true", help="Show the importers' own output")
+    arg_parser.add_argument("--yes", action="store_true", help="Confirm that the benchmarked tables may be truncated")
+    args = arg_parser.parse_args()
+
+    if not args.yes:
+        print("This benchmark TRUNCATEs the tables it imports into. Re-run with --yes against a scratch database.")
+        sys.exit(1)
+
+    if args.generate:
+        kinds = KINDS if args.kind in (None, 'all') else [args.kind]
+        rows = parse_size(args.generate)
+        out_dir = args.out_dir or tempfile.mkdtemp(prefix="wealthy_benchmark_")
+        files_by_kind = {}
+        for kind in kinds:
+            path = os.path.join(out_dir, f"synthetic_{kind}_{args.generate}.json")
+            if not os.path.exists(path):
+                print(f"📝 Generating {rows:,} {kind} rows -> {path}")
+                generate_file(kind, rows, path)
+            files_by_kind[kind] = [path]
+    else:
+        if not args.json_files:
+            arg_parser.error("pass JSON files or --generate SIZE")
+        for json_file in args.json_files:
+            if not os.path.exists(json_file):
+                print(f"Error: File not found: {json_file}")
+                sys.exit(1)
+        if args.kind == 'all':
+            arg_parser.error("--kind all needs --generate")
+        kind = args.kind or detect_kind(args.json_files[0])
+        files_by_kind = {kind: args.json_files}
+
+    for kind, json_files in files_by_kind.items():
+        print(f"\n⏱️  Benchmarking {kind} import ({', '.join(os.path.basename(f) for f in json_files)})...")
+        print_results(kind, run_benchmark(json_files, kind=kind, rounds=args.rounds,
+                                          batch_size=args.batch_size, verbose=args.verbose))
@@ -0,0 +1,231 @@
+"""
+Helpers for streaming rows into PostgreSQL with COPY.
+
+The importers build plain column dictionaries per record. These helpers write
+them into a staging table through COPY (one round trip per batch instead of
+one INSERT per row) so they can be merged into the real table with a single
+set-based statement.
+"""
+
+import io
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+def copy_value(value) -> str:
+    """Encode a Python value for COPY ... FROM STDIN (text format)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    text = str(value)
+    return (
+        text.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_rows(cursor, table: str, columns: Sequence[str], rows: Iterable[Dict]) -> int:
+    """
+    COPY a batch of row dictionaries into `table`.
+
+    Args:
+        cursor: psycopg2 cursor (from engine.raw_connection())
+        table: Target table (usually a TEMP staging table)
+        columns: Column names, in the order they are written
+        rows: Row dictionaries keyed by column name
+
+    Returns:
+        Number of rows written
+    """
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write("\t".join(copy_value(row.get(column)) for column in columns))
+        buffer.write("\n")
+        count += 1
+
+    if count:
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN",
+            buffer
+        )
+    return count
+
+
+def create_staging_table(cursor, staging_table: str, source_table: str, columns: List[str]):
+    """
+    Create a TEMP staging table with the same column types as `source_table`.
+
+    A `seq` column records file order so the merge can keep the last
+    occurrence of a key that appears more than once in one import.
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+    cursor.execute(
+        f"CREATE TEMP TABLE {staging_table} AS "
+        f"SELECT {', '.join(columns)} FROM {source_table} WITH NO DATA"
+    )
+    cursor.execute(f"ALTER TABLE {staging_table} ADD COLUMN seq BIGINT")
+
+
+def partition_key_columns(cursor, table: str) -> List[str]:
+    """Partition key columns of `table`; empty for a plain (unpartitioned) table"""
+    cursor.execute("""
+        SELECT a.attname
+        FROM pg_partitioned_table p
+        CROSS JOIN LATERAL unnest(p.partattrs::int2[]) WITH ORDINALITY AS k(attnum, position)
+        JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = k.attnum
+        WHERE p.partrelid = to_regclass(%s)
+        ORDER BY k.position
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def bulk_merge(
+    connection,
+    rows: Iterable[Dict],
+    table: str,
+    columns: List[str],
+    conflict_column: Optional[str] = None,
+    update_existing: bool = False,
+    batch_size: int = 10000
+) -> dict:
+    """
+    Stage `rows` with COPY and merge them into `table` with one INSERT.
+
+    Merge behaviour:
+    - conflict_column + update_existing: INSERT ... ON CONFLICT (conflict_column)
+      DO UPDATE, only rewriting rows whose values changed; the last occurrence
+      of a key in the input wins
+    - conflict_column only: INSERT ... ON CONFLICT DO NOTHING; the first
+      occurrence of a key wins and existing rows are left untouched
+
+    Both conflict modes insert one row per key in key order, so parallel
+    imports (import_all) of files sharing keys take their unique-index
+    locks in the same order instead of deadlocking.
+    - no conflict_column: plain INSERT of every staged row
+
+    On a partitioned table (scripts/partition_tables.py) the unique key is
+    (conflict_column, partition key). A staged row whose partition key
+    changed (e.g. a SIP moved to another agent) is first updated in place,
+    which moves it to its new partition, so a key never ends up twice.
+
+    The caller owns the transaction (commit/rollback on `connection`).
+
+    Returns:
+        Dictionary with staged / inserted / updated / skipped counts
+    """
+    staging_table = f"{table}_stage"
+    cursor = connection.cursor()
+    create_staging_table(cursor, staging_table, table, columns)
+    stage_columns = columns + ['seq']
+
+    staged = 0
+    batch = []
+    for seq, row in enumerate(rows):
+        row['seq'] = seq
+        batch.append(row)
+        if len(batch) >= batch_size:
+            staged += copy_rows(cursor, staging_table, stage_columns, batch)
+            batch = []
+            print(f"   Staged {staged} {table} rows...")
+    staged += copy_rows(cursor, staging_table, stage_columns, batch)
+
+    column_list = ", ".join(columns)
+    partition_keys = partition_key_columns(cursor, table)
+    key_columns = [c for c in partition_keys if c != conflict_column]
+    conflict_target = ", ".join([conflict_column] + key_columns) if conflict_column else None
+
+    if conflict_column and update_existing:
+        update_columns = [c for c in columns if c != conflict_column]
+        set_clause = ",\n                ".join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+        current_values = ", ".join(f"{table}.{c}" for c in update_columns)
+        incoming_values = ", ".join(f"EXCLUDED.{c}" for c in update_columns)
+        # xmax (inserted vs updated) cannot be read through a partitioned table,
+        # so there the new keys are counted before merging
+        inserted_flag = "(xmax = 0)"
+        new_keys = moved = 0
+        if partition_keys:
+            inserted_flag = "NULL::boolean"
+            cursor.execute(f"""
+                SELECT count(*) FROM (SELECT DISTINCT {conflict_column} FROM {staging_table}) s
+                WHERE s.{conflict_column} IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{conflict_column} = s.{conflict_column})
+            """)
+            new_keys = cursor.fetchone()[0]
+        if key_columns:
+            move_clause = ",\n                ".join(f"{c} = s.{c}" for c in update_columns)
+            current_keys = ", ".join(f"t.{c}" for c in key_columns)
+            incoming_keys = ", ".join(f"s.{c}" for c in key_columns)
+            cursor.execute(f"""
+                UPDATE {table} t SET
+                {move_clause},
+                updated_in_db = now()
+                FROM (
+                    SELECT DISTINCT ON ({conflict_column}) {column_list}
+                    FROM {staging_table}
+                    WHERE {conflict_column} IS NOT NULL
+                    ORDER BY {conflict_column}, seq DESC
+                ) s
+                WHERE t.{conflict_column} = s.{conflict_column}
+                  AND ({current_keys}) IS DISTINCT FROM ({incoming_keys})
+            """)
+            moved = cursor.rowcount
+        cursor.execute(f"""
+            WITH merged AS (
+                INSERT INTO {table} ({column_list})
+                SELECT DISTINCT ON ({conflict_column}) {column_list}
+                FROM {staging_table}
+                WHERE {conflict_column} IS NOT NULL
+                ORDER BY {conflict_column}, seq DESC
+                ON CONFLICT ({conflict_target}) DO UPDATE SET
+                {set_clause},
+                updated_in_db = now()
+                WHERE ({current_values}) IS DISTINCT FROM ({incoming_values})
+                RETURNING {inserted_flag} AS inserted
+            )
+            SELECT
+                count(*) FILTER (WHERE inserted),
+                count(*) FILTER (WHERE NOT inserted),
+                count(*)
+            FROM merged
+        """)
+        inserted, updated, merged = cursor.fetchone()
+        if partition_keys:
+            inserted, updated = new_keys, merged - new_keys
+        updated += moved
+    elif conflict_column:
+        # The unique key of a partitioned table includes the partition key
+        existing = (
+            f" AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{conflict_column} = s.{conflict_column})"
+            if key_columns else ""
+        )
+        # One row per key (the first in the file), inserted in key order so
+        # concurrent merges of overlapping files lock keys in the same order
+        cursor.execute(f"""
+            INSERT INTO {table} ({column_list})
+            SELECT DISTINCT ON ({conflict_column}) {column_list}
+            FROM {staging_table} s
+            WHERE {conflict_column} IS NOT NULL{existing}
+            ORDER BY {conflict_column}, seq
+            ON CONFLICT DO NOTHING
+        """)
+        inserted, updated = cursor.rowcount, 0
+    else:
+        cursor.execute(f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {column_list} FROM {staging_table} ORDER BY seq
+        """)
+        inserted, updated = cursor.rowcount, 0
+
+    cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+
+    return {
+        'staged': staged,
+        'inserted': inserted,
+        'updated': updated,
+        # Duplicates within the input, unchanged/existing rows and rows without a key
+        'skipped': staged - inserted - updated
+    }
@@ -0,0 +1,138 @@
+"""
+Durable checkpoints for the row-by-row importers.
+
+An importer records how many records of a file it has fully processed in the
+import_checkpoints table, in the same transaction as each batch commit. If
+the run is interrupted, the next run for the same file skips that many
+records from the stream instead of re-checking every one of them against
+the database. Passing restart=True discards the checkpoint.
+
+A file is identified by a SHA-256 of its whole content, so a renamed or
+copied export still resumes, while a re-exported file with any different
+record (even one of the same size) starts from the beginning.
+"""
+
+import hashlib
+import os
+
+from sqlalchemy.orm import Session
+
+from app.models import ImportCheckpoint
+
+
+_FINGERPRINT_CHUNK_BYTES = 8 << 20
+
+
+def file_fingerprint(json_file_path: str) -> str:
+    """Content identity of an export: SHA-256 of the whole file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(json_file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_FINGERPRINT_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImportCheckpointTracker:
+    """
+    Tracks the resume offset of one importer over one file.
+
+    Usage:
+        checkpoint = ImportCheckpointTracker(db, 'sip', path, restart=False)
+        for read, record in enumerate(records, 1):
+            if read <= checkpoint.resume_offset:
+                continue
+            try:
+                ...
+                checkpoint.commit(read)  # instead of db.commit()
+            except Exception:
+                checkpoint.rollback()  # instead of db.rollback()
+        checkpoint.commit(read, completed=True)
+
+    Once a batch has been rolled back, the offset stays at the last
+    successful commit for the rest of the run (later commits do not move it
+    past the lost records) and the file is never marked completed, so the
+    next run retries from there.
+    """
+
+    def __init__(self, db: Session, importer: str, json_file_path: str, restart: bool = False):
+        self.db = db
+        self.importer = importer
+        self.json_file_path = json_file_path
+        self.fingerprint = file_fingerprint(json_file_path)
+
+        query = db.query(ImportCheckpoint).filter(
+            ImportCheckpoint.importer == importer,
+            ImportCheckpoint.file_fingerprint == self.fingerprint
+        )
+        if restart:
+            query.delete(synchronize_session=False)
+            db.commit()
+            existing = None
+        else:
+            existing = query.first()
+
+        self.completed = bool(existing and existing.completed)
+        self.resume_offset = existing.records_committed if existing else 0
+        self.checkpoint_id = existing.id if existing else None
+        # Offset of the last successful commit of this run; frozen after a rollback
+        self.last_committed = self.resume_offset
+        self.rolled_back = False
+
+    def commit(self, records_read: int, completed: bool = False):
+        """Commit the current batch together with its offset"""
+        if self.rolled_back:
+            # Records after last_committed were lost in a rollback: keep the
+            # offset there so the next run imports them
+            records_read, completed = self.last_committed, False
+        self.mark(records_read, completed)
+        self.db.commit()
+        self.last_committed = records_read
+
+    def rollback(self):
+        """Roll back the current batch and hold the offset at the last commit"""
+        self.db.rollback()
+        if not self.rolled_back:
+            self.rolled_back = True
+            print(f"⚠️  Checkpoint held at record {self.last_committed}; "
+                  f"re-run to retry the rolled-back records")
+
+    def mark(self, records_committed: int, completed: bool = False):
+        """
+        Stage the new offset in the current transaction.
+
+        commit() calls this right before db.commit() so the offset is
+        persisted atomically with the rows it covers; a rolled-back batch
+        rolls it back too.
+        """
+        values = {
+            'file_path': self.json_file_path,
+            'records_committed': records_committed,
+            'completed': completed,
+        }
+        if self.checkpoint_id is not None:
+            updated = self.db.query(ImportCheckpoint).filter(
+                ImportCheckpoint.id == self.checkpoint_id
+            ).update(values, synchronize_session=False)
+            if updated:
+                return
+            # The insert was rolled back along with a failed batch
+            self.checkpoint_id = None
+
+        checkpoint = ImportCheckpoint(
+            importer=self.importer,
+            file_fingerprint=self.fingerprint,
+            file_size=os.path.getsize(self.json_file_path),
+            **values
+        )
+        self.db.add(checkpoint)
+        self.db.flush()
+        self.checkpoint_id = checkpoint.id
+
+    def print_resume_status(self):
+        """Tell the operator when records are being skipped from a checkpoint"""
+        if self.completed:
+            print(f"⏩ {self.json_file_path} was already imported completely "
+                  f"({self.resume_offset} records); use --restart to import it again")
+        elif self.resume_offset:
+            print(f"⏩ Resuming after record {self.resume_offset} from checkpoint "
+                  f"(use --restart to start over)")
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+"""
+Run the service layer's queries through EXPLAIN (ANALYZE, BUFFERS) and report
+the slowest plans and the indexes the workload never touches.
+
+Every entry of QUERY_CATALOG calls one function of app/services.py the way
+an endpoint would (unfiltered and scoped to the busiest agent / user of the
+loaded data). The SQL each call sends is captured with a
+before_cursor_execute hook and re-run under EXPLAIN, so the plans are the
+ones the ORM queries really produce, parameters included.
+
+The report has three parts:
+- latency:  best wall time per catalog entry (what the endpoint pays)
+- plans:    the slowest statements with their sequential scans, rows
+            removed by filters and buffer usage
+- indexes:  every index on the served tables, with size and whether any
+            plan used it; unused non-unique ones are drop candidates
+
+Point DATABASE_URL at a loaded database (e.g. the 100k synthetic exports
+imported with scripts/import_all.py) and ANALYZE it first.
+
+Usage:
+    python scripts/explain_services.py
+    python scripts/explain_services.py --top 15 --rounds 5 --json before.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+
+from app import services
+from app.database import SessionLocal
+
+
+SERVED_TABLES = ['sip_records', 'sip_schemes', 'schemes', 'insurance_records', 'users', 'portfolio_holdings']
+
+# Values the catalog refers to as ':name', sampled from the loaded data
+SAMPLE_QUERIES = {
+    'agent_id': "SELECT agent_id FROM sip_records WHERE NOT deleted AND agent_id IS NOT NULL "
+                "GROUP BY agent_id ORDER BY count(*) DESC LIMIT 1",
+    'sip_agent_external_id': "SELECT agent_external_id FROM sip_records WHERE agent_external_id IS NOT NULL "
+                             "GROUP BY agent_external_id ORDER BY count(*) DESC LIMIT 1",
+    'user_agent_external_id': "SELECT agent_external_id FROM users WHERE agent_external_id IS NOT NULL "
+                              "GROUP BY agent_external_id ORDER BY count(*) DESC LIMIT 1",
+    'user_id': "SELECT user_id FROM portfolio_holdings GROUP BY user_id ORDER BY count(*) DESC LIMIT 1",
+    'sip_user_id': "SELECT user_id FROM sip_records WHERE NOT deleted "
+                   "GROUP BY user_id ORDER BY count(*) DESC LIMIT 1",
+    'insurance_agent_id': "SELECT agent_id FROM insurance_records WHERE NOT deleted AND agent_id IS NOT NULL "
+                          "GROUP BY agent_id ORDER BY count(*) DESC LIMIT 1",
+    'insured_user_id': "SELECT user_id FROM insurance_records WHERE NOT deleted "
+                       "GROUP BY user_id ORDER BY count(*) DESC LIMIT 1",
+    'scheme_name': "SELECT s.name FROM sip_schemes ss JOIN schemes s ON s.id = ss.scheme_id "
+                   "GROUP BY s.name ORDER BY count(*) DESC LIMIT 1",
+}
+
+# (service function, keyword arguments) - one entry per endpoint call shape
+QUERY_CATALOG = [
+    # SIP opportunities
+    ('get_no_sip_increase_clients', {}),
+    ('get_no_sip_increase_clients', {'agent_id': ':agent_id'}),
+    ('get_failed_sip_clients', {}),
+    ('get_failed_sip_clients', {'agent_id': ':agent_id'}),
+    ('get_high_value_inactive_clients', {}),
+    ('get_high_value_inactive_clients', {'agent_id': ':agent_id'}),
+    ('get_opportunity_statistics', {}),
+    ('get_all_agents', {}),
+    ('get_client_sip_records', {'user_id': ':sip_user_id'}),
+    ('get_stagnant_sip_opportunities', {}),
+    ('get_stagnant_sip_opportunities', {'agent_external_id': ':sip_agent_external_id'}),
+    ('get_stopped_sip_opportunities', {}),
+    ('get_stopped_sip_opportunities', {'agent_external_id': ':sip_agent_external_id'}),
+    ('get_stopped_sip_opportunities', {'scheme_name': ':scheme_name'}),
+    # Insurance
+    ('get_insurance_gap_opportunities', {}),
+    ('get_insurance_gap_opportunities', {'agent_external_id': ':user_agent_external_id'}),
+    ('get_no_insurance_clients', {}),
+    ('get_no_insurance_clients', {'agent_id': ':agent_id'}),
+    ('get_client_insurance_records', {'user_id': ':insured_user_id'}),
+    ('get_insurance_statistics', {}),
+    ('get_insurance_statistics', {'agent_id': ':insurance_agent_id'}),
+    # Users
+    ('get_all_users', {}),
+    ('get_all_users', {'agent_id': ':user_agent_external_id'}),
+    ('get_user_by_id', {'user_id': ':user_id'}),
+    ('get_high_value_users', {}),
+    ('get_high_value_users', {'agent_id': ':user_agent_external_id'}),
+    ('get_users_by_age_range', {}),
+    ('get_user_statistics', {}),
+    ('get_user_statistics', {'agent_id': ':user_agent_external_id'}),
+    # Portfolio
+    ('get_underperforming_funds', {}),
+    ('get_underperforming_funds', {'user_id': ':user_id'}),
+    ('get_low_rated_funds', {}),
+    ('get_portfolio_rebalancing_opportunities', {}),
+    ('get_all_portfolio_opportunities', {'user_id': ':user_id'}),
+    ('get_user_portfolio_holdings', {'user_id': ':user_id'}),
+    ('get_portfolio_statistics', {}),
+    ('get_portfolio_statistics', {'user_id': ':user_id'}),
+    ('get_portfolio_review_opportunities', {}),
+    ('get_portfolio_review_opportunities', {'agent_external_id': ':user_agent_external_id'}),
+]
+
+INDEX_QUERY = text("""
+    SELECT t.relname AS table_name, i.relname AS index_name,
+           x.indisunique OR x.indisprimary AS is_unique,
+           pg_relation_size(i.oid) AS size_bytes,
+           pg_get_indexdef(i.oid) AS definition
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    JOIN pg_class t ON t.oid = x.indrelid
+    WHERE t.relname = ANY(:tables)
+    ORDER BY t.relname, i.relname
+""")
+
+
+def load_samples(db) -> dict:
+    """Busiest agent / user ids of the loaded data, for the scoped catalog entries"""
+    return {name: db.execute(text(sql)).scalar() for name, sql in SAMPLE_QUERIES.items()}
+
+
+def resolve_kwargs(kwargs: dict, samples: dict) -> dict:
+    return {
+        key: samples[value[1:]] if isinstance(value, str) and value.startswith(':') else value
+        for key, value in kwargs.items()
+    }
+
+
+def catalog_label(function_name: str, kwargs: dict) -> str:
+    return f"{function_name}({', '.join(kwargs)})"
+
+
+def capture_statements(db, function_name: str, kwargs: dict) -> list:
+    """Call the service once and return the (statement, parameters) it executed"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    bind = db.get_bind()
+    event.listen(bind, 'before_cursor_execute', before_cursor_execute)
+    try:
+        getattr(services, function_name)(db, **kwargs)
+    finally:
+        event.remove(bind, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def time_call(db, function_name: str, kwargs: dict, rounds: int) -> float:
+    """Best wall time of the service call in milliseconds"""
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        getattr(services, function_name)(db, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+        db.rollback()
+    return best
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
+
+
+def explain_statement(db, statement: str, parameters) -> dict:
+    """EXPLAIN (ANALYZE, BUFFERS) one captured statement and summarise its plan"""
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0][0]
+    finally:
+        cursor.close()
+
+    root = plan['Plan']
+    seq_scans = []
+    indexes = set()
+    for node in _walk(root):
+        if node['Node Type'] == 'Seq Scan':
+            seq_scans.append({
+                'table': node['Relation Name'],
+                'rows': node['Actual Rows'] * node['Actual Loops'],
+                'removed_by_filter': node.get('Rows Removed by Filter', 0) * node['Actual Loops'],
+                'filter': node.get('Filter'),
+            })
+        if 'Index Name' in node:
+            indexes.add(node['Index Name'])
+
+    return {
+        'statement': statement,
+        'execution_ms': round(plan['Execution Time'], 3),
+        'planning_ms': round(plan['Planning Time'], 3),
+        'top_node': root['Node Type'],
+        'shared_hit': root.get('Shared Hit Blocks', 0),
+        'shared_read': root.get('Shared Read Blocks', 0),
+        'seq_scans': seq_scans,
+        'indexes': sorted(indexes),
+    }
+
+
+def run_report(rounds: int = 3) -> dict:
+    """
+    Time and EXPLAIN every catalog entry against the current database.
+
+    Returns:
+        Dictionary with samples, latency (per catalog entry), plans (one per
+        distinct statement, slowest first) and indexes (every index on the
+        served tables, flagged with whether a plan used it)
+    """
+    db = SessionLocal()
+    try:
+        samples = load_samples(db)
+        latency = []
+        plans = {}
+        for function_name, kwargs in QUERY_CATALOG:
+            label = catalog_label(function_name, kwargs)
+            call_kwargs = resolve_kwargs(kwargs, samples)
+            statements = capture_statements(db, function_name, call_kwargs)
+            db.rollback()
+
+            explained = 0.0
+            for statement, parameters in statements:
+                if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    continue
+                key = (label, statement)
+                if key in plans:
+                    plans[key]['calls'] += 1
+                    continue
+                plans[key] = dict(explain_statement(db, statement, parameters), service=label, calls=1)
+                explained += plans[key]['execution_ms']
+            db.rollback()
+
+            latency.append({
+                'service': label,
+                'best_ms': round(time_call(db, function_name, call_kwargs, rounds), 2),
+                'statements': len(statements),
+                'explained_ms': round(explained, 2),
+            })
+
+        used = set()
+        for plan in plans.values():
+            used.update(plan['indexes'])
+        indexes = [
+            dict(row._mapping, used=row.index_name in used)
+            for row in db.execute(INDEX_QUERY, {'tables': SERVED_TABLES})
+        ]
+    finally:
+        db.close()
+
+    return {
+        'samples': samples,
+        'latency': latency,
+        'plans': sorted(plans.values(), key=lambda plan: plan['execution_ms'], reverse=True),
+        'indexes': indexes,
+    }
+
+
+def print_report(report: dict, top: int = 10):
+    print(f"\n{'='*90}")
+    print("⏱️  Service latency (best of rounds)")
+    print(f"{'='*90}")
+    print(f"{'service':<62}{'ms':>10}{'stmts':>8}{'plan ms':>10}")
+    for entry in report['latency']:
+        print(f"{entry['service']:<62}{entry['best_ms']:>10}{entry['statements']:>8}{entry['explained_ms']:>10}")
+    print(f"{'TOTAL':<62}{round(sum(e['best_ms'] for e in report['latency']), 2):>10}")
+
+    print(f"\n{'='*90}")
+    print(f"🐢 Slowest {top} plans")
+    print(f"{'='*90}")
+    for plan in report['plans'][:top]:
+        print(f"\n{plan['execution_ms']:>10} ms  {plan['service']}  (x{plan['calls']}, {plan['top_node']}, "
+              f"buffers hit={plan['shared_hit']} read={plan['shared_read']})")
+        print(f"    indexes: {', '.join(plan['indexes']) or '-'}")
+        for scan in plan['seq_scans']:
+            print(f"    Seq Scan on {scan['table']}: {scan['rows']:,} rows kept, "
+                  f"{scan['removed_by_filter']:,} removed  [{scan['filter'] or 'no filter'}]")
+
+    seq_by_table = defaultdict(lambda: [0, 0])
+    for plan in report['plans']:
+        for scan in plan['seq_scans']:
+            seq_by_table[scan['table']][0] += 1
+            seq_by_table[scan['table']][1] += scan['removed_by_filter']
+    if seq_by_table:
+        print(f"\n{'='*90}")
+        print("📋 Sequential scans by table")
+        print(f"{'='*90}")
+        for table, (scans, removed) in sorted(seq_by_table.items(), key=lambda item: -item[1][1]):
+            print(f"{table:<30}{scans:>6} plans{removed:>16,} rows removed by filter")
+
+    print(f"\n{'='*90}")
+    print("🗂️  Indexes on served tables")
+    print(f"{'='*90}")
+    unused_bytes = 0
+    for index in report['indexes']:
+        status = 'used' if index['used'] else ('unique' if index['is_unique'] else 'UNUSED')
+        if status == 'UNUSED':
+            unused_bytes += index['size_bytes']
+        print(f"{index['table_name']:<20}{index['index_name']:<58}{index['size_bytes'] // 1024:>8} kB  {status}")
+    print(f"\nUnused non-unique indexes: {unused_bytes / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="EXPLAIN the service queries against a loaded database")
+    arg_parser.add_argument("--rounds", type=int, default=3, help="Timed calls per catalog entry; the best is reported")
+    arg_parser.add_argument("--top", type=int, default=10, help="Number of slowest plans to print")
+    arg_parser.add_argument("--json", default=None, help="Also write the full report to this file")
+    args = arg_parser.parse_args()
+
+    report = run_report(rounds=args.rounds)
+    print_report(report, top=args.top)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\n💾 Report written to {args.json}")
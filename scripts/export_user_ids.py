@@ -2,7 +2,7 @@
 """
 Export all distinct user IDs from all tables (Users, SIP, Insurance, Portfolio).
 Outputs a text file with one user_id per line.
-Includes ALL users, including those with deleted == "true".
+Includes ALL users, including those with deleted = true.
 """
 
 import sys
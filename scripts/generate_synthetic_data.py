@@ -0,0 +1,463 @@
+#!/usr/bin/env python
+"""
+Generate synthetic SIP, insurance, user and portfolio exports for load testing.
+
+Records use exactly the key formats of the production dumps that the import
+scripts expect: comma-formatted numbers ("7,500", "1,517.54"), human dates
+("January 30, 2026, 9:23 AM" / "July 30, 2023"), "true"/"false" flags,
+dotted insurance keys (itf.user_id, itf.agent_external_id,
+b.agent_external_id), bracketed scheme_name lists and the portfolio dump
+layout ({"total_users", "successful", "failed", "results": [...]}).
+
+Files are written one record at a time, so 10M-row exports need no more
+memory than 10k-row ones. All kinds draw user_ids from the same
+deterministic pool, so files generated with the same --users and --seed
+join with each other.
+
+Usage:
+    python scripts/generate_synthetic_data.py --kind all --rows 10k
+    python scripts/generate_synthetic_data.py --kind sip --rows 1M --out-dir /tmp/synthetic
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+
+KINDS = ['sip', 'insurance', 'user', 'portfolio']
+
+FIRST_NAMES = ['RITESH', 'ABHEEPSA', 'SANGITA', 'PRIYA', 'AMIT', 'NEHA', 'RAHUL', 'KAVITA',
+               'SURESH', 'ANJALI', 'VIKRAM', 'POOJA', 'ARJUN', 'MEERA', 'KARAN', 'DIVYA']
+LAST_NAMES = ['SHARMA', 'GUPTA', 'KUMAR', 'SINGH', 'PATEL', 'INDORIA', 'REDDY', 'IYER',
+              'JOSHI', 'MEHTA', 'NAIR', 'DAS', 'VERMA', 'RAO', 'BOSE', 'KAPOOR']
+SCHEMES = [
+    ('HDFC Mid-Cap Opportunities Fund (G)', 'Mid Cap Fund', 'HDFC', 'Nifty Midcap 150'),
+    ('ICICI Pru Value Discovery Fund (G)', 'Value Fund', 'ICICI Prudential', 'Nifty 500'),
+    ('DSP Large Cap Fund - Regular (G)', 'Large Cap Fund', 'DSP', 'Nifty 50'),
+    ('Parag Parikh Flexi Cap Fund (G)', 'Flexi Cap Fund', 'PPFAS', 'Nifty 500'),
+    ('SBI Small Cap Fund (G)', 'Small Cap Fund', 'SBI', 'Nifty Smallcap 250'),
+    ('Axis Bluechip Fund (G)', 'Large Cap Fund', 'Axis', 'Nifty 50'),
+    ('Kotak Emerging Equity Fund (G)', 'Mid Cap Fund', 'Kotak Mahindra', 'Nifty Midcap 150'),
+    ('Mirae Asset Tax Saver Fund (G)', 'ELSS', 'Mirae Asset', 'Nifty 500'),
+    ('Nippon India Liquid Fund (G)', 'Liquid Fund', 'Nippon India', 'Nifty Liquid Index'),
+    ('UTI Nifty 50 Index Fund (G)', 'Index Fund', 'UTI', 'Nifty 50'),
+]
+GOAL_NAMES = ['Individual Fund(s)', 'Custom Funds', 'Micro SIP', 'Wealthy Long Term Equity',
+              'Micro SIP Funds', 'Long Term Aggressive']
+INSURANCE_PRODUCTS = {
+    'Health': [('ReAssure', 'Niva Bupa'), ('Care_Supreme_All_annual', 'Care Health'),
+               ('HealthRecharge', 'ICICI Lombard'), ('Elevate_All_annual', 'ICICI Lombard')],
+    'Term': [('iProtect_Smart_Non_ROP_monthly', 'iPru'), ('ClickToProtect', 'HDFC Life')],
+    'General': [('HDFCErgoGeneral', 'HDFC Ergo')],
+    'Traditional': [('SanchayPlus(Direct)', 'HDFC Life')],
+    'ULIP': [('ClassicOneSinglePay', 'iPru')],
+    'Fourwheeler': [('CarSecure', 'ICICI Lombard')],
+}
+INSURANCE_TYPE_WEIGHTS = [('Health', 52), ('Term', 18), ('General', 15), ('Traditional', 9),
+                          ('Fourwheeler', 5), ('ULIP', 1)]
+W_RATINGS = ['1', '1.5', '2', '2.5', '3', '3.5', '4', '4.5', '5']
+COMMENTS = [
+    'Consistent outperformer, continue SIP',
+    'Underperforming benchmark for 3 years - review and switch',
+    'High expense ratio relative to category',
+    'Portfolio overlap with other large cap holdings',
+    '',
+]
+
+AS_OF = datetime(2026, 1, 30, 9, 23)
+
+
+def parse_size(value: str) -> int:
+    """Parse a row count such as 10000, 10k, 1M or 10M"""
+    text = str(value).strip().lower().replace(',', '').replace('_', '')
+    multiplier = 1
+    if text and text[-1] in 'km':
+        multiplier = 1000 if text[-1] == 'k' else 1000000
+        text = text[:-1]
+    return int(float(text) * multiplier)
+
+
+def format_amount(value: float) -> str:
+    """7500 -> "7,500", 1517.54 -> "1,517.54", 778.4 -> "778.4\""""
+    if float(value).is_integer():
+        return f"{int(value):,}"
+    return f"{value:,.2f}".rstrip('0').rstrip('.')
+
+
+def format_datetime(value: datetime) -> str:
+    """datetime -> "January 30, 2026, 9:23 AM\""""
+    hour = value.hour % 12 or 12
+    return f"{value:%B} {value.day}, {value.year}, {hour}:{value:%M} {value:%p}"
+
+
+def format_date(value: datetime) -> str:
+    """datetime -> "July 30, 2023\""""
+    return f"{value:%B} {value.day}, {value.year}"
+
+
+def user_id_for(index: int, seed: int) -> str:
+    """Deterministic UUID for user number `index` of the shared pool"""
+    return str(uuid.UUID(bytes=hashlib.md5(f"{seed}:user:{index}".encode()).digest(), version=4))
+
+
+def _external_id(rng: random.Random, prefix: str) -> str:
+    return prefix + ''.join(rng.choices('ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz23456789', k=22))
+
+
+def _member_id(rng: random.Random) -> str:
+    return '01JEJV' + ''.join(rng.choices('0123456789ABCDEFGHJKMNPQRSTVWXYZ', k=20))
+
+
+def _holding_counts(rows: int):
+    """Holdings per portfolio user: cycles 1..10 until `rows` holdings are used"""
+    written = 0
+    user_index = 0
+    while written < rows:
+        count = min(user_index % 10 + 1, rows - written)
+        yield user_index, count
+        written += count
+        user_index += 1
+
+
+def _random_datetime(rng: random.Random, start_year: int, end: datetime = AS_OF) -> datetime:
+    start = datetime(start_year, 1, 1)
+    return start + timedelta(minutes=rng.randrange(int((end - start).total_seconds() // 60)))
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _agent_pool(rng: random.Random, size: int = 200) -> list:
+    return [(_external_id(rng, 'ag_'), format_amount(rng.randint(1000, 99999)), _name(rng))
+            for _ in range(size)]
+
+
+def generate_sip_record(index: int, rng: random.Random, users: int, seed: int, agents: list) -> dict:
+    """One SIP export record"""
+    created = _random_datetime(rng, 2019)
+    start = created + timedelta(days=rng.randint(0, 10))
+    amount = rng.choice([500, 1000, 2000, 2500, 5000, 7500, 10000, 25000, 50000])
+    success_count = rng.randint(0, 60)
+    schemes = [rng.choice(SCHEMES)[0] for _ in range(rng.choice([1, 1, 1, 2, 2, 4]))]
+    stepped_up = rng.random() < 0.15
+    paused = rng.random() < 0.1
+    latest_success = AS_OF - timedelta(days=rng.randint(0, 400))
+    agent_external_id, agent_id, _ = rng.choice(agents)
+    return {
+        "inserted_at": format_datetime(AS_OF - timedelta(days=rng.randint(0, 20))),
+        "event_date": format_datetime(AS_OF - timedelta(days=rng.randint(0, 40))),
+        "created_at": format_datetime(created),
+        "sip_meta_date": format_date(created),
+        "sip_meta_month": format_date(created.replace(day=1)),
+        "uid": str(index + 1),
+        "sip_meta_id": str(index + 1),
+        "user_id": user_id_for(rng.randrange(users), seed),
+        "goal_id": format_amount(rng.randint(1, 500000)),
+        "sip_days": str(rng.choice([1, 5, 10, 15, 20, 25])),
+        "num_days": "1",
+        "amount": format_amount(amount),
+        "scheme_name": f"[{', '.join(schemes)}]",
+        "goal_name": rng.choice(GOAL_NAMES),
+        "start_date": format_date(start),
+        "end_date": format_date(start + timedelta(days=365 * rng.randint(3, 30))),
+        "paused_from": format_date(AS_OF - timedelta(days=60)) if paused else "",
+        "paused_till": format_date(AS_OF + timedelta(days=30)) if paused else "",
+        "paused_reason": "UP" if paused else "",
+        "increment_percentage": str(rng.choice([10, 10, 20, 25, 100])) if stepped_up else "0",
+        "increment_amount": "0",
+        "increment_period": rng.choice(['6M', '1Y']) if stepped_up else "",
+        "is_active": "true" if rng.random() < 0.9 else "false",
+        "sip_sales_status": "validSales" if rng.random() < 0.97 else "invalidSales",
+        "had_mandate_at_creation": "true",
+        "has_current_mandate": "true" if rng.random() < 0.95 else "false",
+        "mandate_tracking_status": rng.choice(['Already Confirmed', 'Already Confirmed',
+                                               'Confirmed Within 45 Days', 'Confirmed After 45 Days']),
+        "mandate_confirmed_date": "",
+        "stepper_enabled": "true",
+        "first_order_nav_allocated_at": format_date(start + timedelta(days=7)),
+        "first_success_order_date": format_date(start),
+        "latest_success_order_date": format_date(latest_success),
+        "first_success_order_month": format_date(start.replace(day=1)),
+        "latest_success_order_month": format_date(latest_success.replace(day=1)),
+        "success_amount": format_amount(amount * success_count),
+        "pending_amount": "0",
+        "failed_amount": format_amount(amount * rng.randint(0, 5)),
+        "in_progress_amount": "0",
+        "paused_amount": "0",
+        "success_count": str(success_count),
+        "currentSipStatus": "Paused" if paused else rng.choice(['Success', 'Success', 'Failed']),
+        "agent_external_id": agent_external_id,
+        "member_id": _member_id(rng),
+        "agent_id": agent_id,
+        "deleted": "false"
+    }
+
+
+def generate_insurance_record(index: int, rng: random.Random, users: int, seed: int, agents: list) -> dict:
+    """One insurance export record"""
+    insurance_type = rng.choices([t for t, _ in INSURANCE_TYPE_WEIGHTS],
+                                 weights=[w for _, w in INSURANCE_TYPE_WEIGHTS])[0]
+    product_name, insurer = rng.choice(INSURANCE_PRODUCTS[insurance_type])
+    ordered = _random_datetime(rng, 2018)
+    mf_value = round(rng.lognormvariate(15, 1.5), 2)
+    wealth_band = '20Cr+' if mf_value >= 2e8 else '5Cr-20Cr' if mf_value >= 5e7 else '50L-5Cr'
+    expected = rng.choice([25000, 50000, 100000, 200000])
+    premium = rng.choice([0, 0, 12000, 25000, 60000])
+    agent_external_id, agent_id, _ = rng.choice(agents)
+    record_id = str(index + 1)
+    record = {
+        "inserted_at": format_datetime(AS_OF - timedelta(days=rng.randint(0, 60))),
+        "event_date": format_datetime(AS_OF - timedelta(days=rng.randint(0, 140))),
+        "created_at": format_datetime(ordered),
+        "uid": record_id,
+        "source_id": format_amount(index + 1),
+        "deleted": "false",
+        "checksum": None,
+        "itf.user_id": user_id_for(rng.randrange(users), seed),
+        "transaction_date": format_date(ordered),
+        "transaction_amount": format_amount(rng.choice([25000, 100000, 500000, 5000000])),
+        "transaction_type": "",
+        "transaction_category": "D",
+        "instrument_type": "insurance",
+        "product_name": product_name,
+        "transaction_status": "Active",
+        "order_status": "Active",
+        "wealthy_processed_at": format_datetime(ordered),
+        "order_date": format_datetime(ordered),
+        "order_id": record_id,
+        "transaction_id": record_id,
+        "transaction_units": "1",
+        "order_category": "D",
+        "order_type": "Once",
+        "insurance_order_id": "0",
+        "insurance_type": insurance_type,
+        "sourcing_channel": "",
+        "user_product_id": _external_id(rng, 'userpro_'),
+        "insurer": insurer,
+        "premium_frequency": rng.choice(['annual', 'annual', 'single', 'monthly']),
+        "policy_issue_date": format_date(ordered),
+        "policy_number": "",
+        "application_number": "",
+        "wpc": "",
+        "premium": format_amount(premium) if premium else None,
+        "agent_id": agent_id,
+        "itf.agent_external_id": agent_external_id,
+        "member_id": _member_id(rng),
+        "b.agent_external_id": agent_external_id,
+        "name": _name(rng),
+        "mf_current_value": format_amount(mf_value),
+        "wealth_band": wealth_band,
+        "mock_age": str(rng.randint(25, 70)),
+        "total_premium": format_amount(premium),
+        "baseline_expected_premium": format_amount(expected),
+        "premium_gap": format_amount(max(expected - premium, 0)),
+        "opportunity_score": str(rng.randint(0, 200))
+    }
+    record["checksum"] = hashlib.md5(json.dumps(record, sort_keys=True).encode()).hexdigest()
+    return record
+
+
+def generate_user_record(index: int, rng: random.Random, users: int, seed: int, agents: list) -> dict:
+    """One user export record (the index-th user of the pool)"""
+    name = _name(rng)
+    created = _random_datetime(rng, 2018)
+    first_active = created + timedelta(days=rng.randint(0, 200))
+    mf_invested = round(rng.lognormvariate(12, 1.8), 2)
+    mf_current = round(mf_invested * rng.uniform(0.8, 2.2), 2)
+    fd_current = rng.choice([0, 0, 0, 100000, 500000])
+    agent_external_id, _, agent_name = rng.choice(agents)
+    values = {f"{asset}_{kind}_value": "0"
+              for asset in ['aif', 'deb', 'pms', 'preipo'] for kind in ['current', 'invested']}
+    return {
+        "uid": str(index + 1),
+        "inserted_at": format_datetime(AS_OF),
+        "event_date": format_datetime(AS_OF - timedelta(days=rng.randint(0, 40))),
+        "created_at": format_datetime(created),
+        "user_id": user_id_for(index % users, seed),
+        "name": name,
+        "email": f"{name.split()[0].lower()}{index}@example.com",
+        "phone_number": f"(+91){rng.randint(6000000000, 9999999999)}",
+        "crn": f"{name[:3]}{rng.randint(100, 999)}",
+        "trak_cob_opportunity_value": "0",
+        "total_current_value": format_amount(round(mf_current + fd_current, 2)),
+        "total_invested_value": format_amount(round(mf_invested + fd_current, 2)),
+        "mf_current_value": format_amount(mf_current),
+        "mf_invested_value": format_amount(mf_invested),
+        "fd_current_value": format_amount(fd_current),
+        "fd_invested_value": format_amount(fd_current),
+        **values,
+        "latest_as_on_date": format_date(AS_OF),
+        "agent_external_id": agent_external_id,
+        "agent_name": agent_name,
+        "agent_email": f"agent{rng.randint(1, 9999)}@example.com",
+        "agent_phone_number": f"(+91){rng.randint(6000000000, 9999999999)}",
+        "member_id": _member_id(rng),
+        "first_active_at": format_datetime(first_active.replace(hour=0, minute=0)),
+        "first_active_mf": format_datetime(first_active.replace(hour=0, minute=0)),
+        "first_active_fd": format_datetime(first_active) if fd_current else "",
+        "first_active_insurance": "",
+        "first_active_mld": "",
+        "first_active_ncd": "",
+        "first_active_aif": "",
+        "first_active_pms": "",
+        "first_active_preipo": "",
+        "first_active_mf_sip": format_datetime(first_active) if rng.random() < 0.6 else ""
+    }
+
+
+def generate_holding(rng: random.Random) -> dict:
+    """One top_holdings_bucket entry of the portfolio dump"""
+    scheme_name, category, amc_name, benchmark_name = rng.choice(SCHEMES)
+    live_xirr = round(rng.uniform(-5, 25), 2)
+    benchmark_xirr = round(rng.uniform(5, 18), 2)
+    three_year = round(rng.uniform(2, 25), 2)
+    benchmark_three_year = round(rng.uniform(8, 18), 2)
+    five_year = round(rng.uniform(5, 22), 2)
+    benchmark_five_year = round(rng.uniform(9, 16), 2)
+    beat_4q = rng.randint(0, 4)
+    beat_12q = rng.randint(0, 12)
+    return {
+        "wpc": f"MF{rng.randint(10000, 99999)}",
+        "scheme_name": scheme_name,
+        "category": category,
+        "amc_name": amc_name,
+        "nav": round(rng.uniform(10, 900), 4),
+        "nav_as_on": AS_OF.strftime('%Y-%m-%d'),
+        "current_value": round(rng.lognormvariate(11, 1.2), 2),
+        "portfolio_weight": round(rng.uniform(1, 60), 2),
+        "benchmark_name": benchmark_name,
+        "live_xirr": live_xirr,
+        "benchmark_xirr": benchmark_xirr,
+        "xirr_performance": round(live_xirr - benchmark_xirr, 2),
+        "one_year_returns": round(rng.uniform(-10, 40), 2),
+        "three_year_returns_cagr": three_year,
+        "benchmark_three_year_returns_cagr": benchmark_three_year,
+        "three_year_returns_alpha": round(three_year - benchmark_three_year, 2),
+        "five_year_returns_cagr": five_year,
+        "benchmark_five_year_returns_cagr": benchmark_five_year,
+        "five_year_returns_alpha": round(five_year - benchmark_five_year, 2),
+        "rolling_4_quarter_returns_comparison": {
+            "beat_quarters_count": beat_4q,
+            "total_quarters": 4,
+            "beat_percentage": beat_4q * 25.0
+        },
+        "rolling_12_quarter_returns_comparison": {
+            "beat_quarters_count": beat_12q,
+            "total_quarters": 12,
+            "beat_percentage": round(beat_12q * 100 / 12, 2)
+        },
+        "realized_stcg": round(rng.uniform(0, 5000), 2),
+        "realized_ltcg": round(rng.uniform(0, 20000), 2),
+        "unrealized_stu": round(rng.uniform(0, 100), 3),
+        "unrealized_ltu": round(rng.uniform(0, 500), 3),
+        "cost_of_unrealized_stu": round(rng.uniform(0, 10000), 2),
+        "cost_of_unrealized_ltu": round(rng.uniform(0, 50000), 2),
+        "unrealized_stcg": round(rng.uniform(-2000, 5000), 2),
+        "unrealized_ltcg": round(rng.uniform(-5000, 40000), 2),
+        "comment": rng.choice(COMMENTS),
+        "w_rating": rng.choice(W_RATINGS)
+    }
+
+
+RECORD_GENERATORS = {
+    'sip': generate_sip_record,
+    'insurance': generate_insurance_record,
+    'user': generate_user_record,
+}
+
+
+def _write_array(f, records):
+    """Write an iterable of records as a JSON array, one record per line"""
+    f.write("[")
+    for count, record in enumerate(records):
+        f.write(",\n" if count else "\n")
+        f.write(json.dumps(record))
+    f.write("\n]")
+
+
+def generate_file(kind: str, rows: int, output_path: str, users: int = None, seed: int = 42) -> str:
+    """
+    Write a synthetic export of `rows` records (holdings for portfolio).
+
+    Args:
+        kind: sip, insurance, user or portfolio
+        rows: Number of records; for portfolio the number of holdings
+        output_path: Target JSON file
+        users: Size of the shared user_id pool (default: rows)
+        seed: Random seed; the same seed reproduces the same file
+
+    Returns:
+        output_path
+    """
+    rng = random.Random(f"{seed}:{kind}")
+    users = max(users or rows, 1)
+    agents = _agent_pool(random.Random(seed))
+    progress_every = max(rows // 10, 100000)
+
+    def progress(index):
+        if index and index % progress_every == 0:
+            print(f"   {kind}: {index:,}/{rows:,} rows...")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w') as f:
+        if kind == 'portfolio':
+            def results():
+                written = 0
+                for user_index, count in _holding_counts(rows):
+                    progress(written)
+                    yield {
+                        "user_id": user_id_for(user_index % users, seed),
+                        "pan_number": f"{''.join(rng.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=5))}"
+                                      f"{rng.randint(1000, 9999)}{rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}",
+                        "client_details": {"name": _name(rng), "as_on_date": AS_OF.strftime('%Y-%m-%d')},
+                        "top_holdings_bucket": [generate_holding(rng) for _ in range(count)]
+                    }
+                    written += count
+
+            total_users = sum(1 for _ in _holding_counts(rows))
+            f.write(f'{{"total_users": {total_users}, "successful": {total_users}, "failed": 0, '
+                    f'"results": ')
+            _write_array(f, results())
+            f.write("}\n")
+        else:
+            generate_record = RECORD_GENERATORS[kind]
+
+            def records():
+                for index in range(rows):
+                    progress(index)
+                    yield generate_record(index, rng, users, seed, agents)
+
+            _write_array(f, records())
+            f.write("\n")
+
+    return output_path
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Generate synthetic exports for import benchmarks")
+    arg_parser.add_argument("--kind", choices=KINDS + ['all'], default='all', help="Export kind (default: all)")
+    arg_parser.add_argument("--rows", default="10k", help="Records per file, e.g. 10k, 1M, 10M (default: 10k)")
+    arg_parser.add_argument("--users", default=None, help="Size of the shared user_id pool (default: --rows)")
+    arg_parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    arg_parser.add_argument("--out-dir", default="data/synthetic", help="Output directory (default: data/synthetic)")
+    args = arg_parser.parse_args()
+
+    try:
+        rows = parse_size(args.rows)
+        users = parse_size(args.users) if args.users else None
+    except ValueError:
+        print(f"Error: invalid size: {args.rows if args.users is None else args.users}")
+        sys.exit(1)
+
+    kinds = KINDS if args.kind == 'all' else [args.kind]
+    for kind in kinds:
+        path = os.path.join(args.out_dir, f"synthetic_{kind}_{args.rows}.json")
+        print(f"📝 Generating {rows:,} {kind} rows -> {path}")
+        generate_file(kind, rows, path, users=users, seed=args.seed)
+        print(f"   ✅ {os.path.getsize(path) / (1024 * 1024):.1f} MB")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+"""
+Import many export shards in parallel with worker processes.
+
+Every file matched by the glob is handled by one worker process, which
+streams the JSON, normalizes each record (comma-stripped numbers, mock DOBs,
+flattened portfolio holdings) and COPYs the rows in batches into a staging
+table before merging them with one INSERT ... ON CONFLICT. The file kind
+(sip / user / insurance / portfolio) is detected from the first record
+unless --kind is given.
+
+Merge semantics per kind:
+- sip:       upsert on sip_meta_id (changed rows are updated), scheme lists
+             split into sip_schemes
+- user:      insert new user_ids, keep existing rows
+- insurance: insert new source_ids, keep existing rows
+- portfolio: per-user snapshot replace (see import_portfolio.py)
+
+Usage:
+    python scripts/import_all.py "data/*.json" --workers 4
+    python scripts/import_all.py "data/sip*.json" --kind sip
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, Base
+from scripts.bulk_load import bulk_merge
+from scripts.import_utils import iter_json_array, peak_rss_mb
+from scripts.import_data import SIP_COLUMNS, build_sip_row, merge_sip_rows
+from scripts.import_users import USER_COLUMNS, build_user_row
+from scripts.import_insurance import INSURANCE_COLUMNS, build_insurance_row
+from scripts.import_portfolio import PORTFOLIO_COLUMNS, replace_portfolio_snapshot
+from scripts.lookup_codes import LookupCodes
+
+
+# kind -> (table, columns, conflict column, update existing rows);
+# portfolio dumps are swapped in per user instead of merged
+IMPORT_KINDS = {
+    'sip': ('sip_records', SIP_COLUMNS, 'sip_meta_id', True),
+    'user': ('users', USER_COLUMNS, 'user_id', False),
+    'insurance': ('insurance_records', INSURANCE_COLUMNS, 'source_id', False),
+    'portfolio': ('portfolio_holdings', PORTFOLIO_COLUMNS, None, False),
+}
+
+
+def detect_kind(json_file_path: str) -> str:
+    """Guess the export kind from the first record of the file"""
+    with open(json_file_path, 'r') as f:
+        first_char = f.read(1)
+        while first_char and first_char.isspace():
+            first_char = f.read(1)
+    if first_char == '{':
+        return 'portfolio'
+
+    first_record = next(iter_json_array(json_file_path), None)
+    if not first_record:
+        raise ValueError(f"Cannot detect kind of empty file {json_file_path}")
+    if 'sip_meta_id' in first_record:
+        return 'sip'
+    if 'source_id' in first_record or 'itf.user_id' in first_record:
+        return 'insurance'
+    if 'user_id' in first_record and 'total_current_value' in first_record:
+        return 'user'
+    raise ValueError(f"Cannot detect kind of {json_file_path}; pass --kind")
+
+
+def _iter_results(json_file_path: str, counters: dict):
+    """Stream results[] of a portfolio dump, counting users read"""
+    for result in iter_json_array(json_file_path, key='results'):
+        counters['read'] += 1
+        yield result
+
+
+def _iter_rows(kind: str, json_file_path: str, counters: dict):
+    """Stream normalized rows for one file, counting records and bad records"""
+    build_row = {'sip': build_sip_row, 'user': build_user_row, 'insurance': build_insurance_row}[kind]
+    for record in iter_json_array(json_file_path):
+        counters['read'] += 1
+        try:
+            yield build_row(record)
+        except Exception as e:
+            print(f"⚠️  [{os.path.basename(json_file_path)}] Error with record: {e}")
+            counters['errors'] += 1
+
+
+def import_file(kind: str, json_file_path: str, batch_size: int = 10000) -> dict:
+    """
+    Import one shard (runs inside a worker process).
+
+    Returns:
+        Per-file summary: kind, read, inserted, updated, skipped, errors,
+        seconds and the worker's peak RSS
+    """
+    table, columns, conflict_column, update_existing = IMPORT_KINDS[kind]
+    counters = {'read': 0, 'errors': 0}
+    summary = {'file': json_file_path, 'kind': kind, 'inserted': 0, 'updated': 0, 'skipped': 0}
+    start = time.perf_counter()
+
+    connection = engine.raw_connection()
+    try:
+        if kind == 'portfolio':
+            swapped = replace_portfolio_snapshot(
+                connection, _iter_results(json_file_path, counters), batch_size=batch_size
+            )
+            counters['errors'] += swapped['errors']
+            merged = {'inserted': swapped['inserted'], 'updated': 0, 'skipped': swapped['skipped_users']}
+        elif kind == 'sip':
+            merged = merge_sip_rows(
+                connection, _iter_rows(kind, json_file_path, counters), batch_size=batch_size
+            )
+        else:
+            codes = LookupCodes(table)
+            merged = bulk_merge(
+                connection, map(codes.encode, _iter_rows(kind, json_file_path, counters)), table, columns,
+                conflict_column=conflict_column, update_existing=update_existing,
+                batch_size=batch_size
+            )
+        connection.commit()
+        summary.update(inserted=merged['inserted'], updated=merged['updated'], skipped=merged['skipped'])
+    except Exception as e:
+        print(f"❌ [{os.path.basename(json_file_path)}] Import failed: {e}")
+        connection.rollback()
+        counters['errors'] += 1
+    finally:
+        connection.close()
+
+    summary.update(
+        read=counters['read'],
+        errors=counters['errors'],
+        seconds=round(time.perf_counter() - start, 2),
+        peak_rss_mb=peak_rss_mb()
+    )
+    return summary
+
+
+def _init_worker():
+    """Drop pooled connections inherited from the parent process"""
+    engine.dispose(close=False)
+
+
+def import_files(pattern: str, kind: str = None, workers: int = None, batch_size: int = 10000) -> list:
+    """
+    Import every file matching `pattern` using a pool of worker processes.
+
+    Returns:
+        List of per-file summaries (in file order)
+    """
+    files = sorted(glob.glob(pattern))
+    if not files:
+        print(f"No files match {pattern}")
+        return []
+
+    # Create tables once in the parent so workers don't race on DDL
+    print("Creating database tables...")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    kinds = {path: kind or detect_kind(path) for path in files}
+    workers = workers or min(len(files), os.cpu_count() or 1)
+    print(f"Importing {len(files)} file(s) with {workers} worker(s)...")
+    for path in files:
+        print(f"   {kinds[path]:<10} {path}")
+
+    summaries = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = {
+            executor.submit(import_file, kinds[path], path, batch_size): path
+            for path in files
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summaries[path] = future.result()
+            except Exception as e:
+                summaries[path] = {'file': path, 'kind': kinds[path], 'read': 0, 'inserted': 0,
+                                   'updated': 0, 'skipped': 0, 'errors': 1, 'seconds': 0,
+                                   'peak_rss_mb': None}
+                print(f"❌ Worker failed for {path}: {e}")
+            print(f"   ✅ Finished {os.path.basename(path)}")
+
+    return [summaries[path] for path in files]
+
+
+def print_summary(summaries: list):
+    """Print the combined per-file summary table"""
+    print(f"\n{'='*100}")
+    print("✅ Import Complete!")
+    print(f"{'='*100}")
+    print(f"{'file':<44}{'kind':<11}{'read':>8}{'inserted':>10}{'updated':>9}"
+          f"{'skipped':>9}{'errors':>8}{'secs':>8}{'rss MB':>9}")
+
+    totals = {'read': 0, 'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
+    for summary in summaries:
+        rss = f"{summary['peak_rss_mb']:.1f}" if summary.get('peak_rss_mb') else "-"
+        print(f"{os.path.basename(summary['file'])[:43]:<44}{summary['kind']:<11}{summary['read']:>8}"
+              f"{summary['inserted']:>10}{summary['updated']:>9}{summary['skipped']:>9}"
+              f"{summary['errors']:>8}{summary['seconds']:>8}{rss:>9}")
+        for key in totals:
+            totals[key] += summary[key]
+
+    print(f"{'TOTAL':<55}{totals['read']:>8}{totals['inserted']:>10}{totals['updated']:>9}"
+          f"{totals['skipped']:>9}{totals['errors']:>8}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Import export shards in parallel")
+    arg_parser.add_argument("pattern", help='Glob of JSON files, e.g. "data/sip*.json" (quote it)')
+    arg_parser.add_argument("--kind", choices=sorted(IMPORT_KINDS), help="Export kind (auto-detected by default)")
+    arg_parser.add_argument("--workers", type=int, default=None,
+                            help="Worker processes (default: min(files, CPU count))")
+    arg_parser.add_argument("--batch-size", type=int, default=10000, help="Rows per COPY batch")
+    args = arg_parser.parse_args()
+
+    print_summary(import_files(args.pattern, kind=args.kind, workers=args.workers, batch_size=args.batch_size))
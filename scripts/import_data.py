@@ -1,4 +1,4 @@
-import json
+import argparse
 import sys
 import os
 from dateutil import parser as date_parser
@@ -9,6 +9,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import SessionLocal, engine, Base
 from app.models import SIPRecord
+from app.derived_fields import SIP_DERIVED_COLUMNS, derive_sip_fields, parse_export_bool, split_scheme_names
+from scripts.bulk_load import bulk_merge, copy_rows
+from scripts.checkpoints import ImportCheckpointTracker
+from scripts.lookup_codes import LookupCodes
+from scripts.import_utils import iter_json_array, print_peak_memory
 
 
 def clean_numeric_string(value: str) -> float:
@@ -25,30 +30,251 @@ def clean_integer_string(value: str) -> int:
     return int(value.replace(",", ""))
 
 
-def import_sip_data(json_file_path: str):
-    """Import SIP data from JSON file into PostgreSQL"""
+# Columns written by both the row-by-row and the bulk import paths
+SIP_COLUMNS = [
+    'uid', 'sip_meta_id', 'user_id', 'goal_id',
+    'agent_id', 'agent_external_id', 'member_id',
+    'amount', 'sip_days', 'num_days', 'scheme_name', 'goal_name',
+    'created_at', 'sip_meta_date', 'sip_meta_month', 'start_date', 'end_date',
+    'event_date', 'inserted_at',
+    'increment_percentage', 'increment_amount', 'increment_period_code',
+    'paused_from', 'paused_till', 'paused_reason',
+    'is_active', 'sip_sales_status_code', 'current_sip_status_code',
+    'had_mandate_at_creation', 'has_current_mandate', 'mandate_tracking_status', 'mandate_confirmed_date',
+    'first_order_nav_allocated_at', 'first_success_order_date', 'latest_success_order_date',
+    'first_success_order_month', 'latest_success_order_month',
+    'success_amount', 'pending_amount', 'failed_amount', 'in_progress_amount', 'paused_amount', 'success_count',
+    'stepper_enabled', 'deleted'
+] + SIP_DERIVED_COLUMNS
+
+
+def build_sip_row(record: dict) -> dict:
+    """Map a raw SIP export record to sip_records column values (plus derived fields)"""
+    row = {
+        'uid': record.get('uid'),
+        'sip_meta_id': record.get('sip_meta_id'),
+        'user_id': record.get('user_id'),
+        'goal_id': record.get('goal_id'),
+        'agent_id': record.get('agent_id'),
+        'agent_external_id': record.get('agent_external_id'),
+        'member_id': record.get('member_id'),
+        'amount': clean_numeric_string(record.get('amount', '0')),
+        'sip_days': record.get('sip_days'),
+        'num_days': clean_integer_string(record.get('num_days', '0')),
+        'scheme_name': record.get('scheme_name'),
+        'goal_name': record.get('goal_name'),
+        'created_at': record.get('created_at'),
+        'sip_meta_date': record.get('sip_meta_date'),
+        'sip_meta_month': record.get('sip_meta_month'),
+        'start_date': record.get('start_date'),
+        'end_date': record.get('end_date'),
+        'event_date': record.get('event_date'),
+        'inserted_at': record.get('inserted_at'),
+        'increment_percentage': clean_numeric_string(record.get('increment_percentage', '0')),
+        'increment_amount': clean_numeric_string(record.get('increment_amount', '0')),
+        'increment_period': record.get('increment_period'),
+        'paused_from': record.get('paused_from'),
+        'paused_till': record.get('paused_till'),
+        'paused_reason': record.get('paused_reason'),
+        'is_active': parse_export_bool(record.get('is_active')),
+        'sip_sales_status': record.get('sip_sales_status'),
+        'current_sip_status': record.get('currentSipStatus'),
+        'had_mandate_at_creation': parse_export_bool(record.get('had_mandate_at_creation')),
+        'has_current_mandate': parse_export_bool(record.get('has_current_mandate')),
+        'mandate_tracking_status': record.get('mandate_tracking_status'),
+        'mandate_confirmed_date': record.get('mandate_confirmed_date'),
+        'first_order_nav_allocated_at': record.get('first_order_nav_allocated_at'),
+        'first_success_order_date': record.get('first_success_order_date'),
+        'latest_success_order_date': record.get('latest_success_order_date'),
+        'first_success_order_month': record.get('first_success_order_month'),
+        'latest_success_order_month': record.get('latest_success_order_month'),
+        'success_amount': clean_numeric_string(record.get('success_amount', '0')),
+        'pending_amount': clean_numeric_string(record.get('pending_amount', '0')),
+        'failed_amount': clean_numeric_string(record.get('failed_amount', '0')),
+        'in_progress_amount': clean_numeric_string(record.get('in_progress_amount', '0')),
+        'paused_amount': clean_numeric_string(record.get('paused_amount', '0')),
+        'success_count': clean_integer_string(record.get('success_count', '0')),
+        'stepper_enabled': parse_export_bool(record.get('stepper_enabled')),
+        'deleted': parse_export_bool(record.get('deleted'))
+    }
+    row.update(derive_sip_fields(row))
+    return row
+
+
+class SIPSchemeStage:
+    """
+    Split SIP scheme lists into sip_schemes rows.
+
+    Rows passed to add() are split with split_scheme_names and COPYed into a
+    TEMP staging table; merge() then runs after the SIPs themselves are in
+    sip_records and brings their sip_schemes rows in line with the staged
+    lists. New names go into schemes, only links that changed are rewritten,
+    and for a sip_meta_id staged more than once the last occurrence wins.
+    """
+
+    STAGING_TABLE = "sip_schemes_stage"
+    COLUMNS = ['seq', 'sip_meta_id', 'position', 'scheme_name']
+
+    def __init__(self, cursor, batch_size: int = 10000):
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.batch = []
+        self.seq = 0
+        cursor.execute(f"DROP TABLE IF EXISTS {self.STAGING_TABLE}")
+        cursor.execute(f"""
+            CREATE TEMP TABLE {self.STAGING_TABLE} (
+                seq BIGINT, sip_meta_id VARCHAR, position INTEGER, scheme_name TEXT
+            )
+        """)
+
+    def add(self, row: dict):
+        """Stage the scheme list of one built SIP row"""
+        sip_meta_id = row.get('sip_meta_id')
+        if not sip_meta_id:
+            return
+        names = split_scheme_names(row.get('scheme_name'))
+        if names:
+            self.batch.extend(
+                {'seq': self.seq, 'sip_meta_id': sip_meta_id, 'position': position, 'scheme_name': name}
+                for position, name in enumerate(names, start=1)
+            )
+        else:
+            # Staged without schemes so links left over from an older list are removed
+            self.batch.append({'seq': self.seq, 'sip_meta_id': sip_meta_id})
+        self.seq += 1
+        if len(self.batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        copy_rows(self.cursor, self.STAGING_TABLE, self.COLUMNS, self.batch)
+        self.batch = []
+
+    def merge(self) -> dict:
+        """
+        Write the staged lists into schemes / sip_schemes (caller commits).
+
+        Returns:
+            Dictionary with schemes_added / links_removed / links_added counts
+        """
+        self._flush()
+        stage = self.STAGING_TABLE
+        cursor = self.cursor
+
+        cursor.execute(f"""
+            DELETE FROM {stage} s
+            USING (SELECT sip_meta_id, max(seq) AS seq FROM {stage} GROUP BY sip_meta_id) latest
+            WHERE s.sip_meta_id = latest.sip_meta_id AND s.seq < latest.seq
+        """)
+
+        # Sorted so concurrent importers take the unique-name locks in the same order
+        cursor.execute(f"""
+            INSERT INTO schemes (name)
+            SELECT DISTINCT scheme_name FROM {stage}
+            WHERE scheme_name IS NOT NULL
+            ORDER BY scheme_name
+            ON CONFLICT (name) DO NOTHING
+        """)
+        schemes_added = cursor.rowcount
+
+        cursor.execute(f"""
+            CREATE TEMP TABLE {stage}_links AS
+            SELECT r.id AS sip_id, s.position, sc.id AS scheme_id
+            FROM {stage} s
+            JOIN sip_records r ON r.sip_meta_id = s.sip_meta_id
+            LEFT JOIN schemes sc ON sc.name = s.scheme_name
+        """)
+        cursor.execute(f"""
+            DELETE FROM sip_schemes ss
+            WHERE ss.sip_id IN (SELECT sip_id FROM {stage}_links)
+              AND NOT EXISTS (
+                  SELECT 1 FROM {stage}_links l
+                  WHERE l.sip_id = ss.sip_id AND l.position = ss.position AND l.scheme_id = ss.scheme_id
+              )
+        """)
+        links_removed = cursor.rowcount
+        cursor.execute(f"""
+            INSERT INTO sip_schemes (sip_id, position, scheme_id)
+            SELECT sip_id, position, scheme_id FROM {stage}_links
+            WHERE scheme_id IS NOT NULL
+            ORDER BY sip_id, position
+            ON CONFLICT (sip_id, position) DO NOTHING
+        """)
+        links_added = cursor.rowcount
+
+        cursor.execute(f"DROP TABLE IF EXISTS {stage}_links")
+        cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+
+        return {'schemes_added': schemes_added, 'links_removed': links_removed, 'links_added': links_added}
+
+
+def write_sip_schemes(connection, rows) -> dict:
+    """Split and store the scheme lists of SIP rows that are already in sip_records"""
+    schemes = SIPSchemeStage(connection.cursor())
+    for row in rows:
+        schemes.add(row)
+    return schemes.merge()
+
+
+def merge_sip_rows(connection, rows, batch_size: int = 10000) -> dict:
+    """
+    Upsert built SIP rows on sip_meta_id and refresh their sip_schemes rows.
+
+    The caller owns the transaction (commit/rollback on `connection`).
+
+    Returns:
+        bulk_merge counts plus the SIPSchemeStage.merge() counts
+    """
+    schemes = SIPSchemeStage(connection.cursor(), batch_size=batch_size)
+    codes = LookupCodes('sip_records')
+
+    def staged(source):
+        for row in source:
+            schemes.add(row)
+            yield codes.encode(row)
+
+    merged = bulk_merge(
+        connection, staged(rows), 'sip_records', SIP_COLUMNS,
+        conflict_column='sip_meta_id', update_existing=True,
+        batch_size=batch_size
+    )
+    merged.update(schemes.merge())
+    return merged
+
+
+def import_sip_data(json_file_path: str, restart: bool = False):
+    """
+    Import SIP data from JSON file into PostgreSQL.
+    
+    Progress is checkpointed with every batch commit; a re-run of the same
+    file resumes after the last committed record unless `restart` is set.
+    """
     
     # Create tables
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
     
-    # Load JSON data
-    print(f"Loading data from {json_file_path}...")
-    with open(json_file_path, 'r') as f:
-        data = json.load(f)
-    
-    print(f"Found {len(data)} records to import")
+    # Stream records from the JSON file
+    print(f"Streaming data from {json_file_path}...")
+    records = iter_json_array(json_file_path)
     
     # Create database session
     db = SessionLocal()
+    read = 0
+    imported = 0
+    skipped = 0
+    errors = 0
     
     try:
-        imported = 0
-        skipped = 0
-        errors = 0
+        checkpoint = ImportCheckpointTracker(db, 'sip', json_file_path, restart=restart)
+        checkpoint.print_resume_status()
         session_sip_ids = set()  # Track sip_meta_ids in current session
+        session_rows = []  # Rows of the current batch, for their sip_schemes
+        codes = LookupCodes('sip_records')
         
-        for record in data:
+        for record in records:
+            read += 1
+            if read <= checkpoint.resume_offset:
+                continue
             try:
                 sip_meta_id = record.get('sip_meta_id')
                 
@@ -72,102 +298,142 @@ def import_sip_data(json_file_path: str):
                 session_sip_ids.add(sip_meta_id)
                 
                 # Create SIP record
-                sip_record = SIPRecord(
-                    uid=record.get('uid'),
-                    sip_meta_id=record.get('sip_meta_id'),
-                    user_id=record.get('user_id'),
-                    goal_id=record.get('goal_id'),
-                    agent_id=record.get('agent_id'),
-                    agent_external_id=record.get('agent_external_id'),
-                    member_id=record.get('member_id'),
-                    amount=clean_numeric_string(record.get('amount', '0')),
-                    sip_days=record.get('sip_days'),
-                    num_days=clean_integer_string(record.get('num_days', '0')),
-                    scheme_name=record.get('scheme_name'),
-                    goal_name=record.get('goal_name'),
-                    created_at=record.get('created_at'),
-                    sip_meta_date=record.get('sip_meta_date'),
-                    sip_meta_month=record.get('sip_meta_month'),
-                    start_date=record.get('start_date'),
-                    end_date=record.get('end_date'),
-                    event_date=record.get('event_date'),
-                    inserted_at=record.get('inserted_at'),
-                    increment_percentage=clean_numeric_string(record.get('increment_percentage', '0')),
-                    increment_amount=clean_numeric_string(record.get('increment_amount', '0')),
-                    increment_period=record.get('increment_period'),
-                    paused_from=record.get('paused_from'),
-                    paused_till=record.get('paused_till'),
-                    paused_reason=record.get('paused_reason'),
-                    is_active=record.get('is_active'),
-                    sip_sales_status=record.get('sip_sales_status'),
-                    current_sip_status=record.get('currentSipStatus'),
-                    had_mandate_at_creation=record.get('had_mandate_at_creation'),
-                    has_current_mandate=record.get('has_current_mandate'),
-                    mandate_tracking_status=record.get('mandate_tracking_status'),
-                    mandate_confirmed_date=record.get('mandate_confirmed_date'),
-                    first_order_nav_allocated_at=record.get('first_order_nav_allocated_at'),
-                    first_success_order_date=record.get('first_success_order_date'),
-                    latest_success_order_date=record.get('latest_success_order_date'),
-                    first_success_order_month=record.get('first_success_order_month'),
-                    latest_success_order_month=record.get('latest_success_order_month'),
-                    success_amount=clean_numeric_string(record.get('success_amount', '0')),
-                    pending_amount=clean_numeric_string(record.get('pending_amount', '0')),
-                    failed_amount=clean_numeric_string(record.get('failed_amount', '0')),
-                    in_progress_amount=clean_numeric_string(record.get('in_progress_amount', '0')),
-                    paused_amount=clean_numeric_string(record.get('paused_amount', '0')),
-                    success_count=clean_integer_string(record.get('success_count', '0')),
-                    stepper_enabled=record.get('stepper_enabled'),
-                    deleted=record.get('deleted')
-                )
+                row = codes.encode(build_sip_row(record))
+                sip_record = SIPRecord(**row)
                 
                 db.add(sip_record)
+                session_rows.append(row)
                 imported += 1
                 
                 # Commit in smaller batches
                 if imported % 50 == 0:
                     try:
-                        db.commit()
+                        db.flush()
+                        write_sip_schemes(db.connection().connection, session_rows)
+                        checkpoint.commit(read)
                         print(f"✅ Imported {imported} records (skipped {skipped} duplicates)...")
                         session_sip_ids.clear()
+                        session_rows.clear()
                     except Exception as commit_error:
                         print(f"⚠️  Batch commit failed: {commit_error}")
-                        db.rollback()
+                        checkpoint.rollback()
                         session_sip_ids.clear()
+                        session_rows.clear()
                         errors += 1
                     
             except Exception as e:
                 print(f"⚠️  Error with SIP record {record.get('sip_meta_id')}: {str(e)}")
-                db.rollback()
+                checkpoint.rollback()
+                session_rows.clear()
                 errors += 1
                 continue
         
         # Final commit
         try:
-            db.commit()
+            db.flush()
+            write_sip_schemes(db.connection().connection, session_rows)
+            checkpoint.commit(read, completed=True)
             print(f"\n✅ Import completed!")
+            print(f"Total records read: {read}")
             print(f"Total imported: {imported}")
             print(f"Total skipped (duplicates): {skipped}")
             print(f"Total errors: {errors}")
         except Exception as final_commit_error:
             print(f"⚠️  Final commit had issues: {final_commit_error}")
-            db.rollback()
+            checkpoint.rollback()
         
     except Exception as e:
         print(f"❌ Error during import: {str(e)}")
         db.rollback()
     finally:
         db.close()
+        print_peak_memory()
+    
+    return {
+        'inserted': imported,
+        'updated': 0,
+        'skipped': skipped,
+        'errors': errors
+    }
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python import_data.py <path_to_json_file>")
-        sys.exit(1)
+def bulk_import_sip_data(json_file_path: str, batch_size: int = 10000):
+    """
+    Bulk-load SIP data with COPY and merge it into sip_records in one statement.
+    
+    Rows are streamed into a TEMP staging table in batches of `batch_size`,
+    then merged with INSERT ... ON CONFLICT (sip_meta_id) DO UPDATE. Existing
+    rows are only rewritten when at least one column changed. If a sip_meta_id
+    appears more than once in the file, the last occurrence wins.
+    
+    Returns:
+        Dictionary with inserted / updated / skipped / errors counts
+    """
+    
+    # Create tables
+    print("Creating database tables...")
+    Base.metadata.create_all(bind=engine)
+    
+    # Stream records from the JSON file
+    print(f"Streaming data from {json_file_path} (bulk mode)...")
     
-    json_file = sys.argv[1]
+    errors = 0
+    stats = {'inserted': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
+    
+    def rows():
+        nonlocal errors
+        for record in iter_json_array(json_file_path):
+            try:
+                yield build_sip_row(record)
+            except Exception as e:
+                print(f"⚠️  Error with SIP record {record.get('sip_meta_id')}: {str(e)}")
+                errors += 1
+    
+    connection = engine.raw_connection()
+    try:
+        merged = merge_sip_rows(connection, rows(), batch_size=batch_size)
+        connection.commit()
+        
+        stats = {
+            'inserted': merged['inserted'],
+            'updated': merged['updated'],
+            'skipped': merged['skipped'],
+            'errors': errors
+        }
+        
+        print(f"\n✅ Bulk import completed!")
+        print(f"Total inserted: {stats['inserted']}")
+        print(f"Total updated: {stats['updated']}")
+        print(f"Total skipped (unchanged/duplicates): {stats['skipped']}")
+        print(f"Total errors: {stats['errors']}")
+        
+    except Exception as e:
+        print(f"❌ Error during bulk import: {str(e)}")
+        connection.rollback()
+        stats['errors'] = errors + 1
+    finally:
+        connection.close()
+        print_peak_memory()
+    
+    return stats
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Import SIP data from a JSON export")
+    arg_parser.add_argument("json_file", help="Path to the SIP JSON export")
+    arg_parser.add_argument("--bulk", action="store_true",
+                            help="COPY into a staging table and upsert with ON CONFLICT (updates changed rows)")
+    arg_parser.add_argument("--batch-size", type=int, default=10000,
+                            help="Rows per COPY batch in bulk mode (default: 10000)")
+    arg_parser.add_argument("--restart", action="store_true",
+                            help="Ignore any saved checkpoint and import the file from the start")
+    args = arg_parser.parse_args()
     
-    if not os.path.exists(json_file):
-        print(f"Error: File not found: {json_file}")
+    if not os.path.exists(args.json_file):
+        print(f"Error: File not found: {args.json_file}")
         sys.exit(1)
     
-    import_sip_data(json_file)
+    if args.bulk:
+        bulk_import_sip_data(args.json_file, batch_size=args.batch_size)
+    else:
+        import_sip_data(args.json_file, restart=args.restart)
@@ -1,4 +1,4 @@
-import json
+import argparse
 import sys
 import os
 
@@ -7,6 +7,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import SessionLocal, engine, Base
 from app.models import InsuranceRecord
+from app.derived_fields import INSURANCE_DERIVED_COLUMNS, derive_insurance_fields, parse_export_bool
+from scripts.bulk_load import copy_rows, create_staging_table
+from scripts.checkpoints import ImportCheckpointTracker
+from scripts.lookup_codes import LookupCodes
+from scripts.import_utils import iter_json_array, print_peak_memory
 
 
 def clean_numeric_string(value: str) -> float:
@@ -27,30 +32,106 @@ def clean_integer_string(value: str) -> int:
     return int(str(value).replace(",", ""))
 
 
-def import_insurance_data(json_file_path: str):
-    """Import insurance data from JSON file into PostgreSQL"""
+# Columns written by both the row-by-row and the bulk import paths
+INSURANCE_COLUMNS = [
+    'uid', 'source_id', 'deleted', 'checksum', 'user_id', 'name', 'mf_current_value', 'wealth_band_code',
+    'mock_age', 'transaction_date', 'transaction_amount', 'transaction_type',
+    'transaction_category', 'instrument_type', 'product_name', 'transaction_status', 'order_status',
+    'event_date', 'created_at', 'wealthy_processed_at', 'order_date', 'order_id', 'transaction_id',
+    'transaction_units', 'order_category', 'order_type', 'insurance_order_id', 'insurance_type_code',
+    'sourcing_channel', 'user_product_id', 'insurer_code', 'premium_frequency', 'policy_issue_date',
+    'policy_number', 'application_number', 'wpc', 'premium', 'agent_id', 'agent_external_id',
+    'member_id', 'b_agent_external_id', 'total_premium', 'baseline_expected_premium', 'premium_gap',
+    'opportunity_score'
+] + INSURANCE_DERIVED_COLUMNS
+
+
+def build_insurance_row(record: dict) -> dict:
+    """Map a raw insurance export record to insurance_records column values (plus typed dates)"""
+    row = {
+        'uid': record.get('uid'),
+        'source_id': record.get('source_id'),
+        'deleted': parse_export_bool(record.get('deleted')),
+        'checksum': record.get('checksum'),
+        'user_id': record.get('itf.user_id'),
+        'name': record.get('name'),
+        'mf_current_value': clean_numeric_string(record.get('mf_current_value', '0')),
+        'wealth_band': record.get('wealth_band'),
+        'mock_age': clean_integer_string(record.get('mock_age', '0')),
+        'transaction_date': record.get('transaction_date'),
+        'transaction_amount': clean_numeric_string(record.get('transaction_amount', '0')),
+        'transaction_type': record.get('transaction_type'),
+        'transaction_category': record.get('transaction_category'),
+        'instrument_type': record.get('instrument_type'),
+        'product_name': record.get('product_name'),
+        'transaction_status': record.get('transaction_status'),
+        'order_status': record.get('order_status'),
+        'event_date': record.get('event_date'),
+        'created_at': record.get('created_at'),
+        'wealthy_processed_at': record.get('wealthy_processed_at'),
+        'order_date': record.get('order_date'),
+        'order_id': record.get('order_id'),
+        'transaction_id': record.get('transaction_id'),
+        'transaction_units': record.get('transaction_units'),
+        'order_category': record.get('order_category'),
+        'order_type': record.get('order_type'),
+        'insurance_order_id': record.get('insurance_order_id'),
+        'insurance_type': record.get('insurance_type'),
+        'sourcing_channel': record.get('sourcing_channel'),
+        'user_product_id': record.get('user_product_id'),
+        'insurer': record.get('insurer'),
+        'premium_frequency': record.get('premium_frequency'),
+        'policy_issue_date': record.get('policy_issue_date'),
+        'policy_number': record.get('policy_number'),
+        'application_number': record.get('application_number'),
+        'wpc': record.get('wpc'),
+        'premium': clean_numeric_string(record.get('premium', '0')),
+        'agent_id': record.get('agent_id'),
+        'agent_external_id': record.get('itf.agent_external_id'),
+        'member_id': record.get('member_id'),
+        'b_agent_external_id': record.get('b.agent_external_id'),
+        'total_premium': clean_numeric_string(record.get('total_premium', '0')),
+        'baseline_expected_premium': clean_numeric_string(record.get('baseline_expected_premium', '0')),
+        'premium_gap': clean_numeric_string(record.get('premium_gap', '0')),
+        'opportunity_score': clean_integer_string(record.get('opportunity_score', '0'))
+    }
+    row.update(derive_insurance_fields(row))
+    return row
+
+
+def import_insurance_data(json_file_path: str, restart: bool = False):
+    """
+    Import insurance data from JSON file into PostgreSQL.
+    
+    Progress is checkpointed with every batch commit; a re-run of the same
+    file resumes after the last committed record unless `restart` is set.
+    """
     
     # Create tables
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
     
-    # Load JSON data
-    print(f"Loading data from {json_file_path}...")
-    with open(json_file_path, 'r') as f:
-        data = json.load(f)
-    
-    print(f"Found {len(data)} insurance records to import")
+    # Stream records from the JSON file
+    print(f"Streaming data from {json_file_path}...")
+    records = iter_json_array(json_file_path)
     
     # Create database session
     db = SessionLocal()
+    read = 0
+    imported = 0
+    skipped = 0
+    errors = 0
     
     try:
-        imported = 0
-        skipped = 0
-        errors = 0
+        checkpoint = ImportCheckpointTracker(db, 'insurance', json_file_path, restart=restart)
+        checkpoint.print_resume_status()
         session_source_ids = set()  # Track source_ids in current session
+        codes = LookupCodes('insurance_records')
         
-        for record in data:
+        for record in records:
+            read += 1
+            if read <= checkpoint.resume_offset:
+                continue
             try:
                 source_id = record.get('source_id')
                 
@@ -74,53 +155,7 @@ def import_insurance_data(json_file_path: str):
                 session_source_ids.add(source_id)
                 
                 # Create Insurance record
-                insurance_record = InsuranceRecord(
-                    uid=record.get('uid'),
-                    source_id=record.get('source_id'),
-                    deleted=record.get('deleted'),
-                    checksum=record.get('checksum'),
-                    user_id=record.get('itf.user_id'),
-                    name=record.get('name'),
-                    mf_current_value=clean_numeric_string(record.get('mf_current_value', '0')),
-                    wealth_band=record.get('wealth_band'),
-                    mock_age=clean_integer_string(record.get('mock_age', '0')),
-                    transaction_date=record.get('transaction_date'),
-                    transaction_amount=clean_numeric_string(record.get('transaction_amount', '0')),
-                    transaction_type=record.get('transaction_type'),
-                    transaction_category=record.get('transaction_category'),
-                    instrument_type=record.get('instrument_type'),
-                    product_name=record.get('product_name'),
-                    transaction_status=record.get('transaction_status'),
-                    order_status=record.get('order_status'),
-                    event_date=record.get('event_date'),
-                    created_at=record.get('created_at'),
-                    wealthy_processed_at=record.get('wealthy_processed_at'),
-                    order_date=record.get('order_date'),
-                    order_id=record.get('order_id'),
-                    transaction_id=record.get('transaction_id'),
-                    transaction_units=record.get('transaction_units'),
-                    order_category=record.get('order_category'),
-                    order_type=record.get('order_type'),
-                    insurance_order_id=record.get('insurance_order_id'),
-                    insurance_type=record.get('insurance_type'),
-                    sourcing_channel=record.get('sourcing_channel'),
-                    user_product_id=record.get('user_product_id'),
-                    insurer=record.get('insurer'),
-                    premium_frequency=record.get('premium_frequency'),
-                    policy_issue_date=record.get('policy_issue_date'),
-                    policy_number=record.get('policy_number'),
-                    application_number=record.get('application_number'),
-                    wpc=record.get('wpc'),
-                    premium=clean_numeric_string(record.get('premium', '0')),
-                    agent_id=record.get('agent_id'),
-                    agent_external_id=record.get('itf.agent_external_id'),
-                    member_id=record.get('member_id'),
-                    b_agent_external_id=record.get('b.agent_external_id'),
-                    total_premium=clean_numeric_string(record.get('total_premium', '0')),
-                    baseline_expected_premium=clean_numeric_string(record.get('baseline_expected_premium', '0')),
-                    premium_gap=clean_numeric_string(record.get('premium_gap', '0')),
-                    opportunity_score=clean_integer_string(record.get('opportunity_score', '0'))
-                )
+                insurance_record = InsuranceRecord(**codes.encode(build_insurance_row(record)))
                 
                 db.add(insurance_record)
                 imported += 1
@@ -128,48 +163,209 @@ def import_insurance_data(json_file_path: str):
                 # Commit in smaller batches
                 if imported % 50 == 0:
                     try:
-                        db.commit()
+                        checkpoint.commit(read)
                         print(f"✅ Imported {imported} records (skipped {skipped} duplicates)...")
                         session_source_ids.clear()
                     except Exception as commit_error:
                         print(f"⚠️  Batch commit failed: {commit_error}")
-                        db.rollback()
+                        checkpoint.rollback()
                         session_source_ids.clear()
                         errors += 1
                     
             except Exception as e:
                 print(f"⚠️  Error with insurance record {record.get('source_id')}: {str(e)}")
-                db.rollback()
+                checkpoint.rollback()
                 errors += 1
                 continue
         
         # Final commit
         try:
-            db.commit()
+            checkpoint.commit(read, completed=True)
             print(f"\n✅ Import completed!")
+            print(f"Total records read: {read}")
             print(f"Total imported: {imported}")
             print(f"Total skipped (duplicates): {skipped}")
             print(f"Total errors: {errors}")
         except Exception as final_commit_error:
             print(f"⚠️  Final commit had issues: {final_commit_error}")
-            db.rollback()
+            checkpoint.rollback()
         
     except Exception as e:
         print(f"❌ Error during import: {str(e)}")
         db.rollback()
     finally:
         db.close()
+        print_peak_memory()
+    
+    return {
+        'inserted': imported,
+        'updated': 0,
+        'skipped': skipped,
+        'errors': errors
+    }
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python import_insurance.py <path_to_json_file>")
-        sys.exit(1)
+def sync_insurance_data(json_file_path: str, batch_size: int = 10000):
+    """
+    Incrementally sync insurance records using the upstream checksum.
+    
+    The export is COPYed into a staging table and compared against
+    insurance_records in bulk (one join per step instead of one query per row):
+    - source_id not in the table            -> inserted
+    - stored checksum differs               -> row rewritten
+    - deleted for an existing row           -> tombstone applied (row rewritten
+                                               with deleted = true)
+    - same checksum                         -> untouched
+    Tombstones for source_ids that were never imported are ignored. If a
+    source_id appears more than once in the file, the last occurrence wins.
+    
+    Returns:
+        Dictionary with inserted / updated / deleted / unchanged / ignored_tombstones / errors counts
+    """
+    
+    # Create tables
+    print("Creating database tables...")
+    Base.metadata.create_all(bind=engine)
+    
+    print(f"Streaming data from {json_file_path} (sync mode)...")
+    
+    errors = 0
+    stats = {}
+    columns = INSURANCE_COLUMNS
+    column_list = ", ".join(columns)
+    
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        create_staging_table(cursor, 'insurance_records_stage', 'insurance_records', columns)
+        stage_columns = columns + ['seq']
+        codes = LookupCodes('insurance_records')
+        
+        staged = 0
+        batch = []
+        for seq, record in enumerate(iter_json_array(json_file_path)):
+            try:
+                row = codes.encode(build_insurance_row(record))
+            except Exception as e:
+                print(f"⚠️  Error with insurance record {record.get('source_id')}: {str(e)}")
+                errors += 1
+                continue
+            row['seq'] = seq
+            batch.append(row)
+            if len(batch) >= batch_size:
+                staged += copy_rows(cursor, 'insurance_records_stage', stage_columns, batch)
+                batch = []
+                print(f"   Staged {staged} records...")
+        staged += copy_rows(cursor, 'insurance_records_stage', stage_columns, batch)
+        print(f"   Staged {staged} records, comparing checksums...")
+        
+        # Keep the last occurrence of each source_id
+        cursor.execute("""
+            DELETE FROM insurance_records_stage s
+            USING insurance_records_stage later
+            WHERE s.source_id = later.source_id AND s.seq < later.seq
+        """)
+        cursor.execute("DELETE FROM insurance_records_stage WHERE source_id IS NULL")
+        cursor.execute("CREATE INDEX ON insurance_records_stage (source_id)")
+        cursor.execute("ANALYZE insurance_records_stage")
+        
+        set_clause = ", ".join(f"{c} = s.{c}" for c in columns if c != 'source_id')
+        
+        # Tombstones for rows we hold
+        cursor.execute(f"""
+            UPDATE insurance_records r
+            SET {set_clause}, updated_in_db = now()
+            FROM insurance_records_stage s
+            WHERE r.source_id = s.source_id
+              AND s.deleted
+              AND (r.deleted IS NOT TRUE OR r.checksum IS DISTINCT FROM s.checksum)
+        """)
+        deleted = cursor.rowcount
+        
+        # Changed rows
+        cursor.execute(f"""
+            UPDATE insurance_records r
+            SET {set_clause}, updated_in_db = now()
+            FROM insurance_records_stage s
+            WHERE r.source_id = s.source_id
+              AND s.deleted IS NOT TRUE
+              AND r.checksum IS DISTINCT FROM s.checksum
+        """)
+        updated = cursor.rowcount
+        
+        # New rows (tombstones for unknown source_ids are not inserted)
+        cursor.execute(f"""
+            INSERT INTO insurance_records ({column_list})
+            SELECT {column_list}
+            FROM insurance_records_stage s
+            WHERE s.deleted IS NOT TRUE
+              AND NOT EXISTS (
+                  SELECT 1 FROM insurance_records r WHERE r.source_id = s.source_id
+              )
+            ORDER BY s.seq
+        """)
+        inserted = cursor.rowcount
+        
+        cursor.execute("""
+            SELECT count(*) FROM insurance_records_stage s
+            WHERE s.deleted
+              AND NOT EXISTS (
+                  SELECT 1 FROM insurance_records r WHERE r.source_id = s.source_id
+              )
+        """)
+        ignored_tombstones = cursor.fetchone()[0]
+        
+        cursor.execute("SELECT count(*) FROM insurance_records_stage")
+        distinct_records = cursor.fetchone()[0]
+        
+        cursor.execute("DROP TABLE IF EXISTS insurance_records_stage")
+        connection.commit()
+        
+        stats = {
+            'inserted': inserted,
+            'updated': updated,
+            'deleted': deleted,
+            'unchanged': distinct_records - inserted - updated - deleted - ignored_tombstones,
+            'ignored_tombstones': ignored_tombstones,
+            'errors': errors
+        }
+        
+        print(f"\n✅ Sync completed!")
+        print(f"Rows changed: {inserted + updated + deleted}")
+        print(f"   Inserted (new source_id): {inserted}")
+        print(f"   Updated (checksum changed): {updated}")
+        print(f"   Tombstones applied: {deleted}")
+        print(f"Unchanged: {stats['unchanged']}")
+        print(f"Ignored tombstones (never imported): {ignored_tombstones}")
+        print(f"Total errors: {errors}")
+        
+    except Exception as e:
+        print(f"❌ Error during sync: {str(e)}")
+        connection.rollback()
+        stats['errors'] = errors + 1
+    finally:
+        connection.close()
+        print_peak_memory()
     
-    json_file = sys.argv[1]
+    return stats
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Import insurance data from a JSON export")
+    arg_parser.add_argument("json_file", help="Path to the insurance JSON export")
+    arg_parser.add_argument("--sync", action="store_true",
+                            help="Incremental sync: rewrite rows whose checksum changed and apply deleted tombstones")
+    arg_parser.add_argument("--batch-size", type=int, default=10000,
+                            help="Rows per COPY batch in sync mode (default: 10000)")
+    arg_parser.add_argument("--restart", action="store_true",
+                            help="Ignore any saved checkpoint and import the file from the start")
+    args = arg_parser.parse_args()
     
-    if not os.path.exists(json_file):
-        print(f"Error: File not found: {json_file}")
+    if not os.path.exists(args.json_file):
+        print(f"Error: File not found: {args.json_file}")
         sys.exit(1)
     
-    import_insurance_data(json_file)
+    if args.sync:
+        sync_insurance_data(args.json_file, batch_size=args.batch_size)
+    else:
+        import_insurance_data(args.json_file, restart=args.restart)
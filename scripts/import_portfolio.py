@@ -3,8 +3,14 @@
 Import portfolio holdings data from JSON file into the database.
 This script processes mutual fund portfolio data including holdings, performance metrics,
 and opportunity analysis.
+
+Each dump is a snapshot: the holdings of every user in the file replace that
+user's previous holdings in one transaction, so serving queries never see a
+half-loaded or doubled portfolio. Superseded snapshots can be kept in
+portfolio_holdings_history (--retain N keeps the latest N per user).
 """
 
+import argparse
 import json
 import sys
 from pathlib import Path
@@ -12,13 +18,297 @@ from pathlib import Path
 # Add parent directory to path to import app modules
 sys.path.append(str(Path(__file__).parent.parent))
 
-from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine
-from app.models import PortfolioHolding, Base
+from app.database import engine
+from app.models import Base
+from app.derived_fields import PORTFOLIO_DERIVED_COLUMNS, derive_holding_fields, parse_rating
+from scripts.bulk_load import copy_rows, create_staging_table
+from scripts.import_utils import iter_json_array, print_peak_memory
+from scripts.lookup_codes import LookupCodes
+from scripts.partition_tables import ensure_range_partitions
+
+
+# Columns written by both the row-by-row and the bulk import paths
+PORTFOLIO_COLUMNS = [
+    'user_id', 'pan_number', 'as_on_date', 'wpc', 'scheme_name', 'category_code', 'amc_name_code', 'nav',
+    'nav_as_on', 'current_value', 'portfolio_weight', 'benchmark_name_code', 'live_xirr',
+    'benchmark_xirr', 'xirr_performance', 'one_year_returns', 'three_year_returns_cagr',
+    'benchmark_three_year_returns_cagr', 'three_year_returns_alpha', 'five_year_returns_cagr',
+    'benchmark_five_year_returns_cagr', 'five_year_returns_alpha', 'rolling_4q_beat_count',
+    'rolling_4q_total_count', 'rolling_4q_beat_percentage', 'rolling_12q_beat_count',
+    'rolling_12q_total_count', 'rolling_12q_beat_percentage', 'realized_stcg', 'realized_ltcg',
+    'unrealized_stu', 'unrealized_ltu', 'cost_of_unrealized_stu', 'cost_of_unrealized_ltu',
+    'unrealized_stcg', 'unrealized_ltcg', 'comment', 'w_rating', 'w_rating_numeric'
+] + PORTFOLIO_DERIVED_COLUMNS
+
+
+def build_holding_row(holding: dict, user_id: str, pan_number: str, as_on_date: str) -> dict:
+    """Map one top_holdings_bucket entry to portfolio_holdings column values"""
+    # Extract rolling returns data
+    rolling_4q = holding.get('rolling_4_quarter_returns_comparison', {})
+    rolling_12q = holding.get('rolling_12_quarter_returns_comparison', {})
+    
+    row = {
+        'user_id': user_id,
+        'pan_number': pan_number,
+        'as_on_date': as_on_date,
+        'wpc': holding.get('wpc'),
+        'scheme_name': holding.get('scheme_name'),
+        'category': holding.get('category'),
+        'amc_name': holding.get('amc_name'),
+        'nav': holding.get('nav'),
+        'nav_as_on': holding.get('nav_as_on'),
+        'current_value': holding.get('current_value'),
+        'portfolio_weight': holding.get('portfolio_weight'),
+        'benchmark_name': holding.get('benchmark_name'),
+        'live_xirr': holding.get('live_xirr'),
+        'benchmark_xirr': holding.get('benchmark_xirr'),
+        'xirr_performance': holding.get('xirr_performance'),
+        'one_year_returns': holding.get('one_year_returns'),
+        'three_year_returns_cagr': holding.get('three_year_returns_cagr'),
+        'benchmark_three_year_returns_cagr': holding.get('benchmark_three_year_returns_cagr'),
+        'three_year_returns_alpha': holding.get('three_year_returns_alpha'),
+        'five_year_returns_cagr': holding.get('five_year_returns_cagr'),
+        'benchmark_five_year_returns_cagr': holding.get('benchmark_five_year_returns_cagr'),
+        'five_year_returns_alpha': holding.get('five_year_returns_alpha'),
+        'rolling_4q_beat_count': rolling_4q.get('beat_quarters_count'),
+        'rolling_4q_total_count': rolling_4q.get('total_quarters'),
+        'rolling_4q_beat_percentage': rolling_4q.get('beat_percentage'),
+        'rolling_12q_beat_count': rolling_12q.get('beat_quarters_count'),
+        'rolling_12q_total_count': rolling_12q.get('total_quarters'),
+        'rolling_12q_beat_percentage': rolling_12q.get('beat_percentage'),
+        'realized_stcg': holding.get('realized_stcg'),
+        'realized_ltcg': holding.get('realized_ltcg'),
+        'unrealized_stu': holding.get('unrealized_stu'),
+        'unrealized_ltu': holding.get('unrealized_ltu'),
+        'cost_of_unrealized_stu': holding.get('cost_of_unrealized_stu'),
+        'cost_of_unrealized_ltu': holding.get('cost_of_unrealized_ltu'),
+        'unrealized_stcg': holding.get('unrealized_stcg'),
+        'unrealized_ltcg': holding.get('unrealized_ltcg'),
+        'comment': holding.get('comment'),
+        'w_rating': holding.get('w_rating'),
+        'w_rating_numeric': parse_rating(holding.get('w_rating'))
+    }
+    row.update(derive_holding_fields(row))
+    return row
+
+
+def iter_holding_rows(result: dict):
+    """Yield portfolio_holdings column values for every holding of one results[] entry"""
+    client_details = result.get('client_details', {})
+    for holding in result.get('top_holdings_bucket', []):
+        yield build_holding_row(
+            holding, result.get('user_id'), result.get('pan_number'), client_details.get('as_on_date')
+        )
+
+
+# Superseded snapshots are moved here when --retain is used
+HISTORY_TABLE = "portfolio_holdings_history"
+HISTORY_COLUMNS = ['id'] + PORTFOLIO_COLUMNS + ['created_in_db']
+
+
+def ensure_history_table(cursor):
+    """Create portfolio_holdings_history (holdings columns + archived_at) if missing"""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} AS
+        SELECT {', '.join(HISTORY_COLUMNS)} FROM portfolio_holdings WITH NO DATA
+    """)
+    cursor.execute(f"ALTER TABLE {HISTORY_TABLE} ADD COLUMN IF NOT EXISTS archived_at TIMESTAMPTZ DEFAULT now()")
 
+    # Pick up columns added to portfolio_holdings after the history table was created
+    cursor.execute("""
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = 'portfolio_holdings'::regclass
+          AND a.attname = ANY(%s)
+          AND NOT a.attisdropped
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_attribute h
+              WHERE h.attrelid = %s::regclass AND h.attname = a.attname AND NOT h.attisdropped
+          )
+    """, (HISTORY_COLUMNS, HISTORY_TABLE))
+    for column, column_type in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE {HISTORY_TABLE} ADD COLUMN {column} {column_type}")
 
-def import_portfolio_data(json_file_path: str):
-    """Import portfolio data from JSON file"""
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS ix_{HISTORY_TABLE}_user_snapshot
+        ON {HISTORY_TABLE} (user_id, archived_at, as_on_date)
+    """)
+
+
+def replace_portfolio_snapshot(connection, results, retain: int = 0, batch_size: int = 10000) -> dict:
+    """
+    Stage results[] with COPY and swap each user's holdings in one transaction.
+    
+    For every user in the dump (the last entry wins if a user appears twice)
+    all existing holdings are deleted and the new snapshot inserted, with set-
+    based statements. Users whose entry has no top_holdings_bucket at all
+    (failed fetches) keep their current holdings; an empty list clears them.
+    
+    Retention policy:
+    - retain == 0: replaced holdings are dropped and any history of the
+      users in the dump is pruned
+    - retain == N: holdings of an older as_on_date are moved to
+      portfolio_holdings_history and only the latest N archived snapshots
+      per user are kept
+    
+    Staging and the table setup (history table only when retain > 0, month
+    partitions of a partitioned portfolio_holdings) are committed on
+    `connection` before the swap, so the swap's lock covers no DDL. The
+    swap itself is left open: the caller commits or rolls it back.
+    
+    Returns:
+        Dictionary with users / inserted / replaced / archived / pruned /
+        skipped_users / errors counts
+    """
+    stage_table = "portfolio_holdings_stage"
+    users_table = "portfolio_snapshot_users"
+    stats = {'users': 0, 'inserted': 0, 'replaced': 0, 'archived': 0, 'pruned': 0,
+             'skipped_users': 0, 'errors': 0}
+    
+    cursor = connection.cursor()
+    create_staging_table(cursor, stage_table, "portfolio_holdings", PORTFOLIO_COLUMNS)
+    cursor.execute(f"ALTER TABLE {stage_table} ADD COLUMN result_seq BIGINT")
+    cursor.execute(f"DROP TABLE IF EXISTS {users_table}")
+    cursor.execute(f"CREATE TEMP TABLE {users_table} (user_id VARCHAR, as_on_date VARCHAR, result_seq BIGINT)")
+    
+    stage_columns = PORTFOLIO_COLUMNS + ['seq', 'result_seq']
+    user_columns = ['user_id', 'as_on_date', 'result_seq']
+    codes = LookupCodes('portfolio_holdings')
+    holdings, users = [], []
+    row_seq = 0
+    
+    for result_seq, result in enumerate(results):
+        user_id = result.get('user_id')
+        if not user_id or result.get('top_holdings_bucket') is None:
+            stats['skipped_users'] += 1
+            continue
+        try:
+            rows = [codes.encode(row) for row in iter_holding_rows(result)]
+        except Exception as e:
+            print(f"   ⚠️  Error importing holdings for user {user_id}: {e}")
+            stats['errors'] += 1
+            continue
+        
+        for row in rows:
+            row['seq'] = row_seq
+            row['result_seq'] = result_seq
+            row_seq += 1
+        holdings.extend(rows)
+        users.append({
+            'user_id': user_id,
+            'as_on_date': result.get('client_details', {}).get('as_on_date'),
+            'result_seq': result_seq
+        })
+        
+        if len(holdings) >= batch_size:
+            copy_rows(cursor, stage_table, stage_columns, holdings)
+            copy_rows(cursor, users_table, user_columns, users)
+            holdings, users = [], []
+            print(f"   Staged {row_seq} holdings...")
+    
+    copy_rows(cursor, stage_table, stage_columns, holdings)
+    copy_rows(cursor, users_table, user_columns, users)
+    
+    # The last entry of a user in the dump wins
+    cursor.execute(f"""
+        DELETE FROM {users_table} s
+        USING {users_table} later
+        WHERE later.user_id = s.user_id AND later.result_seq > s.result_seq
+    """)
+    cursor.execute(f"CREATE INDEX ON {users_table} (user_id)")
+    cursor.execute(f"ANALYZE {users_table}")
+    cursor.execute(f"SELECT count(*) FROM {users_table}")
+    stats['users'] = cursor.fetchone()[0]
+    
+    # Staging is session-local (TEMP tables survive the commit); committing it
+    # releases the lock CREATE TABLE ... AS took on portfolio_holdings
+    connection.commit()
+    
+    # Table setup (history table, month partitions) in its own short
+    # transaction: creating a partition locks out readers until commit
+    cursor.execute("LOCK TABLE portfolio_holdings IN SHARE ROW EXCLUSIVE MODE")
+    if retain > 0:
+        ensure_history_table(cursor)
+    ensure_range_partitions(cursor, "portfolio_holdings", stage_table)
+    connection.commit()
+    
+    # Serialize concurrent snapshot swaps (parallel shards sharing a user);
+    # readers are not blocked and keep seeing the previous snapshot
+    cursor.execute("LOCK TABLE portfolio_holdings IN SHARE ROW EXCLUSIVE MODE")
+    
+    history_columns = ', '.join(HISTORY_COLUMNS)
+    if retain > 0:
+        returning = ', '.join(f"h.{c}" for c in HISTORY_COLUMNS)
+        cursor.execute(f"""
+            WITH replaced AS (
+                DELETE FROM portfolio_holdings h
+                USING {users_table} s
+                WHERE h.user_id = s.user_id
+                RETURNING {returning}, h.as_on_date IS DISTINCT FROM s.as_on_date AS superseded
+            ), archived AS (
+                INSERT INTO {HISTORY_TABLE} ({history_columns})
+                SELECT {history_columns} FROM replaced WHERE superseded
+                RETURNING 1
+            )
+            SELECT (SELECT count(*) FROM replaced), (SELECT count(*) FROM archived)
+        """)
+        stats['replaced'], stats['archived'] = cursor.fetchone()
+    else:
+        cursor.execute(f"""
+            DELETE FROM portfolio_holdings h
+            USING {users_table} s
+            WHERE h.user_id = s.user_id
+        """)
+        stats['replaced'] = cursor.rowcount
+    
+    column_list = ', '.join(PORTFOLIO_COLUMNS)
+    cursor.execute(f"""
+        INSERT INTO portfolio_holdings ({column_list})
+        SELECT {', '.join(f'st.{c}' for c in PORTFOLIO_COLUMNS)}
+        FROM {stage_table} st
+        JOIN {users_table} s ON s.user_id = st.user_id AND s.result_seq = st.result_seq
+        ORDER BY st.seq
+    """)
+    stats['inserted'] = cursor.rowcount
+    
+    # Keep only the latest `retain` archived snapshots of the users in the dump
+    # (with retain == 0 the history table is only pruned, never created)
+    cursor.execute("SELECT to_regclass(%s)", (HISTORY_TABLE,))
+    if cursor.fetchone()[0] is not None:
+        cursor.execute(f"""
+            DELETE FROM {HISTORY_TABLE} h
+            USING (
+                SELECT user_id, as_on_date, archived_at,
+                       dense_rank() OVER (
+                           PARTITION BY user_id ORDER BY archived_at DESC, as_on_date DESC
+                       ) AS snapshot_rank
+                FROM (
+                    SELECT DISTINCT hh.user_id, hh.as_on_date, hh.archived_at
+                    FROM {HISTORY_TABLE} hh
+                    JOIN {users_table} s ON s.user_id = hh.user_id
+                ) snapshots
+            ) ranked
+            WHERE h.user_id = ranked.user_id
+              AND h.as_on_date IS NOT DISTINCT FROM ranked.as_on_date
+              AND h.archived_at = ranked.archived_at
+              AND ranked.snapshot_rank > %s
+        """, (retain,))
+        stats['pruned'] = cursor.rowcount
+    
+    cursor.execute(f"DROP TABLE IF EXISTS {stage_table}")
+    cursor.execute(f"DROP TABLE IF EXISTS {users_table}")
+    return stats
+
+
+def import_portfolio_data(json_file_path: str, retain: int = 0, batch_size: int = 10000):
+    """
+    Import a portfolio dump as an atomic per-user snapshot replace.
+    
+    Args:
+        json_file_path: Portfolio JSON dump ({"total_users", ..., "results": [...]})
+        retain: Superseded snapshots to keep per user in portfolio_holdings_history
+        batch_size: Holdings per COPY batch
+    """
     
     print(f"📊 Starting portfolio data import from {json_file_path}")
     
@@ -26,144 +316,61 @@ def import_portfolio_data(json_file_path: str):
     print("📋 Creating tables if needed...")
     Base.metadata.create_all(bind=engine)
     
-    # Load JSON data
-    print("📖 Loading JSON data...")
-    try:
-        with open(json_file_path, 'r') as f:
-            data = json.load(f)
-    except FileNotFoundError:
+    if not Path(json_file_path).exists():
         print(f"❌ Error: File not found at {json_file_path}")
-        return
-    except json.JSONDecodeError as e:
-        print(f"❌ Error: Invalid JSON format - {e}")
-        return
+        return None
     
-    print(f"✅ Loaded data for {data.get('total_users', 0)} users")
-    print(f"   Successful: {data.get('successful', 0)}, Failed: {data.get('failed', 0)}")
+    # Stream results[] one user at a time; header collects the summary
+    # fields (total_users, successful, failed) that precede the array
+    print("📖 Streaming JSON data into the staging table...")
+    header = {}
+    results = iter_json_array(json_file_path, key='results', header=header)
     
-    db = SessionLocal()
+    connection = engine.raw_connection()
+    stats = None
     
     try:
-        imported_count = 0
-        skipped_count = 0
-        users_processed = 0
-        
-        results = data.get('results', [])
-        total_users = len(results)
+        stats = replace_portfolio_snapshot(connection, results, retain=retain, batch_size=batch_size)
+        print(f"\n💾 Swapping in the new snapshot...")
+        connection.commit()
         
-        for idx, result in enumerate(results, 1):
-            user_id = result.get('user_id')
-            pan_number = result.get('pan_number')
-            client_details = result.get('client_details', {})
-            as_on_date = client_details.get('as_on_date')
-            
-            print(f"\n[{idx}/{total_users}] Processing user: {user_id} ({client_details.get('name', 'Unknown')})")
-            
-            holdings_count = 0
-            
-            # Process each holding in top_holdings_bucket
-            for holding in result.get('top_holdings_bucket', []):
-                try:
-                    # Extract rolling returns data
-                    rolling_4q = holding.get('rolling_4_quarter_returns_comparison', {})
-                    rolling_12q = holding.get('rolling_12_quarter_returns_comparison', {})
-                    
-                    portfolio_holding = PortfolioHolding(
-                        user_id=user_id,
-                        pan_number=pan_number,
-                        as_on_date=as_on_date,
-                        wpc=holding.get('wpc'),
-                        scheme_name=holding.get('scheme_name'),
-                        category=holding.get('category'),
-                        amc_name=holding.get('amc_name'),
-                        nav=holding.get('nav'),
-                        nav_as_on=holding.get('nav_as_on'),
-                        current_value=holding.get('current_value'),
-                        portfolio_weight=holding.get('portfolio_weight'),
-                        benchmark_name=holding.get('benchmark_name'),
-                        live_xirr=holding.get('live_xirr'),
-                        benchmark_xirr=holding.get('benchmark_xirr'),
-                        xirr_performance=holding.get('xirr_performance'),
-                        one_year_returns=holding.get('one_year_returns'),
-                        three_year_returns_cagr=holding.get('three_year_returns_cagr'),
-                        benchmark_three_year_returns_cagr=holding.get('benchmark_three_year_returns_cagr'),
-                        three_year_returns_alpha=holding.get('three_year_returns_alpha'),
-                        five_year_returns_cagr=holding.get('five_year_returns_cagr'),
-                        benchmark_five_year_returns_cagr=holding.get('benchmark_five_year_returns_cagr'),
-                        five_year_returns_alpha=holding.get('five_year_returns_alpha'),
-                        rolling_4q_beat_count=rolling_4q.get('beat_quarters_count'),
-                        rolling_4q_total_count=rolling_4q.get('total_quarters'),
-                        rolling_4q_beat_percentage=rolling_4q.get('beat_percentage'),
-                        rolling_12q_beat_count=rolling_12q.get('beat_quarters_count'),
-                        rolling_12q_total_count=rolling_12q.get('total_quarters'),
-                        rolling_12q_beat_percentage=rolling_12q.get('beat_percentage'),
-                        realized_stcg=holding.get('realized_stcg'),
-                        realized_ltcg=holding.get('realized_ltcg'),
-                        unrealized_stu=holding.get('unrealized_stu'),
-                        unrealized_ltu=holding.get('unrealized_ltu'),
-                        cost_of_unrealized_stu=holding.get('cost_of_unrealized_stu'),
-                        cost_of_unrealized_ltu=holding.get('cost_of_unrealized_ltu'),
-                        unrealized_stcg=holding.get('unrealized_stcg'),
-                        unrealized_ltcg=holding.get('unrealized_ltcg'),
-                        comment=holding.get('comment'),
-                        w_rating=holding.get('w_rating')
-                    )
-                    
-                    db.add(portfolio_holding)
-                    imported_count += 1
-                    holdings_count += 1
-                    
-                except Exception as e:
-                    print(f"   ⚠️  Error importing holding {holding.get('wpc')} for user {user_id}: {e}")
-                    skipped_count += 1
-                    continue
-            
-            print(f"   ✅ Imported {holdings_count} holdings for this user")
-            users_processed += 1
-            
-            # Commit every 10 users to avoid memory issues
-            if users_processed % 10 == 0:
-                try:
-                    print(f"\n💾 Committing batch... ({users_processed}/{total_users} users processed)")
-                    db.commit()
-                except Exception as commit_error:
-                    print(f"⚠️  Batch commit failed: {commit_error}")
-                    db.rollback()
-        
-        # Final commit
-        try:
-            print(f"\n💾 Final commit...")
-            db.commit()
-            
-            print(f"\n{'='*60}")
-            print(f"✅ Import Complete!")
-            print(f"{'='*60}")
-            print(f"Users processed: {users_processed}")
-            print(f"Holdings imported: {imported_count}")
-            print(f"Holdings skipped: {skipped_count}")
-            if (imported_count + skipped_count) > 0:
-                print(f"Success rate: {imported_count / (imported_count + skipped_count) * 100:.1f}%")
-        except Exception as final_commit_error:
-            print(f"⚠️  Final commit had issues: {final_commit_error}")
-            db.rollback()
+        print(f"\n{'='*60}")
+        print(f"✅ Import Complete!")
+        print(f"{'='*60}")
+        print(f"Users in dump: {header.get('total_users', '?')} "
+              f"(successful: {header.get('successful', 0)}, failed: {header.get('failed', 0)})")
+        print(f"Users replaced: {stats['users']}")
+        print(f"Users skipped (no holdings data): {stats['skipped_users']}")
+        print(f"Holdings imported: {stats['inserted']}")
+        print(f"Previous holdings replaced: {stats['replaced']}")
+        print(f"Snapshots archived / pruned rows: {stats['archived']} / {stats['pruned']}")
+        print(f"Errors: {stats['errors']}")
         
+    except json.JSONDecodeError as e:
+        print(f"❌ Error: Invalid JSON format - {e}")
+        connection.rollback()
     except Exception as e:
         print(f"\n❌ Error during import: {e}")
-        print(f"Rolling back transaction...")
-        db.rollback()
+        print(f"Rolling back transaction (previous snapshot is untouched)...")
+        connection.rollback()
     finally:
-        db.close()
+        connection.close()
+        print_peak_memory()
+    
+    return stats
 
 
 if __name__ == "__main__":
     # Default file path
     default_path = "/Users/rishurajsinha/Downloads/portfolio_data.json"
     
-    # Check if custom path provided
-    if len(sys.argv) > 1:
-        json_file_path = sys.argv[1]
-    else:
-        json_file_path = default_path
+    arg_parser = argparse.ArgumentParser(description="Import portfolio holdings from a JSON dump")
+    arg_parser.add_argument("json_file", nargs="?", default=default_path, help="Path to the portfolio JSON dump")
+    arg_parser.add_argument("--retain", type=int, default=0,
+                            help="Superseded snapshots to keep per user in portfolio_holdings_history (default: 0)")
+    arg_parser.add_argument("--batch-size", type=int, default=10000,
+                            help="Holdings per COPY batch (default: 10000)")
+    args = arg_parser.parse_args()
     
     print(f"""
 ╔════════════════════════════════════════════════════════════╗
@@ -172,4 +379,4 @@ if __name__ == "__main__":
 ╚════════════════════════════════════════════════════════════╝
 """)
     
-    import_portfolio_data(json_file_path)
+    import_portfolio_data(args.json_file, retain=args.retain, batch_size=args.batch_size)
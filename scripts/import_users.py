@@ -4,7 +4,7 @@ Import user data from JSON file into PostgreSQL.
 Generates mock date_of_birth for each user (ages 25-70).
 """
 
-import json
+import argparse
 import sys
 import os
 from datetime import datetime, date
@@ -15,6 +15,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import SessionLocal, engine, Base
 from app.models import User
+from app.derived_fields import USER_DERIVED_COLUMNS, derive_user_fields
+from scripts.checkpoints import ImportCheckpointTracker
+from scripts.import_utils import iter_json_array, print_peak_memory
 
 
 def clean_numeric_string(value: str) -> float:
@@ -47,30 +50,101 @@ def generate_mock_dob() -> date:
     return date(birth_year, birth_month, birth_day)
 
 
-def import_user_data(json_file_path: str):
-    """Import user data from JSON file into PostgreSQL"""
+# Columns written by both the row-by-row and the bulk import paths
+USER_COLUMNS = [
+    'uid', 'user_id', 'crn', 'name', 'email', 'phone_number', 'date_of_birth', 'agent_external_id',
+    'agent_name', 'agent_email', 'agent_phone_number', 'member_id', 'total_current_value',
+    'mf_current_value', 'fd_current_value', 'aif_current_value', 'deb_current_value',
+    'pms_current_value', 'preipo_current_value', 'total_invested_value', 'mf_invested_value',
+    'fd_invested_value', 'aif_invested_value', 'deb_invested_value', 'pms_invested_value',
+    'preipo_invested_value', 'trak_cob_opportunity_value', 'latest_as_on_date', 'first_active_at',
+    'first_active_mf', 'first_active_fd', 'first_active_insurance', 'first_active_mld',
+    'first_active_ncd', 'first_active_aif', 'first_active_pms', 'first_active_preipo',
+    'first_active_mf_sip', 'inserted_at', 'event_date', 'created_at'
+] + USER_DERIVED_COLUMNS
+
+
+def build_user_row(record: dict) -> dict:
+    """Map a raw user export record to users column values (with a mock DOB and typed dates)"""
+    row = {
+        'uid': record.get('uid'),
+        'user_id': record.get('user_id'),
+        'crn': record.get('crn'),
+        'name': record.get('name'),
+        'email': record.get('email'),
+        'phone_number': record.get('phone_number'),
+        'date_of_birth': generate_mock_dob(),
+        'agent_external_id': record.get('agent_external_id'),
+        'agent_name': record.get('agent_name'),
+        'agent_email': record.get('agent_email'),
+        'agent_phone_number': record.get('agent_phone_number'),
+        'member_id': record.get('member_id'),
+        'total_current_value': clean_numeric_string(record.get('total_current_value', '0')),
+        'mf_current_value': clean_numeric_string(record.get('mf_current_value', '0')),
+        'fd_current_value': clean_numeric_string(record.get('fd_current_value', '0')),
+        'aif_current_value': clean_numeric_string(record.get('aif_current_value', '0')),
+        'deb_current_value': clean_numeric_string(record.get('deb_current_value', '0')),
+        'pms_current_value': clean_numeric_string(record.get('pms_current_value', '0')),
+        'preipo_current_value': clean_numeric_string(record.get('preipo_current_value', '0')),
+        'total_invested_value': clean_numeric_string(record.get('total_invested_value', '0')),
+        'mf_invested_value': clean_numeric_string(record.get('mf_invested_value', '0')),
+        'fd_invested_value': clean_numeric_string(record.get('fd_invested_value', '0')),
+        'aif_invested_value': clean_numeric_string(record.get('aif_invested_value', '0')),
+        'deb_invested_value': clean_numeric_string(record.get('deb_invested_value', '0')),
+        'pms_invested_value': clean_numeric_string(record.get('pms_invested_value', '0')),
+        'preipo_invested_value': clean_numeric_string(record.get('preipo_invested_value', '0')),
+        'trak_cob_opportunity_value': clean_numeric_string(record.get('trak_cob_opportunity_value', '0')),
+        'latest_as_on_date': record.get('latest_as_on_date'),
+        'first_active_at': record.get('first_active_at'),
+        'first_active_mf': record.get('first_active_mf'),
+        'first_active_fd': record.get('first_active_fd'),
+        'first_active_insurance': record.get('first_active_insurance'),
+        'first_active_mld': record.get('first_active_mld'),
+        'first_active_ncd': record.get('first_active_ncd'),
+        'first_active_aif': record.get('first_active_aif'),
+        'first_active_pms': record.get('first_active_pms'),
+        'first_active_preipo': record.get('first_active_preipo'),
+        'first_active_mf_sip': record.get('first_active_mf_sip'),
+        'inserted_at': record.get('inserted_at'),
+        'event_date': record.get('event_date'),
+        'created_at': record.get('created_at')
+    }
+    row.update(derive_user_fields(row))
+    return row
+
+
+def import_user_data(json_file_path: str, restart: bool = False):
+    """
+    Import user data from JSON file into PostgreSQL.
+    
+    Progress is checkpointed with every batch commit; a re-run of the same
+    file resumes after the last committed record unless `restart` is set.
+    """
     
     # Create tables
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
     
-    # Load JSON data
-    print(f"Loading data from {json_file_path}...")
-    with open(json_file_path, 'r') as f:
-        data = json.load(f)
-    
-    print(f"Found {len(data)} user records to import")
+    # Stream records from the JSON file
+    print(f"Streaming data from {json_file_path}...")
+    records = iter_json_array(json_file_path)
     
     # Create database session
     db = SessionLocal()
+    read = 0
+    imported = 0
+    skipped = 0
+    errors = 0
     
     try:
-        imported = 0
-        skipped = 0
-        errors = 0
+        checkpoint = ImportCheckpointTracker(db, 'user', json_file_path, restart=restart)
+        checkpoint.print_resume_status()
         session_user_ids = set()  # Track user_ids in current session to avoid duplicates within batch
         
-        for record in data:
+        for record in records:
+            read += 1
+            if read <= checkpoint.resume_offset:
+                continue
             try:
                 user_id = record.get('user_id')
                 
@@ -95,53 +169,8 @@ def import_user_data(json_file_path: str):
                 # Add to session tracker
                 session_user_ids.add(user_id)
                 
-                # Generate mock DOB
-                mock_dob = generate_mock_dob()
-                
-                # Create User record
-                user = User(
-                    uid=record.get('uid'),
-                    user_id=user_id,
-                    crn=record.get('crn'),
-                    name=record.get('name'),
-                    email=record.get('email'),
-                    phone_number=record.get('phone_number'),
-                    date_of_birth=mock_dob,
-                    agent_external_id=record.get('agent_external_id'),
-                    agent_name=record.get('agent_name'),
-                    agent_email=record.get('agent_email'),
-                    agent_phone_number=record.get('agent_phone_number'),
-                    member_id=record.get('member_id'),
-                    total_current_value=clean_numeric_string(record.get('total_current_value', '0')),
-                    mf_current_value=clean_numeric_string(record.get('mf_current_value', '0')),
-                    fd_current_value=clean_numeric_string(record.get('fd_current_value', '0')),
-                    aif_current_value=clean_numeric_string(record.get('aif_current_value', '0')),
-                    deb_current_value=clean_numeric_string(record.get('deb_current_value', '0')),
-                    pms_current_value=clean_numeric_string(record.get('pms_current_value', '0')),
-                    preipo_current_value=clean_numeric_string(record.get('preipo_current_value', '0')),
-                    total_invested_value=clean_numeric_string(record.get('total_invested_value', '0')),
-                    mf_invested_value=clean_numeric_string(record.get('mf_invested_value', '0')),
-                    fd_invested_value=clean_numeric_string(record.get('fd_invested_value', '0')),
-                    aif_invested_value=clean_numeric_string(record.get('aif_invested_value', '0')),
-                    deb_invested_value=clean_numeric_string(record.get('deb_invested_value', '0')),
-                    pms_invested_value=clean_numeric_string(record.get('pms_invested_value', '0')),
-                    preipo_invested_value=clean_numeric_string(record.get('preipo_invested_value', '0')),
-                    trak_cob_opportunity_value=clean_numeric_string(record.get('trak_cob_opportunity_value', '0')),
-                    latest_as_on_date=record.get('latest_as_on_date'),
-                    first_active_at=record.get('first_active_at'),
-                    first_active_mf=record.get('first_active_mf'),
-                    first_active_fd=record.get('first_active_fd'),
-                    first_active_insurance=record.get('first_active_insurance'),
-                    first_active_mld=record.get('first_active_mld'),
-                    first_active_ncd=record.get('first_active_ncd'),
-                    first_active_aif=record.get('first_active_aif'),
-                    first_active_pms=record.get('first_active_pms'),
-                    first_active_preipo=record.get('first_active_preipo'),
-                    first_active_mf_sip=record.get('first_active_mf_sip'),
-                    inserted_at=record.get('inserted_at'),
-                    event_date=record.get('event_date'),
-                    created_at=record.get('created_at')
-                )
+                # Create User record (with mock DOB)
+                user = User(**build_user_row(record))
                 
                 db.add(user)
                 imported += 1
@@ -149,26 +178,27 @@ def import_user_data(json_file_path: str):
                 # Commit in smaller batches to isolate potential errors
                 if imported % 50 == 0:
                     try:
-                        db.commit()
+                        checkpoint.commit(read)
                         print(f"✅ Imported {imported} records (skipped {skipped} duplicates)...")
                         # Clear session tracker after successful commit
                         session_user_ids.clear()
                     except Exception as commit_error:
                         print(f"⚠️  Batch commit failed: {commit_error}")
-                        db.rollback()
+                        checkpoint.rollback()
                         session_user_ids.clear()  # Clear tracker on rollback too
                         errors += 1
                     
             except Exception as e:
                 print(f"⚠️  Error with user {record.get('user_id')}: {str(e)}")
-                db.rollback()
+                checkpoint.rollback()
                 errors += 1
                 continue
         
         # Final commit for remaining records
         try:
-            db.commit()
+            checkpoint.commit(read, completed=True)
             print(f"\n✅ Import completed!")
+            print(f"Total records read: {read}")
             print(f"Total imported: {imported}")
             print(f"Total skipped (duplicates): {skipped}")
             print(f"Total errors: {errors}")
@@ -176,24 +206,32 @@ def import_user_data(json_file_path: str):
             print(f"   You can update these later with actual DOB data.")
         except Exception as final_commit_error:
             print(f"⚠️  Final commit had issues: {final_commit_error}")
-            db.rollback()
+            checkpoint.rollback()
         
     except Exception as e:
         print(f"❌ Error during import: {str(e)}")
         db.rollback()
     finally:
         db.close()
+        print_peak_memory()
+    
+    return {
+        'inserted': imported,
+        'updated': 0,
+        'skipped': skipped,
+        'errors': errors
+    }
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python import_users.py <path_to_json_file>")
-        sys.exit(1)
-    
-    json_file = sys.argv[1]
+    arg_parser = argparse.ArgumentParser(description="Import user data into PostgreSQL")
+    arg_parser.add_argument("json_file", help="Path to the user JSON export")
+    arg_parser.add_argument("--restart", action="store_true",
+                            help="Ignore any saved checkpoint and import the file from the start")
+    args = arg_parser.parse_args()
     
-    if not os.path.exists(json_file):
-        print(f"Error: File not found: {json_file}")
+    if not os.path.exists(args.json_file):
+        print(f"Error: File not found: {args.json_file}")
         sys.exit(1)
     
-    import_user_data(json_file)
+    import_user_data(args.json_file, restart=args.restart)
@@ -0,0 +1,145 @@
+"""
+Shared helpers for the import scripts.
+
+- iter_json_array: stream the records of a JSON export one at a time, so peak
+  memory depends on the batch size rather than the file size
+- peak_rss_mb / print_peak_memory: report the process high-water mark
+"""
+
+import json
+import sys
+from typing import Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+_WHITESPACE = " \t\n\r"
+
+
+class _JSONStreamReader:
+    """Minimal pull reader over a text file for incremental JSON decoding"""
+
+    def __init__(self, file_obj, chunk_size: int = 1 << 16):
+        self.file = file_obj
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Read another chunk; drop the consumed prefix first. False at EOF."""
+        if self.eof:
+            return False
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON stream: expected '{char}', found '{found or 'EOF'}'")
+        self.pos += 1
+
+    def decode_value(self):
+        """Decode the next complete JSON value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A scalar ending exactly at the buffer edge may be truncated ("12" of "123")
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(
+    json_file_path: str,
+    key: Optional[str] = None,
+    header: Optional[dict] = None
+) -> Iterator:
+    """
+    Yield the elements of a JSON array without loading the whole file.
+
+    Args:
+        json_file_path: Path to the JSON export
+        key: None if the file is a top-level array; otherwise the top-level
+             object key holding the array (e.g. "results" for portfolio dumps)
+        header: Optional dict that receives the top-level values that appear
+                before `key` (e.g. total_users in the portfolio dump)
+
+    Yields:
+        Each array element (usually a record dict)
+    """
+    with open(json_file_path, 'r') as f:
+        reader = _JSONStreamReader(f)
+
+        if key is not None:
+            reader.expect('{')
+            while True:
+                if reader.peek() == '}':
+                    return
+                name = reader.decode_value()
+                reader.expect(':')
+                if name == key:
+                    break
+                value = reader.decode_value()
+                if header is not None:
+                    header[name] = value
+                if reader.peek() == ',':
+                    reader.expect(',')
+
+        reader.expect('[')
+        if reader.peek() == ']':
+            return
+        while True:
+            yield reader.decode_value()
+            separator = reader.peek()
+            if separator == ',':
+                reader.expect(',')
+            elif separator == ']':
+                return
+            else:
+                raise ValueError(f"Invalid JSON stream: expected ',' or ']', found '{separator or 'EOF'}'")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def print_peak_memory():
+    """Print the peak RSS at the end of an import"""
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"📈 Peak memory (RSS): {peak:.1f} MB")
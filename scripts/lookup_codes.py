@@ -0,0 +1,71 @@
+"""
+Dictionary encoding of the categorical export columns for the importers.
+
+The builders (build_sip_row, build_insurance_row, build_holding_row) keep
+producing the raw strings; LookupCodes.encode swaps them for the INTEGER
+codes in lookup_values right before a row is staged or added to a session.
+Codes are cached per import, so a value costs a round trip or two the
+first time it is seen and none afterwards.
+
+New values are registered on a separate, immediately committed connection.
+Parallel shards seeing the same new value therefore never wait on each
+other's import transaction, and a rolled-back import leaves at most an
+unused lookup value behind.
+"""
+
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.derived_fields import CODED_COLUMNS, lookup_field
+
+
+class LookupCodes:
+    """Value -> lookup_values.id cache for the coded columns of one table"""
+
+    def __init__(self, table: str):
+        self.table = table
+        self.columns = CODED_COLUMNS.get(table, {})
+        self.fields = {raw: lookup_field(table, raw) for raw in self.columns}
+        self.codes: Dict[tuple, int] = {}
+        if self.columns:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    text("SELECT field, value, id FROM lookup_values WHERE field = ANY(:fields)"),
+                    {'fields': list(self.fields.values())}
+                )
+                self.codes = {(field, value): code for field, value, code in rows}
+
+    def code(self, field: str, value) -> Optional[int]:
+        """Code of `value` in `field`, registering it if it is new; None for None"""
+        if value is None:
+            return None
+        value = str(value)
+        key = (field, value)
+        code = self.codes.get(key)
+        if code is None:
+            # Only values missing from lookup_values are inserted: a conflicting
+            # INSERT still burns a sequence value, so a value another shard
+            # registered since the preload is looked up first
+            lookup = text("SELECT id FROM lookup_values WHERE field = :field AND value = :value")
+            params = {'field': field, 'value': value}
+            with engine.begin() as conn:
+                code = conn.execute(lookup, params).scalar()
+                if code is None:
+                    code = conn.execute(
+                        text("INSERT INTO lookup_values (field, value) VALUES (:field, :value) "
+                             "ON CONFLICT (field, value) DO NOTHING RETURNING id"),
+                        params
+                    ).scalar()
+                if code is None:  # registered concurrently between the two statements
+                    code = conn.execute(lookup, params).scalar()
+            self.codes[key] = code
+        return code
+
+    def encode(self, row: dict) -> dict:
+        """Replace the raw categorical values of a built row with their codes (in place)"""
+        for raw, coded in self.columns.items():
+            if raw in row:
+                row[coded] = self.code(self.fields[raw], row.pop(raw))
+        return row
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+"""
+Optional partitioned layout for sip_records and portfolio_holdings.
+
+- sip_records is HASH partitioned on agent_external_id. Only endpoints
+  filtered on agent_external_id prune to the one partition holding that
+  agent's SIPs: the stagnant and stopped SIP opportunities (the stopped
+  list still probes every partition's user_id index for the scheme names
+  of the returned clients). The no-increase, failed and high-value
+  inactive lists filter on agent_id and scan every partition, through
+  each partition's agent_id index.
+- portfolio_holdings is RANGE partitioned on as_on_date_on, one partition
+  per calendar month (plus a default partition for holdings without a
+  date), so a stale snapshot month is dropped with --drop-portfolio-before
+  instead of a DELETE.
+
+Converting rebuilds the table in one transaction: a new table with the same
+columns, defaults and check constraints is created in the target layout,
+the rows are copied, the old table is dropped and the new one takes its
+name, its sequence, its indexes and its foreign keys. --revert goes back to
+the plain table the models describe. Readers and writers wait for the
+conversion (ACCESS EXCLUSIVE lock) rather than see a half-copied table.
+
+What changes while a table is partitioned:
+- primary keys on id are per partition (ids still come from one sequence)
+- the unique sip_meta_id index becomes (sip_meta_id, agent_external_id)
+  NULLS NOT DISTINCT; bulk_merge detects this and moves a SIP whose agent
+  changed instead of inserting it twice
+- sip_schemes.sip_id loses its foreign key (PostgreSQL can only reference a
+  partitioned table through a key containing the partition key); statement
+  triggers on sip_records take over its ON DELETE CASCADE, so deleting or
+  truncating SIPs through sip_records still removes their scheme lists
+  (rows deleted from a single partition directly are not followed)
+- importers create the month partitions of new snapshot dates on the fly
+  (ensure_range_partitions)
+
+Usage:
+    python scripts/partition_tables.py                      # partition both tables
+    python scripts/partition_tables.py --table sip_records --sip-partitions 32
+    python scripts/partition_tables.py --drop-portfolio-before 2025-01-01
+    python scripts/partition_tables.py --revert
+    python scripts/partition_tables.py --status
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import date
+from typing import List
+
+# Add parent directory to path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from scripts.bulk_load import partition_key_columns
+
+
+# table -> partitioned layout
+PARTITION_LAYOUTS = {
+    'sip_records': {
+        'strategy': 'HASH',
+        'key': 'agent_external_id',
+        # unique indexes of the plain table: name -> columns
+        'unique': {'ix_sip_records_sip_meta_id': ['sip_meta_id']},
+        # ON DELETE CASCADE foreign keys referencing id: name -> (table, column)
+        'references': {
+            'sip_schemes_sip_id_fkey': ('sip_schemes', 'sip_id'),
+        },
+    },
+    'portfolio_holdings': {
+        'strategy': 'RANGE',
+        'key': 'as_on_date_on',
+        'unique': {},
+        'references': {},
+    },
+}
+
+DEFAULT_SIP_PARTITIONS = 16
+
+_UPPER_BOUND_RE = re.compile(r"TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+
+def list_partitions(cursor, table: str) -> List[tuple]:
+    """(partition name, bound expression) of every partition of `table`"""
+    cursor.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+    """, (table,))
+    return cursor.fetchall()
+
+
+def month_partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _add_partition_keys(cursor, table: str):
+    """Primary key on id for every partition of `table` that has none yet"""
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conrelid = c.oid AND k.contype = 'p')
+    """, (table,))
+    for (partition,) in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE {partition} ADD PRIMARY KEY (id)")
+
+
+def _create_month_partitions(cursor, parent: str, table: str, source: str) -> int:
+    """Create the missing month partitions of `parent` for the key values in `source`"""
+    key = PARTITION_LAYOUTS[table]['key']
+    cursor.execute(f"SELECT DISTINCT date_trunc('month', {key})::date FROM {source} WHERE {key} IS NOT NULL")
+    created = 0
+    for (month,) in cursor.fetchall():
+        name = month_partition_name(table, month)
+        cursor.execute("SELECT to_regclass(%s)", (name,))
+        if cursor.fetchone()[0] is None:
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {parent} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+            )
+            created += 1
+    return created
+
+
+def ensure_range_partitions(cursor, table: str, source: str) -> int:
+    """
+    Create the month partitions the rows staged in `source` will land in.
+
+    A no-op unless `table` is range partitioned. Call it after locking
+    `table` against concurrent imports and before inserting, in a short
+    transaction of its own: creating a partition holds an ACCESS EXCLUSIVE
+    lock on `table` until commit.
+
+    Returns:
+        Number of partitions created
+    """
+    layout = PARTITION_LAYOUTS.get(table)
+    if not layout or layout['strategy'] != 'RANGE' or not partition_key_columns(cursor, table):
+        return 0
+    created = _create_month_partitions(cursor, table, table, source)
+    if created:
+        _add_partition_keys(cursor, table)
+    return created
+
+
+def _cascade_function(name: str) -> str:
+    return f"{name}_cascade"
+
+
+def _create_cascade_triggers(cursor, table: str, name: str, referencing: str, column: str):
+    """
+    ON DELETE CASCADE of foreign key `name` as statement triggers on a partitioned `table`.
+
+    Statement triggers on the parent fire once per DELETE / TRUNCATE of
+    `table` and not for the DELETE half of a row moving between partitions,
+    which row triggers would.
+    """
+    function = _cascade_function(name)
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM {referencing};
+            ELSE
+                DELETE FROM {referencing} WHERE {column} IN (SELECT id FROM deleted);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    cursor.execute(
+        f"CREATE TRIGGER {function}_delete AFTER DELETE ON {table} "
+        f"REFERENCING OLD TABLE AS deleted FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER {function}_truncate AFTER TRUNCATE ON {table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+    )
+
+
+def rebuild_table(cursor, table: str, partitioned: bool, sip_partitions: int = DEFAULT_SIP_PARTITIONS):
+    """
+    Rebuild `table` as a partitioned (or, with partitioned=False, plain) table.
+
+    Caller owns the transaction.
+    """
+    layout = PARTITION_LAYOUTS[table]
+    rebuilt = f"{table}_rebuild"
+    cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+
+    # Non-unique indexes and outgoing foreign keys are replayed as they are;
+    # unique keys depend on the layout
+    cursor.execute("""
+        SELECT pg_get_indexdef(indexrelid) FROM pg_index
+        WHERE indrelid = %s::regclass AND NOT indisunique
+    """, (table,))
+    indexes = [row[0].replace(" ON ONLY ", " ON ") for row in cursor.fetchall()]
+    cursor.execute("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+    """, (table,))
+    foreign_keys = cursor.fetchall()
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table,))
+    sequence = cursor.fetchone()[0]
+
+    key = layout['key']
+    partition_by = f" PARTITION BY {layout['strategy']} ({key})" if partitioned else ""
+    cursor.execute(f"DROP TABLE IF EXISTS {rebuilt}")
+    cursor.execute(
+        f"CREATE TABLE {rebuilt} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+        f"INCLUDING STORAGE INCLUDING COMMENTS){partition_by}"
+    )
+    if partitioned and layout['strategy'] == 'HASH':
+        for remainder in range(sip_partitions):
+            cursor.execute(
+                f"CREATE TABLE {table}_p{remainder:02d} PARTITION OF {rebuilt} "
+                f"FOR VALUES WITH (MODULUS {sip_partitions}, REMAINDER {remainder})"
+            )
+    elif partitioned:
+        _create_month_partitions(cursor, rebuilt, table, table)
+        cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {rebuilt} DEFAULT")
+
+    cursor.execute(f"INSERT INTO {rebuilt} SELECT * FROM {table}")
+
+    for name, (referencing, _) in layout['references'].items():
+        cursor.execute(f"ALTER TABLE {referencing} DROP CONSTRAINT IF EXISTS {name}")
+    if sequence:
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    cursor.execute(f"DROP TABLE {table}")
+    for name in layout['references']:
+        cursor.execute(f"DROP FUNCTION IF EXISTS {_cascade_function(name)}()")
+    cursor.execute(f"ALTER TABLE {rebuilt} RENAME TO {table}")
+    if sequence:
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+
+    if partitioned:
+        _add_partition_keys(cursor, table)
+    else:
+        cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+    for name, columns in layout['unique'].items():
+        if partitioned:
+            cursor.execute(f"CREATE UNIQUE INDEX {name} ON {table} ({', '.join(columns + [key])}) NULLS NOT DISTINCT")
+        else:
+            cursor.execute(f"CREATE UNIQUE INDEX {name} ON {table} ({', '.join(columns)})")
+    for definition in indexes:
+        cursor.execute(definition)
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+    for name, (referencing, column) in layout['references'].items():
+        if partitioned:
+            _create_cascade_triggers(cursor, table, name, referencing, column)
+        else:
+            cursor.execute(
+                f"ALTER TABLE {referencing} ADD CONSTRAINT {name} "
+                f"FOREIGN KEY ({column}) REFERENCES {table} (id) ON DELETE CASCADE"
+            )
+
+    cursor.execute(f"ANALYZE {table}")
+
+
+def drop_partitions_before(cursor, table: str, before: date) -> List[str]:
+    """Detach and drop the month partitions of `table` that end on or before `before`"""
+    dropped = []
+    for partition, bound in list_partitions(cursor, table):
+        upper = _UPPER_BOUND_RE.search(bound or '')
+        if upper and date.fromisoformat(upper.group(1)) <= before:
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {partition}")
+            cursor.execute(f"DROP TABLE {partition}")
+            dropped.append(partition)
+    return dropped
+
+
+def print_status(cursor):
+    for table in PARTITION_LAYOUTS:
+        keys = partition_key_columns(cursor, table)
+        if not keys:
+            print(f"{table}: plain table")
+            continue
+        partitions = list_partitions(cursor, table)
+        print(f"{table}: {PARTITION_LAYOUTS[table]['strategy']} ({', '.join(keys)}), {len(partitions)} partitions")
+        for partition, bound in partitions:
+            print(f"   {partition:<32} {bound}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Switch sip_records / portfolio_holdings to a partitioned layout")
+    arg_parser.add_argument("--table", action="append", choices=sorted(PARTITION_LAYOUTS),
+                            help="Table to convert (repeatable; default: both)")
+    arg_parser.add_argument("--sip-partitions", type=int, default=DEFAULT_SIP_PARTITIONS,
+                            help="Hash partitions for sip_records")
+    arg_parser.add_argument("--revert", action="store_true", help="Convert back to plain tables")
+    arg_parser.add_argument("--drop-portfolio-before", type=date.fromisoformat, default=None,
+                            help="Drop portfolio_holdings months ending on or before this date (YYYY-MM-DD)")
+    arg_parser.add_argument("--status", action="store_true", help="Only print the current layout")
+    args = arg_parser.parse_args()
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if args.status:
+            print_status(cursor)
+        elif args.drop_portfolio_before:
+            if not partition_key_columns(cursor, 'portfolio_holdings'):
+                sys.exit("❌ portfolio_holdings is not partitioned")
+            dropped = drop_partitions_before(cursor, 'portfolio_holdings', args.drop_portfolio_before)
+            connection.commit()
+            print(f"🗑️  Dropped {len(dropped)} partitions: {', '.join(dropped) or '-'}")
+        else:
+            for table in args.table or list(PARTITION_LAYOUTS):
+                partitioned = bool(partition_key_columns(cursor, table))
+                if partitioned != args.revert:
+                    print(f"⏭️  {table} is already {'partitioned' if partitioned else 'a plain table'}")
+                    continue
+                start = time.perf_counter()
+                rebuild_table(cursor, table, partitioned=not args.revert, sip_partitions=args.sip_partitions)
+                connection.commit()
+                print(f"✅ {table} rebuilt as a {'plain' if args.revert else 'partitioned'} table "
+                      f"in {time.perf_counter() - start:.1f}s")
+            print_status(cursor)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
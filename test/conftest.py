@@ -0,0 +1,45 @@
+"""
+Shared fixtures for the tests that need PostgreSQL.
+
+scratch_engine creates an empty database next to the configured one
+(DATABASE_URL) for each test module, with the schema of app.models, and
+drops it when the module is done. The tests are skipped when no server is
+reachable.
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.models import Base
+
+
+@pytest.fixture(scope="module")
+def scratch_engine(request):
+    """Engine on a scratch database named after the test module"""
+    url = make_url(settings.DATABASE_URL)
+    name = f"{url.database}_{request.module.__name__.rsplit('.', 1)[-1]}"
+    admin = create_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+            conn.execute(text(f'CREATE DATABASE "{name}"'))
+    except OperationalError as e:
+        admin.dispose()
+        pytest.skip(f"PostgreSQL server not available: {e}")
+
+    scratch = create_engine(url.set(database=name))
+    try:
+        Base.metadata.create_all(scratch)
+        yield scratch
+    finally:
+        scratch.dispose()
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        admin.dispose()
@@ -0,0 +1,92 @@
+"""
+Merge modes of scripts/bulk_load.bulk_merge, on a scratch database
+(see conftest.scratch_engine). Skipped when no PostgreSQL server is reachable.
+Run with: python -m pytest test/test_bulk_merge.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.bulk_load import bulk_merge
+
+
+COLUMNS = ['user_id', 'name', 'email']
+
+
+@pytest.fixture
+def connection(scratch_engine):
+    connection = scratch_engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("TRUNCATE users RESTART IDENTITY")
+        cursor.executemany(
+            "INSERT INTO users (user_id, name, email) VALUES (%s, %s, %s)",
+            [('u1', 'Asha', 'asha@example.com'), ('u2', 'Bala', 'bala@example.com')]
+        )
+        connection.commit()
+        yield connection
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def _users(connection) -> dict:
+    cursor = connection.cursor()
+    cursor.execute("SELECT user_id, id, name, email, updated_in_db IS NOT NULL FROM users")
+    return {user_id: rest for user_id, *rest in cursor.fetchall()}
+
+
+def _rows(*values) -> list:
+    return [dict(zip(COLUMNS, row)) for row in values]
+
+
+def test_update_existing_only_rewrites_changed_rows(connection):
+    """Unchanged rows are skipped, changed ones updated, new keys inserted"""
+    merged = bulk_merge(
+        connection,
+        _rows(('u1', 'Asha', 'asha@example.com'), ('u2', 'Bala', 'bala@new.example.com'), ('u3', 'Chitra', None)),
+        'users', COLUMNS, conflict_column='user_id', update_existing=True
+    )
+    connection.commit()
+
+    assert merged == {'staged': 3, 'inserted': 1, 'updated': 1, 'skipped': 1}
+    users = _users(connection)
+    assert users['u1'] == [1, 'Asha', 'asha@example.com', False]
+    assert users['u2'] == [2, 'Bala', 'bala@new.example.com', True]
+    assert users['u3'][1:] == ['Chitra', None, False]
+
+
+def test_update_existing_keeps_last_occurrence_of_a_key(connection):
+    """A key staged more than once is merged once, with its last values in file order"""
+    merged = bulk_merge(
+        connection,
+        _rows(('u4', 'First', None), ('u2', 'Bala (1)', None), ('u4', 'Last', None), ('u2', 'Bala (2)', None)),
+        'users', COLUMNS, conflict_column='user_id', update_existing=True,
+        batch_size=1
+    )
+    connection.commit()
+
+    assert merged == {'staged': 4, 'inserted': 1, 'updated': 1, 'skipped': 2}
+    users = _users(connection)
+    assert users['u4'][1] == 'Last'
+    assert users['u2'][1:3] == ['Bala (2)', None]
+
+
+def test_conflict_only_inserts_first_occurrence_in_key_order(connection):
+    """Without update_existing existing keys are untouched and new keys go in sorted"""
+    merged = bulk_merge(
+        connection,
+        _rows(('u9', 'First', None), ('u1', 'Asha (new)', None), ('u5', 'Five', None), ('u9', 'Second', None)),
+        'users', COLUMNS, conflict_column='user_id'
+    )
+    connection.commit()
+
+    assert merged == {'staged': 4, 'inserted': 2, 'updated': 0, 'skipped': 2}
+    users = _users(connection)
+    assert users['u1'] == [1, 'Asha', 'asha@example.com', False]
+    assert users['u9'][1] == 'First'
+    # u5 sorts before u9, so it took the lower id although it was staged later
+    assert users['u5'][0] < users['u9'][0]
@@ -0,0 +1,105 @@
+"""
+Resume offsets of scripts/checkpoints.ImportCheckpointTracker, on a scratch
+database (see conftest.scratch_engine). Skipped when no PostgreSQL server is
+reachable.
+Run with: python -m pytest test/test_checkpoints.py
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.checkpoints import ImportCheckpointTracker
+
+
+@pytest.fixture
+def db(scratch_engine):
+    session = Session(scratch_engine)
+    try:
+        session.execute(text("TRUNCATE import_checkpoints, users RESTART IDENTITY"))
+        session.commit()
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def export_file(tmp_path):
+    path = tmp_path / "users.json"
+    path.write_text('[{"uid": "1"}, {"uid": "2"}, {"uid": "3"}, {"uid": "4"}]')
+    return str(path)
+
+
+def _add_user(db, uid: str):
+    db.execute(text("INSERT INTO users (uid) VALUES (:uid)"), {'uid': uid})
+
+
+def test_offset_is_held_at_a_rolled_back_batch(db, export_file):
+    """Commits after a rollback do not move the offset past the lost records"""
+    checkpoint = ImportCheckpointTracker(db, 'user', export_file)
+    assert checkpoint.resume_offset == 0
+
+    _add_user(db, '1')
+    checkpoint.commit(1)
+    _add_user(db, '2')
+    checkpoint.rollback()
+    _add_user(db, '3')
+    checkpoint.commit(3)
+    checkpoint.commit(4, completed=True)
+
+    resumed = ImportCheckpointTracker(db, 'user', export_file)
+    assert resumed.resume_offset == 1
+    assert not resumed.completed
+    # Batches after the rollback still commit their rows
+    assert db.execute(text("SELECT array_agg(uid ORDER BY uid) FROM users")).scalar() == ['1', '3']
+
+
+def test_rolled_back_first_batch_leaves_no_checkpoint(db, export_file):
+    """The checkpoint row created in a failed batch is rolled back with it"""
+    checkpoint = ImportCheckpointTracker(db, 'user', export_file)
+    checkpoint.mark(2)
+    checkpoint.rollback()
+    checkpoint.commit(4, completed=True)
+
+    resumed = ImportCheckpointTracker(db, 'user', export_file)
+    assert resumed.resume_offset == 0
+    assert not resumed.completed
+
+
+def test_completed_file_resumes_at_its_end(db, export_file):
+    checkpoint = ImportCheckpointTracker(db, 'user', export_file)
+    checkpoint.commit(2)
+    checkpoint.commit(4, completed=True)
+
+    resumed = ImportCheckpointTracker(db, 'user', export_file)
+    assert resumed.resume_offset == 4
+    assert resumed.completed
+    # Another importer over the same file keeps its own offset
+    assert ImportCheckpointTracker(db, 'sip', export_file).resume_offset == 0
+
+
+def test_changed_file_starts_over(db, export_file):
+    """Any change to the content, even at the same size, resets the offset"""
+    checkpoint = ImportCheckpointTracker(db, 'user', export_file)
+    checkpoint.commit(3)
+
+    with open(export_file) as f:
+        content = f.read()
+    with open(export_file, 'w') as f:
+        f.write(content.replace('"4"', '"5"'))
+
+    changed = ImportCheckpointTracker(db, 'user', export_file)
+    assert changed.resume_offset == 0
+    assert not changed.completed
+
+
+def test_restart_discards_the_checkpoint(db, export_file):
+    checkpoint = ImportCheckpointTracker(db, 'user', export_file)
+    checkpoint.commit(3)
+
+    assert ImportCheckpointTracker(db, 'user', export_file, restart=True).resume_offset == 0
+    assert ImportCheckpointTracker(db, 'user', export_file).resume_offset == 0
@@ -0,0 +1,62 @@
+"""
+Tests for the export date parser's known-format fast path.
+parse_export_datetime must agree with dateutil, which it replaced.
+Run with: python -m pytest test/test_export_dates.py
+"""
+import os
+import sys
+
+import pytest
+from dateutil import parser as date_parser
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.derived_fields import _parse_known_format, parse_export_datetime
+
+
+VALID_DATES = [
+    "July 30, 2023",
+    "July 30, 2023, 7:02 PM",
+    "July 30, 2023, 7:02 AM",
+    "January 5, 2026, 12:00 AM",
+    "January 5, 2026, 12:30 PM",
+    "December 31, 2024, 11:59 PM",
+    "Jul 30, 2023",
+    "Jul. 30, 2023",
+    "Sep 5, 2023",
+    "Sept 5, 2023",
+    "September 5, 2023, 9:15 am",
+    "  July 30, 2023  ",
+    "2023-07-30",
+    "2023-07-30T19:02:00",
+    "2023-07-30 19:02:00.123456",
+    "2023-07-30T19:02:00+05:30",
+]
+
+INVALID_DATES = [
+    None,
+    "",
+    "not a date",
+    "July 32, 2023",
+    "Foo 5, 2023",
+    "February 30, 2024, 7:02 PM",
+    "2023-13-01",
+]
+
+
+@pytest.mark.parametrize("value", VALID_DATES)
+def test_known_formats_match_dateutil(value):
+    """Every export format parses to exactly what dateutil returns"""
+    assert parse_export_datetime(value) == date_parser.parse(value)
+
+
+@pytest.mark.parametrize("value", VALID_DATES)
+def test_fast_path_handles_export_formats(value):
+    """The regex / fromisoformat path parses these itself, without the dateutil fallback"""
+    assert _parse_known_format(value.strip()) == date_parser.parse(value)
+
+
+@pytest.mark.parametrize("value", INVALID_DATES)
+def test_empty_and_invalid_values_are_none(value):
+    """Empty and unparseable values give None instead of raising"""
+    assert parse_export_datetime(value) is None
@@ -0,0 +1,96 @@
+"""
+Tests for the streaming JSON reader used by the import scripts.
+Run with: python -m pytest test/test_import_streaming.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.import_utils import iter_json_array, peak_rss_mb
+import scripts.import_utils as import_utils
+
+
+def _write_json(payload) -> str:
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(payload, f, indent=1)
+    return path
+
+
+def test_top_level_array_matches_json_load():
+    """Streaming a record array yields exactly what json.load returns"""
+    records = [
+        {"sip_meta_id": str(i), "amount": "7,500", "scheme_name": "[Fund A (G), Fund B (G)]", "note": "tab\there"}
+        for i in range(2000)
+    ]
+    path = _write_json(records)
+    try:
+        assert list(iter_json_array(path)) == records
+    finally:
+        os.remove(path)
+
+
+def test_small_chunks_do_not_truncate_values():
+    """Values split across read chunks (including bare numbers) decode intact"""
+    records = [12345, 678901, {"nested": [1, 2, {"x": "y"}]}, "last"]
+    path = _write_json(records)
+    original_reader = import_utils._JSONStreamReader
+    try:
+        import_utils._JSONStreamReader = lambda f: original_reader(f, chunk_size=3)
+        assert list(iter_json_array(path)) == records
+    finally:
+        import_utils._JSONStreamReader = original_reader
+        os.remove(path)
+
+
+def test_nested_results_array_and_header():
+    """Portfolio dumps stream results[] and expose the preceding summary fields"""
+    payload = {
+        "total_users": 2,
+        "successful": 2,
+        "failed": 0,
+        "results": [
+            {"user_id": "u1", "top_holdings_bucket": [{"wpc": "MF1"}, {"wpc": "MF2"}]},
+            {"user_id": "u2", "top_holdings_bucket": []},
+        ],
+        "trailer": {"ignored": True},
+    }
+    path = _write_json(payload)
+    try:
+        header = {}
+        results = list(iter_json_array(path, key="results", header=header))
+        assert [r["user_id"] for r in results] == ["u1", "u2"]
+        assert header == {"total_users": 2, "successful": 2, "failed": 0}
+    finally:
+        os.remove(path)
+
+
+def test_empty_array_and_missing_key():
+    path = _write_json({"total_users": 0})
+    try:
+        assert list(iter_json_array(path, key="results")) == []
+    finally:
+        os.remove(path)
+
+    path = _write_json([])
+    try:
+        assert list(iter_json_array(path)) == []
+    finally:
+        os.remove(path)
+
+
+def test_peak_rss_is_reported():
+    peak = peak_rss_mb()
+    assert peak is None or peak > 0
+
+
+if __name__ == "__main__":
+    test_top_level_array_matches_json_load()
+    test_small_chunks_do_not_truncate_values()
+    test_nested_results_array_and_header()
+    test_empty_array_and_missing_key()
+    test_peak_rss_is_reported()
+    print("✅ All streaming reader tests passed")
@@ -0,0 +1,82 @@
+"""
+Checksum sync of scripts/import_insurance.sync_insurance_data, on a scratch
+database (see conftest.scratch_engine). Skipped when no PostgreSQL server is
+reachable.
+Run with: python -m pytest test/test_insurance_sync.py
+"""
+import json
+import os
+import sys
+
+import pytest
+from sqlalchemy import text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scripts.import_insurance as import_insurance
+import scripts.lookup_codes as lookup_codes
+
+
+def _policy(source_id: str, checksum: str, premium: str = "12,000", deleted: str = "false") -> dict:
+    return {
+        "uid": f"ins-{source_id}", "source_id": source_id, "checksum": checksum, "deleted": deleted,
+        "itf.user_id": f"user-{source_id}", "premium": premium, "insurer": "Acme Life",
+        "insurance_type": "Term", "created_at": "July 30, 2023, 7:02 PM",
+    }
+
+
+@pytest.fixture
+def sync(scratch_engine, monkeypatch, tmp_path):
+    """Runs sync_insurance_data against the scratch database on an export of `policies`"""
+    monkeypatch.setattr(import_insurance, 'engine', scratch_engine)
+    monkeypatch.setattr(lookup_codes, 'engine', scratch_engine)
+    with scratch_engine.begin() as conn:
+        conn.execute(text("TRUNCATE insurance_records RESTART IDENTITY"))
+
+    def run(policies: list) -> dict:
+        path = tmp_path / "insurance.json"
+        path.write_text(json.dumps(policies))
+        return import_insurance.sync_insurance_data(str(path))
+    return run
+
+
+def _stored(scratch_engine) -> dict:
+    with scratch_engine.connect() as conn:
+        rows = conn.execute(text("SELECT source_id, checksum, premium, deleted FROM insurance_records"))
+        return {source_id: (checksum, premium, deleted) for source_id, checksum, premium, deleted in rows}
+
+
+def test_second_sync_applies_only_the_differences(scratch_engine, sync):
+    first = sync([_policy("a", "a1"), _policy("b", "b1"), _policy("c", "c1"), _policy("d", "d1")])
+    assert first == {
+        'inserted': 4, 'updated': 0, 'deleted': 0, 'unchanged': 0, 'ignored_tombstones': 0, 'errors': 0
+    }
+
+    second = sync([
+        _policy("a", "a1"),
+        _policy("b", "b2", premium="15,000"),
+        _policy("c", "c1", deleted="true"),
+        # d is no longer exported
+        _policy("e", "e1"),
+        _policy("z", "z1", deleted="true"),
+    ])
+    assert second == {
+        'inserted': 1, 'updated': 1, 'deleted': 1, 'unchanged': 1, 'ignored_tombstones': 1, 'errors': 0
+    }
+
+    assert _stored(scratch_engine) == {
+        "a": ("a1", 12000.0, False),
+        "b": ("b2", 15000.0, False),
+        "c": ("c1", 12000.0, True),
+        # A record missing from the export is kept; only tombstones delete
+        "d": ("d1", 12000.0, False),
+        "e": ("e1", 12000.0, False),
+    }
+
+
+def test_last_occurrence_of_a_source_id_wins(scratch_engine, sync):
+    sync([_policy("a", "a1")])
+
+    stats = sync([_policy("a", "a2", premium="1"), _policy("a", "a3", premium="2")])
+    assert (stats['updated'], stats['unchanged']) == (1, 0)
+    assert _stored(scratch_engine)["a"] == ("a3", 2.0, False)
@@ -0,0 +1,113 @@
+"""
+Per-user snapshot replace of scripts/import_portfolio.replace_portfolio_snapshot,
+on a scratch database (see conftest.scratch_engine). Skipped when no
+PostgreSQL server is reachable.
+Run with: python -m pytest test/test_portfolio_snapshot.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scripts.lookup_codes as lookup_codes
+from scripts.import_portfolio import HISTORY_TABLE, replace_portfolio_snapshot
+
+
+def _result(user_id: str, as_on_date: str, *wpcs) -> dict:
+    return {
+        'user_id': user_id,
+        'pan_number': f"PAN-{user_id}",
+        'client_details': {'as_on_date': as_on_date},
+        'top_holdings_bucket': [
+            {'wpc': wpc, 'scheme_name': f"Scheme {wpc}", 'category': 'Equity', 'amc_name': 'Acme AMC',
+             'current_value': 100000.0, 'portfolio_weight': 50.0, 'w_rating': '3'}
+            for wpc in wpcs
+        ],
+    }
+
+
+@pytest.fixture
+def connection(scratch_engine, monkeypatch):
+    monkeypatch.setattr(lookup_codes, 'engine', scratch_engine)
+    connection = scratch_engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("TRUNCATE portfolio_holdings RESTART IDENTITY")
+        cursor.execute(f"DROP TABLE IF EXISTS {HISTORY_TABLE}")
+        connection.commit()
+        yield connection
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def _swap(connection, results, retain: int = 0) -> dict:
+    stats = replace_portfolio_snapshot(connection, results, retain=retain)
+    connection.commit()
+    return stats
+
+
+def _holdings(connection) -> dict:
+    cursor = connection.cursor()
+    cursor.execute("SELECT user_id, as_on_date, wpc FROM portfolio_holdings ORDER BY user_id, wpc")
+    holdings = {}
+    for user_id, as_on_date, wpc in cursor.fetchall():
+        holdings.setdefault(user_id, []).append((as_on_date, wpc))
+    return holdings
+
+
+def _history(connection) -> dict:
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT user_id, as_on_date, count(*) FROM {HISTORY_TABLE} GROUP BY 1, 2 ORDER BY 1, 2")
+    history = {}
+    for user_id, as_on_date, count in cursor.fetchall():
+        history.setdefault(user_id, []).append((as_on_date, count))
+    return history
+
+
+def test_dump_replaces_only_its_users_holdings(connection):
+    _swap(connection, [_result('a', '2026-01-30', 'f1', 'f2'), _result('b', '2026-01-30', 'f1')])
+
+    stats = _swap(connection, [
+        _result('a', '2026-01-30', 'f9'),
+        _result('a', '2026-02-27', 'f3'),  # a appears twice: the last entry wins
+        {'user_id': 'c', 'top_holdings_bucket': None},  # failed fetch
+    ])
+
+    assert (stats['users'], stats['inserted'], stats['replaced'], stats['skipped_users']) == (1, 1, 2, 1)
+    assert _holdings(connection) == {
+        'a': [('2026-02-27', 'f3')],
+        'b': [('2026-01-30', 'f1')],
+    }
+
+
+def test_empty_holdings_list_clears_the_user(connection):
+    _swap(connection, [_result('a', '2026-01-30', 'f1'), _result('b', '2026-01-30', 'f1')])
+
+    _swap(connection, [_result('a', '2026-02-27')])
+
+    assert _holdings(connection) == {'b': [('2026-01-30', 'f1')]}
+
+
+def test_retain_keeps_the_latest_archived_snapshots(connection):
+    _swap(connection, [_result('a', '2026-01-30', 'f1', 'f2'), _result('b', '2026-01-30', 'f1')], retain=2)
+    _swap(connection, [_result('a', '2026-02-27', 'f1'), _result('b', '2026-02-27', 'f1')], retain=2)
+    # Same as_on_date again: a re-import, not a new snapshot, so nothing is archived
+    stats = _swap(connection, [_result('a', '2026-02-27', 'f1')], retain=2)
+    assert (stats['replaced'], stats['archived']) == (1, 0)
+    _swap(connection, [_result('a', '2026-03-30', 'f1')], retain=2)
+    stats = _swap(connection, [_result('a', '2026-04-29', 'f1')], retain=2)
+
+    assert stats['pruned'] == 2
+    assert _holdings(connection)['a'] == [('2026-04-29', 'f1')]
+    assert _history(connection) == {
+        'a': [('2026-02-27', 1), ('2026-03-30', 1)],
+        'b': [('2026-01-30', 1)],
+    }
+
+    # retain == 0 prunes the history of the users in the dump only
+    stats = _swap(connection, [_result('a', '2026-05-29', 'f1')])
+    assert (stats['archived'], stats['pruned']) == (0, 2)
+    assert _history(connection) == {'b': [('2026-01-30', 1)]}
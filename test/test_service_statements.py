@@ -0,0 +1,106 @@
+"""
+Statement budget of the aggregate statistics services.
+Needs a PostgreSQL server (DATABASE_URL) but no loaded data: the tests
+fill a scratch database (see conftest.scratch_engine) with a few fixture
+rows. Skipped when no server is reachable.
+Run with: python -m pytest test/test_service_statements.py
+"""
+import os
+import sys
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import LookupValue, User, SIPRecord, InsuranceRecord, PortfolioHolding
+from scripts.explain_services import capture_statements, load_samples, resolve_kwargs
+
+
+# (service, kwargs) -> SQL statements one call may issue
+STATEMENT_BUDGET = [
+    ('get_opportunity_statistics', {}, 1),
+    ('get_opportunity_statistics', {'agent_id': ':agent_id'}, 1),
+    ('get_user_statistics', {}, 1),
+    ('get_user_statistics', {'agent_id': ':user_agent_external_id'}, 1),
+    ('get_insurance_statistics', {}, 1),
+    ('get_insurance_statistics', {'agent_id': ':insurance_agent_id'}, 1),
+    ('get_portfolio_statistics', {}, 1),
+    ('get_portfolio_statistics', {'user_id': ':user_id'}, 1),
+]
+
+LOOKUP_VALUES = [
+    (1, 'sip_records.current_sip_status', 'ACTIVE'),
+    (2, 'sip_records.current_sip_status', 'PAUSED'),
+    (3, 'insurance_records.insurance_type', 'Health'),
+    (4, 'insurance_records.insurance_type', 'Term'),
+    (5, 'portfolio_holdings.category', 'Equity'),
+    (6, 'portfolio_holdings.category', 'Debt'),
+]
+
+
+def _fixture_rows() -> list:
+    """Two agents with a few users, SIPs, policies and holdings each"""
+    created_at = datetime(2024, 1, 15, tzinfo=timezone.utc)
+    rows = []
+    for i in range(6):
+        agent = i % 2
+        user_id = f"user-{i}"
+        rows.append(User(
+            uid=f"uid-{i}", user_id=user_id, name=f"Client {i}",
+            agent_external_id=f"agent-ext-{agent}", agent_name=f"Agent {agent}",
+            date_of_birth=date(1970 + 5 * i, 1, 1), created_at_ts=created_at,
+            total_current_value=1000000.0 * (i + 1), mf_current_value=800000.0 * (i + 1),
+            fd_current_value=100000.0 * i, total_invested_value=900000.0 * (i + 1),
+            mf_invested_value=700000.0 * (i + 1),
+        ))
+        rows.append(SIPRecord(
+            sip_meta_id=f"sip-{i}", user_id=user_id, agent_id=f"agent-{agent}",
+            agent_external_id=f"agent-ext-{agent}", amount=5000.0 * (i + 1),
+            scheme_name="[Fund A (G), Fund B (G)]", is_active=i % 3 != 0, deleted=False,
+            current_sip_status_code=1 + i % 2, success_amount=50000.0 * i, failed_amount=1000.0 * (i % 2),
+            step_up_enabled=i % 2 == 0, scheme_count=2, created_at_ts=created_at,
+            latest_success_order_date_on=date(2025, 1 + i, 1),
+        ))
+        rows.append(InsuranceRecord(
+            uid=f"ins-{i}", user_id=user_id, agent_id=f"agent-{agent}",
+            agent_external_id=f"agent-ext-{agent}", deleted=False, premium=10000.0 * (i + 1),
+            insurance_type_code=3 + i % 2, created_at_ts=created_at,
+        ))
+        for position in range(3):
+            rows.append(PortfolioHolding(
+                user_id=user_id, as_on_date="2026-01-30", as_on_date_on=date(2026, 1, 30),
+                wpc=f"wpc-{position}", scheme_name=f"Scheme {position}", category_code=5 + position % 2,
+                current_value=100000.0 * (position + 1), portfolio_weight=20.0 * (position + 1),
+                live_xirr=8.0 + position, benchmark_xirr=10.0, w_rating=str(position + 1),
+                w_rating_numeric=float(position + 1),
+            ))
+    return rows
+
+
+@pytest.fixture(scope="module")
+def db(scratch_engine):
+    session = Session(scratch_engine)
+    try:
+        # The codes' foreign keys are invisible to the unit of work (viewonly relationships)
+        session.add_all(LookupValue(id=code, field=field, value=value) for code, field, value in LOOKUP_VALUES)
+        session.flush()
+        session.add_all(_fixture_rows())
+        session.commit()
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="module")
+def samples(db):
+    return load_samples(db)
+
+
+@pytest.mark.parametrize("function_name,kwargs,budget", STATEMENT_BUDGET)
+def test_statistics_run_in_one_statement(db, samples, function_name, kwargs, budget):
+    """Each stats endpoint computes its totals and breakdowns in a single query"""
+    statements = capture_statements(db, function_name, resolve_kwargs(kwargs, samples))
+    assert statements, f"{function_name} issued no SQL on the scratch database"
+    assert len(statements) <= budget, [statement for statement, _ in statements]